@@ -0,0 +1,37 @@
+"""Wspólne narzędzia dla skryptów benchmarkowych masker.py."""
+
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CORPUS = REPO_ROOT / "nask_train" / "anonymized.txt"
+
+# Benchmarki uruchamiamy jako skrypty: python benchmarks/<nazwa>.py
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def load_lines(path=DEFAULT_CORPUS) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def regex_only_anonymizer(**kwargs):
+    """TextAnonymizer bez modelu spaCy – wystarcza do pomiaru etapu regexów.
+
+    Budowany zwykłym konstruktorem (no_ner=True albo gotowy potok w nlp=...), więc
+    nowe atrybuty TextAnonymizer nie rozjeżdżają się z benchmarkami.
+    """
+    from masker import TextAnonymizer
+
+    kwargs.setdefault("no_ner", "nlp" not in kwargs)
+    return TextAnonymizer(**kwargs)
+
+
+def best_of(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark wejścia/wyjścia Parquet (masker.py -i dane.parquet -o wynik.parquet).
+
+Korpus (powielony --scale razy) zapisywany jest jako plik tekstowy i jako Parquet
+z kolumną text. Oba warianty przechodzą przez masker.py w osobnych procesach
+(czas i szczytowy RSS z os.wait4), a zamaskowana kolumna Parquet jest porównywana
+z wynikiem ścieżki tekstowej. Stały RSS ścieżki Parquet przy rosnącej skali
+pokazuje, że pamięć ogranicza paczka rekordów, a nie rozmiar pliku.
+
+Opcje po "--" trafiają do obu wywołań masker.py (np. -- --no-ner).
+
+Usage:
+    python benchmarks/bench_arrow.py --scale 1 4
+    python benchmarks/bench_arrow.py --scale 1 4 -- --no-ner --table-batch-rows 2048
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from _common import DEFAULT_CORPUS, REPO_ROOT, load_lines
+
+
+def run_masker(input_path: str, output_path: str, extra: list[str]) -> tuple[float, float]:
+    # (czas [s], szczytowy RSS [MiB]) procesu masker.py
+    command = [sys.executable, str(REPO_ROOT / "masker.py"), "-i", input_path, "-o", output_path, *extra]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status):
+        raise SystemExit(f"masker.py zakończył się błędem: {' '.join(command)}")
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark wejścia/wyjścia Parquet maskera")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 4], help="Krotności powielenia korpusu")
+    parser.add_argument("--row-group", type=int, default=10_000, help="Wiersze w grupie Parquet")
+    args, extra = parser.parse_known_args()
+    extra = [arg for arg in extra if arg != "--"]
+
+    lines = load_lines(args.file)
+    print(
+        f"{'skala':<6} {'linie':>7} {'tekst [s]':>10} {'RSS MB':>7} {'parquet [s]':>12} {'RSS MB':>7}  zgodność"
+    )
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scale:
+            corpus = lines * scale
+            text_in = os.path.join(directory, "in.txt")
+            text_out = os.path.join(directory, "out.txt")
+            table_in = os.path.join(directory, "in.parquet")
+            table_out = os.path.join(directory, "out.parquet")
+            with open(text_in, "w", encoding="utf-8") as f:
+                f.writelines(line + "\n" for line in corpus)
+            table = pa.table({"id": range(len(corpus)), "text": corpus})
+            pq.write_table(table, table_in, row_group_size=args.row_group)
+
+            t_text, rss_text = run_masker(text_in, text_out, extra)
+            t_table, rss_table = run_masker(table_in, table_out, extra)
+            with open(text_out, "r", encoding="utf-8") as f:
+                expected = [line.rstrip("\n") for line in f]
+            same = pq.read_table(table_out, columns=["text"]).column("text").to_pylist() == expected
+            failed |= not same
+            print(
+                f"{'x' + str(scale):<6} {len(corpus):>7} {t_text:>10.2f} {rss_text:>7.0f} "
+                f"{t_table:>12.2f} {rss_table:>7.0f}  {'tak' if same else 'NIE'}"
+            )
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark zbiorczej walidacji kandydatów numerycznych (CandidateValidation).
+
+Generuje paczki linii gęstych od numerów (rejestry: PESEL-e, karty, rachunki;
+poprawne i z błędną sumą kontrolną) i porównuje etap regexów z walidacją
+pojedynczą (is_valid_* na każdym dopasowaniu) z walidacją NumPy jednej paczki.
+Sprawdza też, czy obie wersje dają identyczne spany, także na korpusie.
+
+Usage:
+    python benchmarks/bench_bulk_validation.py
+    python benchmarks/bench_bulk_validation.py --lines 2000 --per-line 40 --batch-size 128
+"""
+
+import argparse
+import random
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+
+from bench_pesel_repair import random_pesel
+
+from masker import CandidateValidation
+
+
+def luhn_complete(rng: random.Random) -> str:
+    digits = [rng.randint(0, 9) for _ in range(15)]
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        if index % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    digits.append((10 - total % 10) % 10)
+    number = "".join(map(str, digits))
+    return " ".join(number[i:i + 4] for i in range(0, 16, 4))
+
+
+def iban_complete(rng: random.Random) -> str:
+    bban = "".join(str(rng.randint(0, 9)) for _ in range(24))
+    check = 98 - int(bban + "252100") % 97
+    return f"PL{check:02d}{bban}"
+
+
+def corrupt(number: str, rng: random.Random) -> str:
+    positions = [i for i, ch in enumerate(number) if ch.isdigit()]
+    pos = rng.choice(positions)
+    return number[:pos] + str((int(number[pos]) + 1) % 10) + number[pos + 1:]
+
+
+def registry_line(per_line: int, rng: random.Random) -> str:
+    makers = [
+        ("PESEL", lambda: random_pesel(rng)),
+        ("karta", lambda: luhn_complete(rng)),
+        ("rachunek", lambda: iban_complete(rng)),
+    ]
+    parts = []
+    for _ in range(per_line):
+        label, make = rng.choice(makers)
+        number = make()
+        if rng.random() < 0.3:
+            number = corrupt(number, rng)
+        parts.append(f"{label}: {number}")
+    return "; ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zbiorczej walidacji kandydatów")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--lines", "-n", type=int, default=1000, help="Liczba linii rejestru")
+    parser.add_argument("--per-line", type=int, default=30, help="Numery na linię rejestru")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    anonymizer = regex_only_anonymizer()
+    rng = random.Random(args.seed)
+    registry = [registry_line(args.per_line, rng) for _ in range(args.lines)]
+
+    def per_string(lines):
+        return [anonymizer.build_regex_spans(line) for line in lines]
+
+    def bulk(lines):
+        spans = []
+        for i in range(0, len(lines), args.batch_size):
+            chunk = lines[i:i + args.batch_size]
+            validation = CandidateValidation(chunk, anonymizer)
+            spans.extend(anonymizer.build_regex_spans(line, validation=validation) for line in chunk)
+        return spans
+
+    print(f"{'zbiór':<10} {'linie':>6} {'pojedynczo [s]':>15} {'NumPy [s]':>10} {'x':>6}  zgodność")
+    failed = False
+    for label, lines in (("rejestr", registry), ("korpus", load_lines(args.file))):
+        same = per_string(lines) == bulk(lines)
+        failed = failed or not same
+        t_single = best_of(lambda: per_string(lines), args.repeat)
+        t_bulk = best_of(lambda: bulk(lines), args.repeat)
+        print(
+            f"{label:<10} {len(lines):>6} {t_single:>15.3f} {t_bulk:>10.3f} "
+            f"{t_single / t_bulk:>6.2f}  {'tak' if same else 'NIE'}"
+        )
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
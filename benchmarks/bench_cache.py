@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark trwałego cache wyników (--cache-dir).
+
+Maskuje ten sam zbiór linii trzykrotnie: bez cache, z pustym cache (zimny start,
+koszt zapisu) i ponownie z wypełnionym cache (same trafienia) i sprawdza,
+czy wszystkie trzy przebiegi dają identyczne wyjście. Cache tworzony jest
+w katalogu tymczasowym.
+
+Wymaga zainstalowanego modelu pl_nask.
+
+Usage:
+    python benchmarks/bench_cache.py
+    python benchmarks/bench_cache.py --limit 1000 --batch-size 32
+"""
+
+import argparse
+import tempfile
+import time
+
+from _common import DEFAULT_CORPUS, load_lines
+
+from masker import TextAnonymizer
+
+
+def timed(anonymizer, lines, batch_size):
+    start = time.perf_counter()
+    output = list(anonymizer.mask_many(lines, batch_size=batch_size))
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trwałego cache wyników")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=500, help="Liczba linii")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)[: args.limit]
+    print(f"Linie: {len(lines)}")
+
+    t_plain, reference = timed(TextAnonymizer(), lines, args.batch_size)
+    print(f"bez cache:     {t_plain:.2f} s")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = TextAnonymizer(cache_dir=cache_dir)
+        t_cold, cold_output = timed(cold, lines, args.batch_size)
+        print(f"pusty cache:   {t_cold:.2f} s  {cold.cache.stats()}")
+        cold.cache.close()
+
+        warm = TextAnonymizer(cache_dir=cache_dir)
+        t_warm, warm_output = timed(warm, lines, args.batch_size)
+        print(f"pełny cache:   {t_warm:.2f} s  (x{t_plain / t_warm:.1f})  {warm.cache.stats()}")
+        warm.cache.close()
+
+    same = cold_output == reference and warm_output == reference
+    print(f"Zgodność wyjścia: {'tak' if same else 'NIE'}")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
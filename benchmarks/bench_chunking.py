@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark przetwarzania długich linii oknami (--chunk-chars).
+
+Długie dokumenty składane są z kolejnych linii korpusu (domyślnie 2 500 - 40 000
+znaków). Dla każdej długości mierzony jest czas maskowania jednej linii w całości
+i oknami oraz sprawdzana zgodność wyniku.
+
+Bez --model używany jest tokenizator spacy.blank("pl") z prostą regułą ustawiającą
+token._.mask (jak w bench_token_spans.py) – sprawdza to poprawność składania spanów
+z okien, ale nie oddaje kosztu NER. Z --model pl_nask mierzony jest pełny potok.
+
+Usage:
+    python benchmarks/bench_chunking.py
+    python benchmarks/bench_chunking.py --model pl_nask --chunk-chars 1000 --overlap 200
+"""
+
+import argparse
+import time
+
+import spacy
+from spacy.language import Language
+from spacy.tokens import Token
+
+from _common import DEFAULT_CORPUS, load_lines, regex_only_anonymizer
+
+from bench_token_spans import label_tokens
+
+from masker import TextAnonymizer
+
+LENGTHS = (2_500, 5_000, 10_000, 20_000, 40_000)
+
+
+@Language.component("bench_label_tokens")
+def bench_label_tokens(doc):
+    return label_tokens(doc)
+
+
+def blank_anonymizer():
+    Token.set_extension("mask", default=None, force=True)
+    Token.set_extension("priv_last_name", default=False, force=True)
+    nlp = spacy.blank("pl")
+    nlp.add_pipe("bench_label_tokens")
+    return regex_only_anonymizer(nlp=nlp)
+
+
+def long_documents(lines: list[str], lengths) -> list[str]:
+    documents = []
+    for length in lengths:
+        parts = []
+        size = 0
+        for line in lines:
+            if size >= length:
+                break
+            parts.append(line)
+            size += len(line) + 1
+        documents.append(" ".join(parts)[:length].rsplit(" ", 1)[0])
+    return documents
+
+
+def latency(anonymizer, text: str) -> tuple[float, str]:
+    start = time.perf_counter()
+    masked = anonymizer.mask(text)
+    return time.perf_counter() - start, masked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark przetwarzania długich linii oknami")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--model", default=None, help="Model spaCy (domyślnie tokenizator blank)")
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="Rozmiar okna w znakach")
+    parser.add_argument("--overlap", type=int, default=200, help="Zakładka okien w znakach")
+    args = parser.parse_args()
+
+    anonymizer = TextAnonymizer(args.model) if args.model else blank_anonymizer()
+    anonymizer.chunk_overlap = args.overlap
+    documents = long_documents(load_lines(args.file), LENGTHS)
+
+    print(f"{'znaki':>7} {'okna':>5} {'całość [s]':>11} {'okna [s]':>9}  zgodność")
+    failed = False
+    for text in documents:
+        anonymizer.chunk_chars = 0
+        t_whole, whole = latency(anonymizer, text)
+        anonymizer.chunk_chars = args.chunk_chars
+        t_chunked, chunked = latency(anonymizer, text)
+        windows = len(anonymizer.chunk_windows(text))
+        same = whole == chunked
+        failed = failed or (not same and not args.model)
+        print(
+            f"{len(text):>7} {windows:>5} {t_whole:>11.3f} {t_chunked:>9.3f}  "
+            f"{'tak' if same else 'NIE'}"
+        )
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark gazetera miejscowości (CityGazetteer, --city-gazetteer).
+
+Kompiluje listę nazw do pliku .npy, mierzy czas kompilacji, rozmiar pliku, czas
+ładowania (mmap) oraz koszt find() (cała linia), city_spans() (tylko przy
+kontekście) i etapu regexów z gazeterem i bez niego na całym korpusie. Bez --names (plik city_names.txt z extract_cities.py) lista jest
+przybliżana ciągami 1-3 słów z wielkiej litery z korpusu (najwyżej --size
+nazw); czas wyszukiwania zależy od rozmiaru tablicy tylko logarytmicznie.
+
+Usage:
+    python benchmarks/bench_city_gazetteer.py
+    python benchmarks/bench_city_gazetteer.py --names city_names.txt
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+
+from lexicons import CityGazetteer
+
+NAME_LIKE_REGEX = re.compile(r"\b[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż]+(?:[ -][A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż]+){0,2}")
+
+
+def corpus_names(lines: list[str], size: int) -> list[str]:
+    names = dict.fromkeys(match.group(0) for line in lines for match in NAME_LIKE_REGEX.finditer(line))
+    return list(names)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gazetera miejscowości")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--names", default=None, help="Lista nazw (city_names.txt)")
+    parser.add_argument("--size", type=int, default=100_000, help="Liczba nazw bez --names")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)
+    if args.names:
+        with open(args.names, "r", encoding="utf-8") as f:
+            names = [line.strip() for line in f]
+    else:
+        names = corpus_names(lines, args.size)
+
+    anonymizer = regex_only_anonymizer()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "city_gazetteer.npy")
+        start = time.perf_counter()
+        count = CityGazetteer.compile(names, path)
+        t_compile = time.perf_counter() - start
+        start = time.perf_counter()
+        gazetteer = CityGazetteer(path)
+        t_load = time.perf_counter() - start
+        print(
+            f"Nazwy: {count}  plik: {os.path.getsize(path) / 1024:.0f} KiB  "
+            f"kompilacja: {t_compile:.2f} s  ładowanie: {t_load * 1000:.2f} ms"
+        )
+
+        t_find = best_of(lambda: [gazetteer.find(line) for line in lines], args.repeat)
+        found = sum(len(gazetteer.find(line)) for line in lines)
+        t_plain = best_of(lambda: [anonymizer.build_regex_spans(line) for line in lines], args.repeat)
+        anonymizer.city_gazetteer = gazetteer
+        t_context = best_of(lambda: [anonymizer.city_spans(line) for line in lines], args.repeat)
+        t_with = best_of(lambda: [anonymizer.build_regex_spans(line) for line in lines], args.repeat)
+        cities = sum(
+            placeholder == "{city}"
+            for line in lines
+            for _, _, placeholder in anonymizer.build_regex_spans(line)
+        )
+
+    chars = sum(map(len, lines))
+    print(f"Linie: {len(lines)}  znaki: {chars}  wystąpienia nazw: {found}  spany {{city}}: {cities}")
+    print(f"find():             {t_find:.3f} s  ({chars / t_find / 1e6:.1f} M znaków/s)")
+    print(f"city_spans():       {t_context:.3f} s  (tylko przy kontekście)")
+    print(f"regexy bez gazetera: {t_plain:.3f} s")
+    print(f"regexy z gazeterem:  {t_with:.3f} s  (+{(t_with - t_plain) / t_plain:.0%})")
+
+
+if __name__ == "__main__":
+    main()
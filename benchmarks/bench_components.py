@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark przycinania komponentów (--prune-components) dla różnych zestawów masek.
+
+Każda konfiguracja jest uruchamiana w osobnym procesie, żeby pomiar pamięci (RSS)
+obejmował tylko załadowany model. Dla każdej mierzymy czas startu, RSS przed
+załadowaniem modelu, po załadowaniu i szczytowy po maskowaniu (ru_maxrss), a także
+przepustowość w trybie pełnym i przyciętym, oraz sprawdzamy identyczność wyjścia
+(kod wyjścia 1, gdy przycięty potok daje inny wynik niż pełny).
+
+Domyślnie wymaga modelu pl_nask. Bez niego --proxy KATALOG buduje (raz) nietrenowany
+potok pl o tych samych nazwach komponentów co pl_nask (tok2vec, tagger, morphologizer,
+parser, lemmatizer, ner) i domyślnych architekturach spaCy: wagi są losowe, więc
+wynik maskowania nie ma sensu, ale rozmiary modeli, koszt ich uruchamiania i zgodność
+potoku przyciętego z pełnym można zmierzyć. Atrybut token._.properness, który
+w pl_nask ustawia model, daje tu pusty komponent bench_properness.
+
+Usage:
+    python benchmarks/bench_components.py
+    python benchmarks/bench_components.py --limit 500 --batch-size 32
+    python benchmarks/bench_components.py --proxy /tmp/proxy_pl
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import spacy
+from spacy.language import Language
+from spacy.tokens import Token
+from spacy.training import Example
+
+from _common import DEFAULT_CORPUS, load_lines
+
+from masker import TextAnonymizer, masked_components_default
+
+CONFIGS = {
+    "domyślna": [name for name, enabled in masked_components_default.items() if enabled],
+    "persname": ["persname_mask"],
+    "orgname": ["orgname_mask"],
+    "date": ["date_mask"],
+    "id_numbers": ["id_numbers_mask"],
+    "bez orgname/date": [
+        "persname_mask", "contact_mask", "address_mask", "id_numbers_mask",
+    ],
+}
+
+# Etykiety potoku zastępczego (--proxy): liczby zbliżone do modeli pl spaCy
+PROXY_POS = ["NOUN", "VERB", "ADJ", "ADP", "PUNCT", "PROPN", "NUM", "ADV", "PRON", "CCONJ", "DET", "AUX"]
+PROXY_TAGS = 200
+PROXY_DEPS = ["nmod", "obj", "amod", "case", "nsubj", "obl", "punct", "advmod", "conj", "det"]
+PROXY_ENTS = ["persName", "orgName", "placeName", "date", "geogName", "time"]
+PROXY_EXAMPLES = 500
+
+
+@Language.component("bench_properness")
+def bench_properness(doc):
+    # W pl_nask token._.properness (etykiety imię/nazwisko) ustawia model
+    return doc
+
+
+def rss_mb() -> float:
+    # ru_maxrss na Linuksie jest w KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_proxy(path: str, lines: list[str]) -> None:
+    # Nietrenowany potok pl z komponentami o nazwach jak w pl_nask, zainicjalizowany
+    # etykietami z syntetycznych przykładów (zdania z korpusu)
+    nlp = spacy.blank("pl")
+    nlp.add_pipe("tok2vec")
+    nlp.add_pipe("tagger")
+    nlp.add_pipe("morphologizer")
+    nlp.add_pipe("parser")
+    nlp.add_pipe("trainable_lemmatizer", name="lemmatizer")
+    nlp.add_pipe("ner")
+    nlp.add_pipe("bench_properness")
+
+    def examples():
+        for number, text in enumerate(lines[:PROXY_EXAMPLES]):
+            doc = nlp.make_doc(text)
+            words = [token.text for token in doc]
+            ents = ["O"] * len(words)
+            for position in range(1, len(words), 5):
+                ents[position] = "U-" + PROXY_ENTS[(number + position) % len(PROXY_ENTS)]
+            yield Example.from_dict(doc, {
+                "words": words,
+                "tags": [f"t{(number + position * 7) % PROXY_TAGS}" for position in range(len(words))],
+                "pos": [PROXY_POS[(number + position) % len(PROXY_POS)] for position in range(len(words))],
+                "morphs": [f"Case={('Nom', 'Gen', 'Dat', 'Acc', 'Ins', 'Loc')[position % 6]}" for position in range(len(words))],
+                "heads": [max(position - 1, 0) for position in range(len(words))],
+                "deps": ["ROOT" if position == 0 else PROXY_DEPS[(number + position) % len(PROXY_DEPS)] for position in range(len(words))],
+                "lemmas": [word.lower() for word in words],
+                "entities": ents,
+            })
+
+    nlp.initialize(examples)
+    nlp.to_disk(path)
+
+
+def run_config(model, masks, prune, lines, batch_size):
+    if not Token.has_extension("properness"):
+        Token.set_extension("properness", default=())
+    masked_components = {name: name in masks for name in masked_components_default}
+    rss_base = rss_mb()
+    start = time.perf_counter()
+    anonymizer = TextAnonymizer(model_name=model, masked_components=masked_components, prune_components=prune)
+    startup = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    start = time.perf_counter()
+    output = list(anonymizer.mask_many(lines, batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+    return startup, elapsed, (rss_base, rss_loaded, rss_mb()), len(anonymizer.nlp.pipe_names), output
+
+
+def measure(model, masks, prune, lines, batch_size):
+    # Świeży proces na każdy pomiar – RSS nie zawiera poprzednich modeli
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_config, model, masks, prune, lines, batch_size).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark przycinania komponentów potoku")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=300, help="Liczba linii")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    parser.add_argument("--model", default="pl_nask", help="Model spaCy (nazwa pakietu albo katalog)")
+    parser.add_argument(
+        "--proxy",
+        default=None,
+        help="Katalog nietrenowanego potoku zastępczego (budowany, jeśli go nie ma) zamiast --model",
+    )
+    args = parser.parse_args()
+
+    all_lines = load_lines(args.file)
+    lines = all_lines[: args.limit]
+    model = args.model
+    if args.proxy:
+        if not os.path.isdir(args.proxy):
+            build_proxy(args.proxy, all_lines)
+        model = args.proxy
+    print(f"Model: {model}  linie: {len(lines)}")
+    print(
+        f"{'konfiguracja':<18} {'tryb':<9} {'komp.':>5} {'start [s]':>10} {'RSS przed':>10} "
+        f"{'RSS model':>10} {'RSS szczyt':>10} {'linie/s':>9}  zgodność"
+    )
+    failed = False
+    for label, masks in CONFIGS.items():
+        reference = None
+        for prune in (False, True):
+            startup, elapsed, (rss_base, rss_loaded, rss_peak), pipes, output = measure(
+                model, masks, prune, lines, args.batch_size
+            )
+            if reference is None:
+                reference = output
+            failed |= output != reference
+            same = "tak" if output == reference else "NIE"
+            mode = "przycięty" if prune else "pełny"
+            print(
+                f"{label:<18} {mode:<9} {pipes:>5} {startup:>10.1f} {rss_base:>10.0f} "
+                f"{rss_loaded - rss_base:>10.0f} {rss_peak:>10.0f} {len(lines) / elapsed:>9.1f}  {same}"
+            )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark indeksu kontekstu dat (DateContextIndex) w should_mask_date_token.
+
+Dawna wersja dla każdego tokenu składa okno 7 tokenów i szuka w nim słów
+kluczowych i nazw miesięcy; nowa buduje indeks raz na dokument. Test zgodności
+obejmuje każdy token każdej linii korpusu, a czas mierzony jest na liniach
+z największą liczbą dat (orzeczenia, pozwolenia na budowę).
+
+Model pl_nask nie jest potrzebny: dokumenty tworzy tokenizator spacy.blank("pl").
+
+Usage:
+    python benchmarks/bench_date_context.py
+    python benchmarks/bench_date_context.py --densest 100 --repeat 5
+"""
+
+import argparse
+import re
+
+import spacy
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+
+from masker import DATE_DMY_REGEX, DATE_D_MONTH_Y_REGEX, MONTH_WORDS, DateContextIndex
+
+
+def window_should_mask_date_token(token) -> bool:
+    """Dawne zachowanie: okno ±3 tokenów budowane i przeszukiwane dla każdego tokenu."""
+    text_val = token.text
+    lower = text_val.lower()
+    if re.search(r"\d{1,2}[./-]\d{1,2}[./-]\d{2,4}", text_val):
+        return True
+    if lower in MONTH_WORDS:
+        return True
+    doc = token.doc
+    start = max(0, token.i - 3)
+    end = min(len(doc), token.i + 4)
+    window = " ".join(t.text.lower() for t in doc[start:end])
+    date_keywords = [
+        "z dnia",
+        "data urodzenia",
+        "urodzony",
+        "urodzona",
+        "urodz.",
+        "rok",
+        "r.",
+        "r ",
+        "dnia",
+    ]
+    if any(kw in window for kw in date_keywords):
+        return True
+    if any(month in window for month in MONTH_WORDS):
+        return True
+    return False
+
+
+def date_count(line: str) -> int:
+    return len(DATE_DMY_REGEX.findall(line)) + len(DATE_D_MONTH_Y_REGEX.findall(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indeksu kontekstu dat")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--densest", "-n", type=int, default=50, help="Linie z największą liczbą dat")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    nlp = spacy.blank("pl")
+    anonymizer = regex_only_anonymizer()
+    lines = load_lines(args.file)
+    docs = list(nlp.pipe(lines))
+
+    mismatches = 0
+    for doc in docs:
+        date_context = DateContextIndex(doc)
+        for token in doc:
+            if window_should_mask_date_token(token) != anonymizer.should_mask_date_token(token, date_context):
+                mismatches += 1
+    tokens = sum(len(doc) for doc in docs)
+    print(f"Linie: {len(lines)}  tokeny: {tokens}  różnice: {mismatches}")
+
+    dense = sorted(docs, key=lambda doc: date_count(doc.text), reverse=True)[: args.densest]
+
+    def before():
+        return [[window_should_mask_date_token(t) for t in doc] for doc in dense]
+
+    def after():
+        results = []
+        for doc in dense:
+            date_context = DateContextIndex(doc)
+            results.append([anonymizer.should_mask_date_token(t, date_context) for t in doc])
+        return results
+
+    t_before = best_of(before, args.repeat)
+    t_after = best_of(after, args.repeat)
+    print(
+        f"{len(dense)} linii z największą liczbą dat ({sum(len(d) for d in dense)} tokenów, "
+        f"{sum(date_count(d.text) for d in dense)} dat)"
+    )
+    print(f"okno na token:   {t_before:.3f} s")
+    print(f"indeks na Doc:   {t_after:.3f} s  (x{t_before / t_after:.1f})")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
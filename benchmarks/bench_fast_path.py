@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Pomiar szybkiej ścieżki (--fast-path) maskera na nask_train.
+
+Szybka ścieżka ocenia każde zdanie linii (split_segments) wstępną selekcją
+needs_nlp(); do modelu trafiają tylko zdania z sygnałem (z zakładką kontekstu),
+a reszta jest maskowana samymi regexami. Raportujemy odsetek pominiętych zdań,
+znaków i całych linii.
+
+Fałszywe negatywy liczone są względem wzorca (--gold, domyślnie nask_train/orig.txt):
+encja wzorca z kategorii, którą może oznaczyć NER/priv_masker, leżąca w pominiętym
+tekście i nieznaleziona przez regexy, to encja zgubiona przez szybką ścieżkę. Ten
+pomiar nie wymaga modelu. Gdy pl_nask jest zainstalowany, dodatkowo sprawdzamy
+spany pełnego pipeline'u zaczynające się w pominiętym tekście oraz porównujemy
+czas i wyjście trybu pełnego i szybkiego.
+
+Usage:
+    python benchmarks/bench_fast_path.py
+    python benchmarks/bench_fast_path.py --max-fn-rate 0.001
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+
+import spacy
+
+from _common import DEFAULT_CORPUS, REPO_ROOT, load_lines
+
+from evaluate import GOLD_PLACEHOLDER_REGEX, normalize_gold, read_pairs, template_spans
+from masker import TextAnonymizer, split_segments
+
+# Kategorie wzorca, które oznacza NER/priv_masker (pozostałe maskują tylko regexy)
+NER_CATEGORIES = {
+    "name", "surname", "email", "phone", "address", "city", "date", "date-of-birth",
+    "pesel", "document-number", "company", "school-name",
+}
+
+
+def skipped_ranges(text: str, windows) -> list[tuple[int, int]]:
+    # Fragmenty linii poza rdzeniami okien – maskowane tylko regexami
+    ranges = []
+    position = 0
+    for _, _, core_start, core_end in windows:
+        if core_start > position:
+            ranges.append((position, core_start))
+        position = core_end
+    if position < len(text):
+        ranges.append((position, len(text)))
+    return ranges
+
+
+def overlaps(start: int, end: int, ranges) -> bool:
+    return any(start < range_end and end > range_start for range_start, range_end, *_ in ranges)
+
+
+def gold_report(anonymizer, input_path: str, gold_path: str, examples: int) -> float:
+    lines = segments = skipped_segments = chars = skipped_chars = skipped_lines = 0
+    gold_total = in_skipped = 0
+    missed = Counter()
+    missed_examples = []
+    for raw, template in read_pairs(input_path, gold_path, None):
+        parts = split_segments(raw)
+        segments += (len(parts) + 1) // 2
+        skipped_segments += sum(not anonymizer.needs_nlp(part) for part in parts[::2])
+        windows = anonymizer.fast_path_windows(raw)
+        ranges = skipped_ranges(raw, windows)
+        lines += 1
+        skipped_lines += not windows
+        chars += len(raw)
+        skipped_chars += sum(end - start for start, end in ranges)
+        regex_spans = anonymizer.build_regex_spans(raw) if ranges else []
+        for start, end, label in template_spans(raw, template, GOLD_PLACEHOLDER_REGEX):
+            label = normalize_gold(label)
+            if label not in NER_CATEGORIES:
+                continue
+            gold_total += 1
+            if not overlaps(start, end, ranges):
+                continue
+            in_skipped += 1
+            if not overlaps(start, end, regex_spans):
+                missed[label] += 1
+                missed_examples.append(f"{raw[max(0, start - 40):start]}[{raw[start:end]}]{raw[end:end + 10]}")
+
+    fn_rate = sum(missed.values()) / max(gold_total, 1)
+    print(f"Linie: {lines}  zdania: {segments}")
+    print(
+        f"Pominięte: zdania {skipped_segments} ({skipped_segments / segments:.1%}), "
+        f"znaki {skipped_chars / chars:.1%}, całe linie {skipped_lines} ({skipped_lines / lines:.1%})"
+    )
+    print(
+        f"Encje wzorca (NER): {gold_total}  w pominiętym tekście: {in_skipped}  "
+        f"zgubione: {sum(missed.values())} ({fn_rate:.3%})"
+    )
+    for label, count in missed.most_common():
+        print(f"  {label:<20} {count}")
+    for example in missed_examples[:examples]:
+        print(f"  FN: {example!r}")
+    return fn_rate
+
+
+def model_report(anonymizer, lines: list[str], batch_size: int, examples: int) -> None:
+    enabled_masks = [c for c, enabled in anonymizer.masked_components.items() if enabled]
+    start = time.perf_counter()
+    docs = list(anonymizer.nlp.pipe(lines, batch_size=batch_size))
+    parse_time = time.perf_counter() - start
+
+    fn_lines = []
+    fn_categories = Counter()
+    for text, doc in zip(lines, docs):
+        ranges = skipped_ranges(text, anonymizer.fast_path_windows(text))
+        if not ranges:
+            continue
+        regex_spans = anonymizer.build_regex_spans(text)
+        token_spans = [
+            span
+            for span in anonymizer.build_token_spans(doc, text, enabled_masks, regex_spans)
+            if overlaps(span[0], span[0] + 1, ranges)
+        ]
+        if token_spans:
+            fn_lines.append((text, token_spans))
+            fn_categories.update(placeholder for _, _, placeholder in token_spans)
+    del docs
+
+    anonymizer.fast_path = False
+    start = time.perf_counter()
+    full = list(anonymizer.mask_many(lines, batch_size=batch_size))
+    full_time = time.perf_counter() - start
+
+    anonymizer.fast_path = True
+    start = time.perf_counter()
+    fast = list(anonymizer.mask_many(lines, batch_size=batch_size))
+    fast_time = time.perf_counter() - start
+
+    print(f"Model pl_nask (parsowanie: {parse_time:.1f} s)")
+    print(f"Linie ze spanami pipeline'u w pominiętym tekście: {len(fn_lines)} ({len(fn_lines) / len(lines):.3%})")
+    for placeholder, count in fn_categories.most_common():
+        print(f"  {placeholder:<20} {count}")
+    print(f"Różne wyjścia pełny/szybki: {sum(a != b for a, b in zip(full, fast))}")
+    print(f"Czas pełny: {full_time:.1f} s  szybki: {fast_time:.1f} s  (x{full_time / fast_time:.2f})")
+    for text, spans in fn_lines[:examples]:
+        found = ", ".join(f"{text[s:e]!r}->{p}" for s, e, p in spans)
+        print(f"  FN: {text[:100]!r}  [{found}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomiar szybkiej ścieżki maskera")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument(
+        "--gold", default=str(REPO_ROOT / "nask_train" / "orig.txt"), help="Wzorzec z etykietami [name] itd."
+    )
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    parser.add_argument("--examples", type=int, default=5, help="Liczba przykładów FN")
+    parser.add_argument(
+        "--max-fn-rate",
+        type=float,
+        default=None,
+        help="Kod wyjścia 1, gdy odsetek zgubionych encji wzorca przekroczy próg",
+    )
+    args = parser.parse_args()
+
+    if spacy.util.is_package("pl_nask"):
+        anonymizer = TextAnonymizer(fast_path=True)
+    else:
+        anonymizer = TextAnonymizer(fast_path=True, no_ner=True)
+    fn_rate = gold_report(anonymizer, args.file, args.gold, args.examples)
+    if anonymizer.nlp is not None:
+        model_report(anonymizer, load_lines(args.file), args.batch_size, args.examples)
+    else:
+        print("Brak pl_nask: pominięto porównanie z pełnym pipeline'em.")
+
+    if args.max_fn_rate is not None and fn_rate > args.max_fn_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark maskowania wybranych pól JSONL (masker.py --json-field).
+
+Z korpusu budowane są rekordy czatu: metadane (w tym numer telefonu, który ma
+zostać nietknięty) i lista messages z --messages wiadomościami. Porównywane są:
+- wyszukiwanie pól selektorem (JsonFieldSelector.find) z pełnym json.loads rekordu,
+- mask_jsonl z maskowaniem samych treści jako linii tekstu (mask_many),
+- wynik: treści jak z mask_many, a wszystko poza literałami treści identyczne
+  bajt w bajt z wejściem.
+
+Bez modelu pl_nask (lub z --model blank) użyty jest tokenizator spacy.blank("pl")
+z regułą z bench_token_spans.py.
+
+Usage:
+    python benchmarks/bench_jsonl.py
+    python benchmarks/bench_jsonl.py --model blank --messages 4
+"""
+
+import argparse
+import json
+import time
+
+from _common import DEFAULT_CORPUS, best_of, load_lines
+
+from bench_stages import load_anonymizer
+
+from masker import JsonFieldSelector, mask_jsonl
+
+SELECTOR = "$.messages[*].content"
+
+
+def chat_records(lines: list[str], messages: int) -> list[str]:
+    records = []
+    for number, start in enumerate(range(0, len(lines), messages)):
+        record = {
+            "id": number,
+            "meta": {"source": "nask_train", "created": "2024-05-01T10:00:00", "agent_phone": "600 700 800"},
+            "messages": [
+                {"role": "user" if index % 2 == 0 else "assistant", "content": line}
+                for index, line in enumerate(lines[start:start + messages])
+            ],
+        }
+        records.append(json.dumps(record, ensure_ascii=False) + "\n")
+    return records
+
+
+def outside_selected(selector: JsonFieldSelector, line: str) -> str:
+    # Rekord bez literałów wybranych napisów
+    parts = []
+    last = 0
+    for start, end, _ in selector.find(line):
+        parts.append(line[last:start])
+        last = end
+    parts.append(line[last:])
+    return "\x00".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark maskowania pól JSONL")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=None, help="Liczba linii (domyślnie wszystkie)")
+    parser.add_argument("--model", default="pl_nask", help="Model spaCy albo \"blank\"")
+    parser.add_argument("--messages", type=int, default=3, help="Wiadomości w rekordzie")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Napisy na paczkę")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)[: args.limit]
+    records = chat_records(lines, args.messages)
+    selector = JsonFieldSelector([SELECTOR])
+    anonymizer, model = load_anonymizer(args.model)
+    for line in lines[:200]:
+        anonymizer.mask(line)
+
+    t_find = best_of(lambda: [selector.find(record) for record in records], args.repeat)
+    t_loads = best_of(lambda: [json.loads(record) for record in records], args.repeat)
+
+    start = time.perf_counter()
+    expected = list(anonymizer.mask_many(lines, batch_size=args.batch_size))
+    t_text = time.perf_counter() - start
+    start = time.perf_counter()
+    output = list(mask_jsonl(anonymizer, records, selector, args.batch_size))
+    t_jsonl = time.perf_counter() - start
+
+    masked_contents = [message["content"] for record in output for message in json.loads(record)["messages"]]
+    same_contents = masked_contents == expected
+    unchanged_rest = sum(
+        outside_selected(selector, before) == outside_selected(selector, after)
+        for before, after in zip(records, output)
+    )
+
+    print(f"Model: {model}  rekordy: {len(records)}  treści: {len(lines)}")
+    print(f"JsonFieldSelector.find: {t_find * 1000:.1f} ms   pełny json.loads: {t_loads * 1000:.1f} ms")
+    print(f"mask_many (same treści): {t_text:.3f} s  ({len(lines) / t_text:.0f} treści/s)")
+    print(f"mask_jsonl:              {t_jsonl:.3f} s  ({len(lines) / t_jsonl:.0f} treści/s)")
+    print(f"treści zgodne z mask_many: {'tak' if same_contents else 'NIE'}")
+    print(f"rekordy identyczne bajtowo poza treściami: {unchanged_rest}/{len(records)}")
+    if not same_contents or unchanged_rest != len(records):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
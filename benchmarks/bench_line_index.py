@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark indeksu linii (line_index.LineIndex) używanego przez --sample-size maskera
+oraz `test --line` / `--random-n` w synthesize.
+
+Korpus (powielony --scale razy) zapisywany jest do pliku tymczasowego. Mierzone są:
+budowa indeksu (jedno przejście po mmap), ponowne otwarcie z zapisanego <plik>.lines,
+pobranie --lookups losowych linii (indeks wobec wczytania pliku przez readlines())
+i próbka --sample linii (indexed_sample wobec jednoprzebiegowego reservoir_sample).
+Linie z indeksu są porównywane z czytaniem pliku w trybie tekstowym, a podział
+split() sprawdzany pod kątem ciągłości i rozkładu bajtów między częściami.
+
+Usage:
+    python benchmarks/bench_line_index.py
+    python benchmarks/bench_line_index.py --scale 1 16 --sample 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from _common import DEFAULT_CORPUS, best_of, load_lines
+
+from line_index import LineIndex
+
+from masker import indexed_sample, read_lines, reservoir_sample
+
+
+def readlines_lookup(path: str, numbers: list[int]) -> list[str]:
+    # Dotychczasowy sposób w synthesize: cały plik w pamięci, potem indeksowanie listy
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    return [lines[number].rstrip("\n") for number in numbers]
+
+
+def index_lookup(path: str, numbers: list[int]) -> list[str]:
+    with LineIndex(path) as index:
+        return [index.line(number) for number in numbers]
+
+
+def reservoir(path: str, sample_size: int) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return reservoir_sample(read_lines(f), sample_size, random.Random(0))
+
+
+def indexed(path: str, sample_size: int) -> list[str]:
+    with LineIndex(path) as index:
+        return indexed_sample(index, sample_size, random.Random(0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indeksu linii")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 16], help="Krotności powielenia korpusu")
+    parser.add_argument("--lookups", type=int, default=20, help="Liczba losowych linii do pobrania")
+    parser.add_argument("--sample", type=int, default=100, help="Rozmiar próbki")
+    parser.add_argument("--parts", type=int, default=4, help="Liczba części split()")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)
+    print(
+        f"{'skala':<6} {'linie':>8} {'MiB':>6} {'budowa':>8} {'wczyt.':>8} {'readlines':>10} {'indeks':>8} "
+        f"{'rezerwuar':>10} {'indeks':>8} {'części (MiB)':>20}  zgodność"
+    )
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scale:
+            path = os.path.join(directory, f"corpus_x{scale}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                for line in lines * scale:
+                    f.write(line + "\n")
+
+            def build():
+                if os.path.exists(path + ".lines"):
+                    os.remove(path + ".lines")
+                LineIndex(path).close()
+
+            t_build = best_of(build, args.repeat)
+            t_load = best_of(lambda: LineIndex(path).close(), args.repeat)
+
+            with LineIndex(path) as index:
+                numbers = random.Random(1).sample(range(len(index)), min(args.lookups, len(index)))
+                with open(path, "r", encoding="utf-8") as f:
+                    consistent = list(index) == [line.rstrip("\n") for line in f]
+                parts = index.split(args.parts)
+                contiguous = parts[0][0] == 0 and parts[-1][1] == len(index) and all(
+                    stop == first for (_, stop), (first, _) in zip(parts, parts[1:])
+                )
+                part_bytes = [end - start for start, end in (index.byte_range(*part) for part in parts)]
+                line_count, size = len(index), index.size
+
+            t_readlines = best_of(lambda: readlines_lookup(path, numbers), args.repeat)
+            t_lookup = best_of(lambda: index_lookup(path, numbers), args.repeat)
+            consistent &= readlines_lookup(path, numbers) == index_lookup(path, numbers)
+            t_reservoir = best_of(lambda: reservoir(path, args.sample), args.repeat)
+            t_indexed = best_of(lambda: indexed(path, args.sample), args.repeat)
+            # Próbka z indeksu to inne losowanie niż rezerwuar, ale z tych samych linii
+            population = set(lines)
+            sample = indexed(path, args.sample)
+            consistent &= len(sample) == min(args.sample, line_count) and population.issuperset(sample)
+            consistent &= contiguous and sum(part_bytes) == size
+
+            failed |= not consistent
+            print(
+                f"{'x' + str(scale):<6} {line_count:>8} {size / 2**20:>6.1f} {t_build * 1000:>6.1f}ms "
+                f"{t_load * 1000:>6.2f}ms {t_readlines * 1000:>8.1f}ms {t_lookup * 1000:>6.2f}ms "
+                f"{t_reservoir * 1000:>8.1f}ms {t_indexed * 1000:>6.2f}ms "
+                f"{'/'.join(f'{b / 2**20:.1f}' for b in part_bytes):>20}  {'tak' if consistent else 'NIE'}"
+            )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark metryk maskowania (MaskMetrics, --metrics-out).
+
+Mierzy mask_many bez metryk i z metrykami (TextAnonymizer.instrument), sprawdza
+identyczność wyniku i wypisuje zebrane metryki: czasy etapów, najdroższe detektory
+regexowe i liczby spanów na kategorię. Koszt wyłączonych metryk to sprawdzenie
+`if mark` w aktywnych detektorach – porównanie z etapem regexów bez metryk.
+
+Bez modelu pl_nask (lub z --model blank) użyty jest tokenizator spacy.blank("pl")
+z regułą z bench_token_spans.py.
+
+Usage:
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --output metrics.json
+"""
+
+import argparse
+import json
+import time
+
+from _common import DEFAULT_CORPUS, best_of, load_lines
+
+from bench_stages import load_anonymizer
+
+from masker import MaskMetrics
+
+
+def timed(anonymizer, lines, batch_size) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    output = list(anonymizer.mask_many(lines, batch_size=batch_size))
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metryk maskowania")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=None, help="Liczba linii (domyślnie wszystkie)")
+    parser.add_argument("--model", default="pl_nask", help="Model spaCy albo \"blank\"")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    parser.add_argument("--output", "-o", default=None, help="Zapisz metryki do pliku JSON")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)[: args.limit]
+    anonymizer, model = load_anonymizer(args.model)
+    t_regex_plain = best_of(lambda: [anonymizer.build_regex_spans(line) for line in lines], args.repeat)
+    t_plain, plain = min(timed(anonymizer, lines, args.batch_size) for _ in range(args.repeat))
+
+    metrics = MaskMetrics()
+    anonymizer.instrument(metrics)
+    t_measured, measured = timed(anonymizer, lines, args.batch_size)
+    summary = metrics.to_dict()
+    metrics.drain()
+    t_regex_measured = best_of(lambda: [anonymizer.build_regex_spans(line) for line in lines], args.repeat)
+
+    print(f"Model: {model}  linie: {len(lines)}")
+    print(f"mask_many bez metryk: {t_plain:.3f} s")
+    print(f"mask_many z metrykami: {t_measured:.3f} s  ({(t_measured - t_plain) / t_plain:+.0%})")
+    print(f"regexy bez metryk: {t_regex_plain:.3f} s  z metrykami: {t_regex_measured:.3f} s")
+    print(f"zgodność: {'tak' if plain == measured else 'NIE'}  linie w metrykach: {summary['lines']}")
+
+    print(f"\n{'etap':<32} {'liczba':>8} {'suma [s]':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for stage, entry in summary["stages"].items():
+        print(
+            f"{stage:<32} {entry['count']:>8} {entry['total_s']:>9.3f} "
+            f"{entry['p50_ms']:>8.3f} {entry['p99_ms']:>8.3f}"
+        )
+    detectors = sorted(summary["detectors"].items(), key=lambda item: -item[1]["seconds"])
+    print(f"\n{'detektor':<24} {'spany':>7} {'czas [s]':>9}")
+    for name, entry in detectors[:10]:
+        print(f"{name:<24} {entry['spans']:>7} {entry['seconds']:>9.3f}")
+    print("\nKategorie: " + ", ".join(f"{name} {count}" for name, count in summary["categories"].items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    if plain != measured or summary["lines"] != len(lines):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark wspólnego cache analiz morfeusz2 (morphology.MorphologyCache, --morfeusz).
+
+Strumień słów korpusu analizowany jest bez cache, z LRU różnych rozmiarów (trafienia
+i czas), samym magazynem mmap (MorphologyStore zbudowany z tego samego korpusu do
+katalogu tymczasowego) oraz magazynem z LRU. Sprawdzana jest zgodność wyników z
+Morfeusz.analyse() dla wszystkich różnych form. Na końcu koszt --morfeusz w etapie
+regexów (imiona i nazwiska po tytule).
+
+Usage:
+    python benchmarks/bench_morphology.py
+    python benchmarks/bench_morphology.py --limit 50000 --sizes 1000 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+
+from morphology import WORD_REGEX, MorphologyCache, MorphologyStore
+
+
+def timed_analyse(cache, words) -> float:
+    start = time.perf_counter()
+    for word in words:
+        cache.analyse(word)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cache analiz morfeusz2")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=None, help="Liczba słów (domyślnie wszystkie)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Rozmiary LRU")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)
+    words = [word for line in lines for word in WORD_REGEX.findall(line)][: args.limit]
+    forms = list(dict.fromkeys(words))
+    print(f"Słowa: {len(words)}  różne formy: {len(forms)}")
+
+    uncached = MorphologyCache(max_entries=0)
+    start = time.perf_counter()
+    reference = {form: uncached.analyse_uncached(form) for form in forms}
+    t_forms = time.perf_counter() - start
+    t_uncached = t_forms / len(forms) * len(words)
+    print(f"bez cache (szacunek):  {t_uncached:.3f} s  ({t_forms / len(forms) * 1e6:.1f} µs/słowo)")
+
+    for size in args.sizes:
+        cache = MorphologyCache(size)
+        elapsed = timed_analyse(cache, words)
+        print(f"LRU {size:>7}:           {elapsed:.3f} s  {cache.stats()}")
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        MorphologyStore.compile(reference.items(), directory)
+        t_compile = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in MorphologyStore.FILES)
+        start = time.perf_counter()
+        store_only = MorphologyCache(max_entries=0, store=directory)
+        t_load = time.perf_counter() - start
+        print(
+            f"Magazyn: {len(store_only.store)} form  {size / 2**20:.1f} MiB  "
+            f"budowa (bez analiz): {t_compile:.2f} s  ładowanie: {t_load * 1000:.2f} ms"
+        )
+        elapsed = timed_analyse(store_only, words)
+        print(f"sam magazyn:           {elapsed:.3f} s  {store_only.stats()}")
+        layered = MorphologyCache(args.sizes[-1], store=directory)
+        elapsed = timed_analyse(layered, words)
+        print(f"magazyn + LRU {args.sizes[-1]}: {elapsed:.3f} s  {layered.stats()}")
+        mismatched = sum(store_only.analyse(form) != analysis for form, analysis in reference.items())
+        print(f"zgodność z Morfeusz.analyse(): {'tak' if not mismatched else f'NIE ({mismatched} form)'}")
+        failed = bool(mismatched)
+
+    anonymizer = regex_only_anonymizer()
+    t_plain = best_of(lambda: [anonymizer.mask_regex_only(line) for line in lines], args.repeat)
+    anonymizer.morphology = MorphologyCache()
+    t_morph = best_of(lambda: [anonymizer.mask_regex_only(line) for line in lines], args.repeat)
+    persons = sum(len(anonymizer.morph_person_spans(line)) for line in lines)
+    print(f"regexy bez --morfeusz: {t_plain:.3f} s")
+    print(f"regexy z --morfeusz:   {t_morph:.3f} s  ({(t_morph - t_plain) / t_plain:+.0%}, osoby po tytule: {persons})")
+    print(anonymizer.morphology.stats())
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
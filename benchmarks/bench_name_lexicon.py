@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark leksykonu imion i nazwisk (NameLexicon, --name-lexicon, --no-ner).
+
+Mierzy czas ładowania leksykonu (mmap), koszt find_persons() na korpusie oraz
+przepustowość trybu --no-ner (regexy + leksykon, bez spaCy) w porównaniu z samymi
+regexami. Bez --lexicon leksykon budowany jest do katalogu tymczasowego przez
+build_name_lexicon.py (wymaga morfeusz2 i danych priv_masker).
+
+Usage:
+    python benchmarks/bench_name_lexicon.py --lexicon name_lexicon
+    python benchmarks/bench_name_lexicon.py --min-count 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+
+import build_name_lexicon
+from lexicons import NameLexicon
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark leksykonu imion i nazwisk")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--lexicon", default=None, help="Gotowy katalog leksykonu")
+    parser.add_argument("--min-count", type=int, default=10, help="Próg budowy bez --lexicon")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.lexicon
+        if path is None:
+            path = directory
+            start = time.perf_counter()
+            entries = build_name_lexicon.entries(build_name_lexicon.default_source_dir(), args.min_count)
+            NameLexicon.compile(entries, path)
+            print(f"Budowa (min-count {args.min_count}): {time.perf_counter() - start:.1f} s")
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in NameLexicon.FILES)
+        start = time.perf_counter()
+        lexicon = NameLexicon(path)
+        t_load = time.perf_counter() - start
+        print(f"Formy: {len(lexicon.hashes)}  rozmiar: {size / 2**20:.1f} MiB  ładowanie: {t_load * 1000:.2f} ms")
+
+        t_find = best_of(lambda: [lexicon.find_persons(line) for line in lines], args.repeat)
+        persons = sum(len(lexicon.find_persons(line)) for line in lines)
+        anonymizer = regex_only_anonymizer()
+        t_regex = best_of(lambda: [anonymizer.mask_regex_only(line) for line in lines], args.repeat)
+        anonymizer.name_lexicon = lexicon
+        t_no_ner = best_of(lambda: [anonymizer.mask_regex_only(line) for line in lines], args.repeat)
+
+    print(f"Linie: {len(lines)}  osoby z leksykonu: {persons}")
+    print(f"find_persons():      {t_find:.3f} s  ({len(lines) / t_find:.0f} linii/s)")
+    print(f"same regexy:         {t_regex:.3f} s  ({len(lines) / t_regex:.0f} linii/s)")
+    print(f"--no-ner z leksykonem: {t_no_ner:.3f} s  ({len(lines) / t_no_ner:.0f} linii/s)")
+
+
+if __name__ == "__main__":
+    main()
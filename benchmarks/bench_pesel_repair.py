@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark naprawy PESEL-i uszkodzonych przez OCR (normalize_pesel_candidate).
+
+Porównuje rozwiązywanie brakujących cyfr z sumy kontrolnej z dawnym
+przeszukiwaniem itertools.product (do 100 wywołań is_valid_pesel na token).
+Test zgodności: dla każdej bazy (poprawne PESEL-e i losowe ciągi cyfr) każda
+pozycja i każda para pozycji jest zastępowana literą, a wynik obu wersji
+musi być identyczny. Dodatkowo mierzony jest czas na kandydatach z korpusu.
+
+Usage:
+    python benchmarks/bench_pesel_repair.py
+    python benchmarks/bench_pesel_repair.py --bases 1000 --repeat 5
+"""
+
+import argparse
+import random
+from itertools import combinations, product
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+
+from masker import PESEL_CANDIDATE_REGEX, PESEL_WEIGHTS
+
+
+def product_normalize_pesel_candidate(anonymizer, token: str) -> str | None:
+    """Dawne zachowanie: sprawdzenie wszystkich podstawień cyfr za litery."""
+    if len(token) != 11:
+        return None
+    if not token.isalnum():
+        return None
+    letter_positions = [i for i, ch in enumerate(token) if ch.isalpha()]
+    if len(letter_positions) > 2:
+        return None
+    if not letter_positions:
+        if anonymizer.is_valid_pesel(token):
+            return token
+        return None
+    base_digits = []
+    for ch in token:
+        if ch.isdigit():
+            base_digits.append(ch)
+        elif ch.isalpha():
+            base_digits.append(None)
+        else:
+            return None
+    for combo in product("0123456789", repeat=len(letter_positions)):
+        candidate_digits = list(base_digits)
+        for pos, digit in zip(letter_positions, combo):
+            candidate_digits[pos] = digit
+        candidate = "".join(candidate_digits)
+        if anonymizer.is_valid_pesel(candidate):
+            return candidate
+    return None
+
+
+def random_pesel(rng: random.Random) -> str:
+    year = rng.randint(1800, 2299)
+    month_offset = {18: 80, 19: 0, 20: 20, 21: 40, 22: 60}[year // 100]
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)
+    digits = [int(ch) for ch in f"{year % 100:02d}{month + month_offset:02d}{day:02d}"]
+    digits += [rng.randint(0, 9) for _ in range(4)]
+    checksum = sum(w * d for w, d in zip(PESEL_WEIGHTS, digits))
+    digits.append((10 - checksum % 10) % 10)
+    return "".join(map(str, digits))
+
+
+def damaged_variants(base: str, letters: str):
+    for count in (1, 2):
+        for positions in combinations(range(11), count):
+            token = list(base)
+            for pos in positions:
+                token[pos] = letters[pos % len(letters)]
+            yield "".join(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark naprawy PESEL")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--bases", "-n", type=int, default=300, help="Liczba baz w teście zgodności")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    anonymizer = regex_only_anonymizer()
+    rng = random.Random(args.seed)
+    bases = [random_pesel(rng) for _ in range(args.bases // 2)]
+    bases += ["".join(rng.choice("0123456789") for _ in range(11)) for _ in range(args.bases - len(bases))]
+    tokens = [token for base in bases for token in damaged_variants(base, "OlBIS")]
+
+    mismatches = 0
+    repaired = 0
+    for token in tokens:
+        expected = product_normalize_pesel_candidate(anonymizer, token)
+        actual = anonymizer.normalize_pesel_candidate(token)
+        repaired += actual is not None
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  RÓŻNICA {token}: product={expected} algebra={actual}")
+
+    t_product = best_of(
+        lambda: [product_normalize_pesel_candidate(anonymizer, t) for t in tokens], args.repeat
+    )
+    t_algebra = best_of(lambda: [anonymizer.normalize_pesel_candidate(t) for t in tokens], args.repeat)
+    print(f"Tokeny testowe: {len(tokens)}  naprawione: {repaired}  różnice: {mismatches}")
+    print(f"product: {t_product:.3f} s  algebra: {t_algebra:.3f} s  (x{t_product / t_algebra:.1f})")
+
+    corpus = [m.group(0) for line in load_lines(args.file) for m in PESEL_CANDIDATE_REGEX.finditer(line)]
+    t_product = best_of(
+        lambda: [product_normalize_pesel_candidate(anonymizer, t) for t in corpus], args.repeat
+    )
+    t_algebra = best_of(lambda: [anonymizer.normalize_pesel_candidate(t) for t in corpus], args.repeat)
+    print(
+        f"Kandydaci z korpusu: {len(corpus)}  product: {t_product:.3f} s  "
+        f"algebra: {t_algebra:.3f} s  (x{t_product / t_algebra:.1f})"
+    )
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
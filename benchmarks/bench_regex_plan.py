@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark planu detektorów (DETECTOR_PLAN) w TextAnonymizer.build_regex_spans.
+
+Porównuje przebieg z planem (pomijane detektory, które nie mogą nic dopasować)
+z przebiegiem uruchamiającym wszystkie detektory i sprawdza identyczność spanów.
+
+Usage:
+    python benchmarks/bench_regex_plan.py
+    python benchmarks/bench_regex_plan.py --file nask_train/orig.txt --repeat 5
+"""
+
+import argparse
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+from masker import DETECTOR_PLAN
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark planu detektorów regexowych")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)
+    anonymizer = regex_only_anonymizer()
+    all_detectors = DETECTOR_PLAN.detectors
+
+    full = [anonymizer.build_regex_spans(line, live=all_detectors) for line in lines]
+    planned = [anonymizer.build_regex_spans(line) for line in lines]
+    mismatches = sum(1 for a, b in zip(full, planned) if a != b)
+
+    t_full = best_of(
+        lambda: [anonymizer.build_regex_spans(line, live=all_detectors) for line in lines],
+        args.repeat,
+    )
+    t_plan = best_of(lambda: [anonymizer.build_regex_spans(line) for line in lines], args.repeat)
+    skipped = sum(len(all_detectors) - len(DETECTOR_PLAN.live_detectors(line)) for line in lines)
+    chars = sum(len(line) for line in lines)
+
+    print(f"Linie: {len(lines)}  znaki: {chars}")
+    print(f"Wszystkie detektory: {t_full:.3f} s  ({len(lines) / t_full:,.0f} linii/s)")
+    print(f"Plan detektorów:     {t_plan:.3f} s  ({len(lines) / t_plan:,.0f} linii/s)")
+    print(f"Przyspieszenie:      {t_full / t_plan:.2f}x")
+    print(f"Pominięte detektory: {skipped / len(lines):.1f} na linię (z {len(all_detectors)})")
+    print(f"Różnice w spanach:   {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
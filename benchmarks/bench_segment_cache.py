@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark cache zdań (--segment-cache).
+
+Bez modelu: trafienia w cache zdań na korpusie (z maskowaniem zastąpionym
+tożsamością, co sprawdza też, że sklejanie segmentów odtwarza linie) i koszt
+samego podziału na zdania. Z modelem pl_nask (jeśli jest zainstalowany): czas
+end-to-end z cache zdań i bez niego oraz liczba linii, których wynik się różni
+(zdania maskowane są bez kontekstu sąsiednich).
+
+Usage:
+    python benchmarks/bench_segment_cache.py
+    python benchmarks/bench_segment_cache.py --limit 1000 --batch-size 32
+"""
+
+import argparse
+import time
+
+from _common import DEFAULT_CORPUS, best_of, load_lines
+
+from masker import SegmentCache, TextAnonymizer, split_segments
+
+
+def timed(anonymizer, lines, batch_size):
+    start = time.perf_counter()
+    output = list(anonymizer.mask_many(lines, batch_size=batch_size))
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cache zdań")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=None, help="Liczba linii (domyślnie wszystkie)")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    parser.add_argument("--size", type=int, default=100_000, help="Rozmiar cache zdań")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)[: args.limit]
+    segment_cache = SegmentCache(args.size)
+    masked_chars = 0
+
+    def identity(segments):
+        nonlocal masked_chars
+        masked_chars += sum(map(len, segments))
+        return segments
+
+    stitched = list(segment_cache.mask_many(lines, args.batch_size, identity))
+    t_split = best_of(lambda: [split_segments(line) for line in lines])
+    total_chars = sum(map(len, lines))
+    print(f"Linie: {len(lines)}  znaki: {total_chars}")
+    print(segment_cache.stats())
+    print(f"Znaki do potoku: {masked_chars} ({masked_chars / total_chars:.1%})")
+    print(f"Podział na zdania: {t_split:.3f} s  sklejanie bez zmian: {'tak' if stitched == lines else 'NIE'}")
+    if stitched != lines:
+        raise SystemExit(1)
+
+    try:
+        plain = TextAnonymizer()
+    except OSError:
+        print("Brak modelu pl_nask – pomiar end-to-end pominięty.")
+        return
+    t_plain, reference = timed(plain, lines, args.batch_size)
+    t_cached, output = timed(TextAnonymizer(segment_cache_size=args.size), lines, args.batch_size)
+    changed = sum(a != b for a, b in zip(reference, output))
+    print(f"bez cache zdań: {t_plain:.2f} s")
+    print(f"z cache zdań:   {t_cached:.2f} s  (x{t_plain / t_cached:.2f})  różne linie: {changed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark trybu --shard i/N maskera i polecenia merge.
+
+Korpus (powielony --scale razy) przechodzi przez masker.py raz w całości i jako N
+shardów w osobnych procesach (po kolei – jak N maszyn, z czasem każdego procesu),
+po czym `masker.py merge` skleja wyniki. Sprawdzane jest, że sklejony plik jest
+identyczny z przebiegiem bez --shard, i podawany rozrzut liczby bajtów wejścia oraz
+czasu między shardami (najdłuższy shard wyznacza czas na N maszynach).
+
+Opcje po "--" trafiają do wszystkich wywołań masker.py (np. -- --no-ner).
+
+Usage:
+    python benchmarks/bench_shards.py --shards 4
+    python benchmarks/bench_shards.py --shards 2 4 8 --scale 4 -- --no-ner
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import DEFAULT_CORPUS, REPO_ROOT, load_lines
+
+from masker import SHARD_MANIFEST_SUFFIX
+
+
+def run_masker(arguments: list[str]) -> float:
+    command = [sys.executable, str(REPO_ROOT / "masker.py"), *arguments]
+    start = time.perf_counter()
+    result = subprocess.run(command, stderr=subprocess.DEVNULL)
+    if result.returncode:
+        raise SystemExit(f"masker.py zakończył się błędem: {' '.join(command)}")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trybu --shard maskera")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--shards", type=int, nargs="+", default=[4], help="Liczby shardów")
+    parser.add_argument("--scale", type=int, default=1, help="Krotność powielenia korpusu")
+    args, extra = parser.parse_known_args()
+    extra = [arg for arg in extra if arg != "--"]
+
+    lines = load_lines(args.file) * args.scale
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = os.path.join(directory, "in.txt")
+        with open(corpus, "w", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+        full = os.path.join(directory, "full.txt")
+        t_full = run_masker(["-i", corpus, "-o", full, *extra])
+        with open(full, "rb") as f:
+            expected = f.read()
+        print(f"Linie: {len(lines)}  bez --shard: {t_full:.2f} s")
+        print(f"{'N':>3} {'suma [s]':>9} {'max [s]':>8} {'min [s]':>8} {'bajty max/min':>14} {'merge [s]':>10}  zgodność")
+
+        failed = False
+        for shards in args.shards:
+            outputs, timings, sizes = [], [], []
+            for shard in range(shards):
+                output = os.path.join(directory, f"shard_{shards}_{shard}.txt")
+                timings.append(run_masker(["-i", corpus, "-o", output, "--shard", f"{shard}/{shards}", *extra]))
+                with open(output + SHARD_MANIFEST_SUFFIX, "r", encoding="utf-8") as f:
+                    start, end = json.load(f)["input"]["bytes"]
+                sizes.append(end - start)
+                outputs.append(output)
+            merged = os.path.join(directory, f"merged_{shards}.txt")
+            # Kolejność argumentów merge nie ma znaczenia – porządek bierze z manifestów
+            t_merge = run_masker(["merge", "-o", merged, *reversed(outputs)])
+            with open(merged, "rb") as f:
+                identical = f.read() == expected
+            failed |= not identical
+            print(
+                f"{shards:>3} {sum(timings):>9.2f} {max(timings):>8.2f} {min(timings):>8.2f} "
+                f"{max(sizes) / max(min(sizes), 1):>14.3f} {t_merge:>10.2f}  {'tak' if identical else 'NIE'}"
+            )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Stress-benchmark indeksu spanów (SpanIndex) w build_regex_spans / build_token_spans.
+
+Generuje linie z tysiącami kandydatów numerycznych (listy telefonów, numery ksiąg
+wieczystych, długie numery ogólne) i porównuje SpanIndex z liniowym sprawdzaniem
+nakładania się (zachowanie sprzed indeksu).
+
+Usage:
+    python benchmarks/bench_span_index.py
+    python benchmarks/bench_span_index.py --numbers 1000 2000 5000
+"""
+
+import argparse
+import random
+
+from _common import best_of, regex_only_anonymizer
+
+import masker
+
+
+class LinearSpanList(masker.SpanIndex):
+    """Dawne zachowanie: każde zapytanie przegląda wszystkie spany."""
+
+    def overlaps(self, start: int, end: int) -> bool:
+        for existing_start, existing_end in zip(self.starts, self.ends):
+            if not (end <= existing_start or start >= existing_end):
+                return True
+        return False
+
+    def add(self, start: int, end: int, placeholder: str) -> bool:
+        if self.overlaps(start, end):
+            return False
+        self.starts.append(start)
+        self.ends.append(end)
+        self.placeholders.append(placeholder)
+        return True
+
+    def spans(self) -> list:
+        return sorted(zip(self.starts, self.ends, self.placeholders), key=lambda s: s[0])
+
+
+def digit_heavy_line(numbers: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(numbers):
+        kind = i % 3
+        if kind == 0:
+            parts.append(f"tel. {rng.randint(500, 899)} {rng.randint(100, 999)} {rng.randint(100, 999)}")
+        elif kind == 1:
+            parts.append(f"KW nr GD1G/{rng.randint(0, 99999999):08d}/{rng.randint(0, 9)}")
+        else:
+            parts.append(f"{rng.randint(10, 99)}.{rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(10, 99)}")
+    return ", ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress-benchmark SpanIndex")
+    parser.add_argument("--numbers", "-n", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    anonymizer = regex_only_anonymizer()
+    span_index = masker.SpanIndex
+    print(f"{'kandydaci':>10} {'spany':>7} {'liniowo [s]':>12} {'SpanIndex [s]':>14} {'x':>7}")
+    for numbers in args.numbers:
+        line = digit_heavy_line(numbers)
+
+        masker.SpanIndex = LinearSpanList
+        try:
+            linear_spans = anonymizer.build_regex_spans(line)
+            t_linear = best_of(lambda: anonymizer.build_regex_spans(line), args.repeat)
+        finally:
+            masker.SpanIndex = span_index
+        indexed_spans = anonymizer.build_regex_spans(line)
+        t_indexed = best_of(lambda: anonymizer.build_regex_spans(line), args.repeat)
+
+        if linear_spans != indexed_spans:
+            raise SystemExit(f"Różne spany dla {numbers} kandydatów")
+        print(
+            f"{numbers:>10} {len(indexed_spans):>7} {t_linear:>12.3f} "
+            f"{t_indexed:>14.3f} {t_linear / t_indexed:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
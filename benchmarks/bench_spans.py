@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark API spanów (TextAnonymizer.analyze_many, MaskSpans).
+
+Porównuje mask_many (tekst) z analyze_many (kolumny start/end/kategoria) oraz dwa
+sposoby audytu maskowania – liczbę zamaskowanych znaków na kategorię: z kolumn
+MaskSpans (numpy, bez składania tekstu) i dotychczasowy, przez ponowne szukanie
+placeholderów regexem w zamaskowanym tekście i odtwarzanie ich pozycji w oryginale
+(podawana jest liczba linii, w których te pozycje się nie zgadzają). Sprawdza, że
+apply_spans() na wyniku analyze_many daje dokładnie wynik mask_many, i podaje
+pamięć spanów w kolumnach array("i") wobec listy krotek.
+
+Bez modelu pl_nask (lub z --model blank) użyty jest tokenizator spacy.blank("pl")
+z regułą z bench_token_spans.py.
+
+Usage:
+    python benchmarks/bench_spans.py
+    python benchmarks/bench_spans.py --model blank --limit 1000
+"""
+
+import argparse
+import re
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from _common import DEFAULT_CORPUS, load_lines
+
+from bench_stages import load_anonymizer
+
+from masker import SPAN_CATEGORIES
+
+PLACEHOLDER_REGEX = re.compile("|".join(map(re.escape, SPAN_CATEGORIES)))
+
+
+def timed(func) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def audit_from_spans(analyzed) -> np.ndarray:
+    # Zamaskowane znaki na kategorię prosto z kolumn
+    totals = np.zeros(len(SPAN_CATEGORIES), np.int64)
+    for spans in analyzed:
+        if spans:
+            starts, ends, categories = spans.columns()
+            totals += np.bincount(categories, ends - starts, len(SPAN_CATEGORIES)).astype(np.int64)
+    return totals
+
+
+def offsets_from_text(text: str, output: str) -> list[tuple[int, int, str]]:
+    # Dotychczasowy sposób: pozycje placeholderów odtwarzane z tekstu zamaskowanego –
+    # koniec spanu to miejsce, w którym w oryginale zaczyna się tekst po placeholderze
+    spans = []
+    matches = list(PLACEHOLDER_REGEX.finditer(output))
+    shift = 0
+    for index, match in enumerate(matches):
+        start = match.start() + shift
+        following = matches[index + 1].start() if index + 1 < len(matches) else len(output)
+        literal = output[match.end():following]
+        found = text.find(literal, start) if literal else -1
+        if found == -1:
+            end = len(text) if following == len(output) else start
+        else:
+            end = found
+        spans.append((start, end, match.group()))
+        shift = end - match.end()
+    return spans
+
+
+def audit_from_text(lines, masked) -> tuple[Counter, list]:
+    totals = Counter()
+    offsets = []
+    for text, output in zip(lines, masked):
+        spans = offsets_from_text(text, output)
+        offsets.append(spans)
+        for start, end, placeholder in spans:
+            totals[placeholder] += end - start
+    return totals, offsets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API spanów MaskSpans")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=None, help="Liczba linii (domyślnie wszystkie)")
+    parser.add_argument("--model", default="pl_nask", help="Model spaCy albo \"blank\"")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)[: args.limit]
+    anonymizer, model = load_anonymizer(args.model)
+    for line in lines[:200]:
+        anonymizer.mask(line)
+
+    t_mask, masked = min(
+        timed(lambda: list(anonymizer.mask_many(lines, batch_size=args.batch_size))) for _ in range(args.repeat)
+    )
+    t_analyze, analyzed = min(
+        timed(lambda: list(anonymizer.analyze_many(lines, batch_size=args.batch_size))) for _ in range(args.repeat)
+    )
+    mismatched = sum(
+        anonymizer.apply_spans(text, spans) != output for text, spans, output in zip(lines, analyzed, masked)
+    )
+    t_apply = min(
+        timed(lambda: [anonymizer.apply_spans(text, spans) for text, spans in zip(lines, analyzed)])[0]
+        for _ in range(args.repeat)
+    )
+    t_audit_spans, from_spans = min(timed(lambda: audit_from_spans(analyzed)) for _ in range(args.repeat))
+    t_audit_text, (from_text, text_offsets) = min(
+        timed(lambda: audit_from_text(lines, masked)) for _ in range(args.repeat)
+    )
+
+    spans_total = sum(map(len, analyzed))
+    column_bytes = sum(
+        sys.getsizeof(column) for spans in analyzed for column in (spans.starts, spans.ends, spans.categories)
+    )
+    tuple_bytes = sum(
+        sys.getsizeof(list(spans)) + sum(sys.getsizeof(span) for span in spans) for spans in analyzed
+    )
+    # Gdzie odtwarzanie z tekstu myli się co do pozycji (np. białe znaki na końcu spanu,
+    # które apply_spans przenosi za placeholder)
+    diverged = sum(list(spans) != offsets for spans, offsets in zip(analyzed, text_offsets))
+    audit_matches = all(from_text[placeholder] == from_spans[i] for i, placeholder in enumerate(SPAN_CATEGORIES))
+
+    print(f"Model: {model}  linie: {len(lines)}  spany: {spans_total}")
+    print(f"mask_many:               {t_mask:.3f} s  ({len(lines) / t_mask:.0f} linii/s)")
+    print(f"analyze_many:            {t_analyze:.3f} s  ({len(lines) / t_analyze:.0f} linii/s)")
+    print(f"apply_spans (osobno):    {t_apply:.3f} s")
+    print(f"audyt z kolumn:          {t_audit_spans * 1000:.1f} ms")
+    print(
+        f"audyt z tekstu (regex):  {t_audit_text * 1000:.1f} ms  sumy zgodne z kolumnami: "
+        f"{'tak' if audit_matches else 'nie'}, linie z innymi pozycjami: {diverged}"
+    )
+    print(f"pamięć: kolumny {column_bytes / 2**20:.2f} MiB, krotki {tuple_bytes / 2**20:.2f} MiB")
+    print(f"zgodność apply_spans(analyze) z mask_many: {'tak' if not mismatched else f'NIE ({mismatched} linii)'}")
+    if mismatched:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
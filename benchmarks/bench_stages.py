@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark etapów potoku TextAnonymizer z raportem JSON i porównaniem z punktem odniesienia.
+
+Każda linia korpusu (oraz jego powielonych kopii, --scale) przechodzi osobno przez
+etapy mask_doc: nlp(), build_regex_spans, build_token_spans, scalanie spanów
+(resolve_spans) i apply_spans; z --repeat przebiegów liczy się najszybszy.
+Raport zawiera sumaryczny czas etapów, linie/s i znaki/s, opóźnienie linii
+p50/p95/p99, przepustowość mask_many (paczki, jak w CLI) i szczytowy RSS; wynik
+etapów jest porównywany z mask().
+
+Bez modelu pl_nask (lub z --model blank) użyty jest tokenizator spacy.blank("pl")
+z regułą z bench_token_spans.py – mierzy to etapy regexów, spanów i scalania, ale
+nie koszt NER.
+
+Wyniki zapisuje --output, a --baseline porównuje je z wcześniejszym plikiem: metryki
+gorsze o więcej niż --threshold są oznaczane jako regresja (kod wyjścia 1).
+--compare STARY NOWY porównuje dwa pliki bez pomiaru.
+
+Usage:
+    python benchmarks/bench_stages.py --output stages.json
+    python benchmarks/bench_stages.py --scale 1 4 --baseline stages.json --output stages_new.json
+    python benchmarks/bench_stages.py --compare stages.json stages_new.json
+"""
+
+import argparse
+import heapq
+import json
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from _common import DEFAULT_CORPUS, load_lines
+
+from bench_chunking import blank_anonymizer
+
+from masker import TextAnonymizer, masked_components_default, package_version
+
+STAGES = ("nlp", "build_regex_spans", "build_token_spans", "merge", "apply")
+# Metryki porównywane z punktem odniesienia: (klucz, czy większa wartość jest lepsza)
+METRICS = (
+    *((f"stages.{stage}", False) for stage in STAGES),
+    ("lines_per_s", True),
+    ("chars_per_s", True),
+    ("latency_ms.p50", False),
+    ("latency_ms.p95", False),
+    ("latency_ms.p99", False),
+    ("mask_many_lines_per_s", True),
+    ("peak_rss_mb", False),
+)
+
+
+def load_anonymizer(model: str):
+    if model != "blank":
+        try:
+            return TextAnonymizer(model), model
+        except OSError:
+            print(f"Brak modelu {model} – używam tokenizatora spacy.blank(\"pl\").", file=sys.stderr)
+    return blank_anonymizer(), "blank"
+
+
+def mask_by_stages(anonymizer, text: str, timings: dict) -> str:
+    # Te same kroki co mask_doc/resolve_spans, z pomiarem każdego z nich
+    enabled_masks = [name for name, enabled in anonymizer.masked_components.items() if enabled]
+    t0 = time.perf_counter()
+    doc = anonymizer.nlp(text)
+    t1 = time.perf_counter()
+    regex_spans = anonymizer.build_regex_spans(text)
+    t2 = time.perf_counter()
+    token_spans = anonymizer.build_token_spans(doc, text, enabled_masks, regex_spans)
+    t3 = time.perf_counter()
+    if anonymizer.name_lexicon is not None or anonymizer.morphology is not None:
+        token_spans = anonymizer.add_person_spans(text, regex_spans, token_spans)
+    spans = heapq.merge(regex_spans, token_spans, key=lambda s: s[0])
+    spans = anonymizer.merge_adjacent_same_placeholders(text, spans)
+    t4 = time.perf_counter()
+    masked = anonymizer.apply_spans(text, spans)
+    t5 = time.perf_counter()
+    for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+        timings[stage].append(elapsed)
+    return masked
+
+
+def run(anonymizer, lines: list[str], batch_size: int, repeat: int) -> dict:
+    # Z kilku przebiegów brany jest ten o najmniejszym łącznym czasie
+    mismatched = sum(
+        mask_by_stages(anonymizer, line, {stage: [] for stage in STAGES}) != anonymizer.mask(line)
+        for line in lines
+    )
+    timings = None
+    for _ in range(repeat):
+        attempt = {stage: [] for stage in STAGES}
+        for line in lines:
+            mask_by_stages(anonymizer, line, attempt)
+        if timings is None or sum(map(sum, attempt.values())) < sum(map(sum, timings.values())):
+            timings = attempt
+    per_line = np.sum([timings[stage] for stage in STAGES], axis=0)
+    total = float(per_line.sum())
+    chars = sum(map(len, lines))
+
+    batched = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in anonymizer.mask_many(lines, batch_size=batch_size):
+            pass
+        batched = min(batched, time.perf_counter() - start)
+
+    p50, p95, p99 = np.percentile(per_line, [50, 95, 99]) * 1000
+    return {
+        "lines": len(lines),
+        "chars": chars,
+        "stages": {stage: float(sum(timings[stage])) for stage in STAGES},
+        "lines_per_s": len(lines) / total,
+        "chars_per_s": chars / total,
+        "latency_ms": {"p50": float(p50), "p95": float(p95), "p99": float(p99)},
+        "mask_many_lines_per_s": len(lines) / batched,
+        # ru_maxrss na Linuksie jest w KiB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "mismatched": mismatched,
+    }
+
+
+def metric(run_result: dict, key: str) -> float | None:
+    value = run_result
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    # Drukuje tabelę zmian i zwraca listę regresji ("x4 stages.nlp: +23%")
+    regressions = []
+    if baseline["meta"].get("model") != current["meta"].get("model"):
+        print(
+            f"Uwaga: różne modele ({baseline['meta'].get('model')} -> {current['meta'].get('model')}), "
+            "porównanie czasów nie jest miarodajne."
+        )
+    print(f"\n{'skala':<6} {'metryka':<24} {'odniesienie':>12} {'teraz':>12} {'zmiana':>8}")
+    for scale, result in current["runs"].items():
+        reference = baseline["runs"].get(scale)
+        if reference is None:
+            print(f"{scale:<6} brak w punkcie odniesienia")
+            continue
+        for key, higher_is_better in METRICS:
+            old, new = metric(reference, key), metric(result, key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESJA"
+                regressions.append(f"{scale} {key}: {change:+.0%}")
+            elif worse < -threshold:
+                flag = "  poprawa"
+            print(f"{scale:<6} {key:<24} {old:>12.4g} {new:>12.4g} {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"\nRegresje powyżej {threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+    else:
+        print(f"\nBrak regresji powyżej {threshold:.0%}.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark etapów potoku maskowania")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--limit", "-l", type=int, default=None, help="Liczba linii (domyślnie wszystkie)")
+    parser.add_argument("--model", default="pl_nask", help="Model spaCy albo \"blank\"")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], help="Krotności powielenia korpusu")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń (najlepszy przebieg)")
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę mask_many")
+    parser.add_argument("--output", "-o", default=None, help="Plik JSON z wynikami")
+    parser.add_argument("--baseline", default=None, help="Wyniki JSON do porównania")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Próg regresji (domyślnie 0.15)")
+    parser.add_argument("--compare", nargs=2, metavar=("STARY", "NOWY"), help="Porównaj dwa pliki JSON")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], "r", encoding="utf-8") as f:
+            current = json.load(f)
+        if compare(baseline, current, args.threshold):
+            raise SystemExit(1)
+        return
+
+    lines = load_lines(args.file)[: args.limit]
+    anonymizer, model = load_anonymizer(args.model)
+    results = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "model": model,
+            "model_version": package_version(model),
+            "spacy": package_version("spacy"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "corpus": args.file,
+            "masked_components": sorted(name for name, on in masked_components_default.items() if on),
+        },
+        "runs": {},
+    }
+    print(f"Model: {model}  linie korpusu: {len(lines)}")
+    print(
+        f"{'skala':<6} {'linie':>7} "
+        + " ".join(f"{stage[:14]:>14}" for stage in STAGES)
+        + f" {'linie/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'RSS MB':>7}  zgodność"
+    )
+    # Rozgrzewka: pierwsze wywołania modelu i regexów nie trafiają do pomiaru
+    for line in lines[:200]:
+        anonymizer.mask(line)
+    mismatched = 0
+    for scale in args.scale:
+        result = run(anonymizer, lines * scale, args.batch_size, args.repeat)
+        results["runs"][f"x{scale}"] = result
+        mismatched += result["mismatched"]
+        latency = result["latency_ms"]
+        print(
+            f"{'x' + str(scale):<6} {result['lines']:>7} "
+            + " ".join(f"{result['stages'][stage]:>14.3f}" for stage in STAGES)
+            + f" {result['lines_per_s']:>8.0f} {latency['p50']:>7.2f} {latency['p95']:>7.2f} "
+            f"{latency['p99']:>7.2f} {result['peak_rss_mb']:>7.0f}  "
+            f"{'tak' if not result['mismatched'] else 'NIE'}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Wyniki: {args.output}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold)
+    if mismatched or regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark build_token_spans na najdłuższych liniach nask_train.
+
+Porównuje wersję z tablicami tokenów z Doc (to_array) i wektorowym pokryciem
+spanami regexowymi z dawną pętlą (atrybuty token po tokenie, SpanIndex.overlaps
+dla każdego tokenu i każdego kroku rozszerzania) i sprawdza identyczność spanów.
+
+Model pl_nask nie jest potrzebny: dokumenty tworzy tokenizator spacy.blank("pl"),
+a token._.mask jest ustawiane prostą regułą (słowa z wielkiej litery -> persname_mask,
+tokeny z cyframi -> date_mask), co wystarcza do pomiaru samego etapu.
+
+Usage:
+    python benchmarks/bench_token_spans.py
+    python benchmarks/bench_token_spans.py --longest 50 --repeat 5
+"""
+
+import argparse
+
+import spacy
+from spacy.tokens import Token
+
+from _common import DEFAULT_CORPUS, best_of, load_lines, regex_only_anonymizer
+
+from masker import SpanIndex
+
+
+def per_token_build_token_spans(anonymizer, doc, text, enabled_masks, regex_spans):
+    """Dawne zachowanie: atrybuty i pokrycie sprawdzane osobno dla każdego tokenu."""
+    spans = []
+    is_covered = SpanIndex.from_sorted(regex_spans).overlaps
+
+    i = 0
+    n = len(doc)
+    while i < n:
+        token = doc[i]
+        if token.is_space or token.is_punct:
+            i += 1
+            continue
+        start_char = token.idx
+        end_char = token.idx + len(token.text)
+        if is_covered(start_char, end_char):
+            i += 1
+            continue
+        mask_name = getattr(token._, "mask", None)
+        if mask_name not in enabled_masks:
+            i += 1
+            continue
+        start_token = i
+        end_token = i + 1
+        while end_token < n:
+            t = doc[end_token]
+            if t.is_space or t.is_punct:
+                break
+            t_start = t.idx
+            t_end = t.idx + len(t.text)
+            if is_covered(t_start, t_end):
+                break
+            if getattr(t._, "mask", None) != mask_name:
+                break
+            end_token += 1
+        span_start = doc[start_token].idx
+        span_end = doc[end_token - 1].idx + len(doc[end_token - 1].text)
+        fragment = text[span_start:span_end]
+        placeholder = anonymizer.placeholder_for_span(mask_name, fragment, doc[start_token:end_token])
+        if placeholder:
+            spans.append((span_start, span_end, placeholder))
+        i = end_token
+
+    spans.sort(key=lambda s: s[0])
+    return spans
+
+
+def label_tokens(doc):
+    for token in doc:
+        if any(ch.isdigit() for ch in token.text):
+            token._.mask = "date_mask"
+        elif token.text[:1].isupper():
+            token._.mask = "persname_mask"
+    return doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build_token_spans")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--longest", "-n", type=int, default=20, help="Liczba najdłuższych linii")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    Token.set_extension("mask", default=None, force=True)
+    Token.set_extension("priv_last_name", default=False, force=True)
+    nlp = spacy.blank("pl")
+    anonymizer = regex_only_anonymizer()
+    enabled_masks = [c for c, enabled in anonymizer.masked_components.items() if enabled]
+
+    lines = sorted(load_lines(args.file), key=len, reverse=True)[: args.longest]
+    docs = [label_tokens(doc) for doc in nlp.pipe(lines)]
+    regex_spans = [anonymizer.build_regex_spans(line) for line in lines]
+    cases = list(zip(docs, lines, regex_spans))
+
+    def before():
+        return [per_token_build_token_spans(anonymizer, d, t, enabled_masks, r) for d, t, r in cases]
+
+    def after():
+        return [anonymizer.build_token_spans(d, t, enabled_masks, r) for d, t, r in cases]
+
+    same = before() == after()
+    t_before = best_of(before, args.repeat)
+    t_after = best_of(after, args.repeat)
+    tokens = sum(len(doc) for doc in docs)
+    print(f"Linie: {len(lines)}  znaki: {sum(map(len, lines))}  tokeny: {tokens}")
+    print(f"token po tokenie: {t_before:.3f} s")
+    print(f"tablice z Doc:    {t_after:.3f} s  (x{t_before / t_after:.2f})")
+    print(f"Zgodność spanów:  {'tak' if same else 'NIE'}")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark skalowania TextAnonymizerPool (1/2/4/8 procesów) na nask_train.
+
+Czas ładowania modelu w procesach roboczych jest mierzony osobno (rozgrzewka
+jedną paczką), a przepustowość liczona jest dla reszty korpusu. Wyjście każdej
+konfiguracji jest porównywane z konfiguracją jednoprocesową.
+
+Wymaga zainstalowanego modelu pl_nask.
+
+Usage:
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1 2 4 --batch-size 32
+"""
+
+import argparse
+import time
+
+from _common import DEFAULT_CORPUS, load_lines
+
+from masker import TextAnonymizerPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark skalowania puli procesów maskera")
+    parser.add_argument("--file", "-f", default=str(DEFAULT_CORPUS), help="Plik z tekstami")
+    parser.add_argument("--workers", "-w", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", "-b", type=int, default=64, help="Linie na paczkę")
+    args = parser.parse_args()
+
+    lines = load_lines(args.file)
+    chars = sum(len(line) for line in lines)
+    print(f"Linie: {len(lines)}  znaki: {chars}")
+    print(f"{'procesy':>8} {'start [s]':>10} {'czas [s]':>9} {'linie/s':>9} {'x':>6}  zgodność")
+
+    reference = None
+    baseline_rate = None
+    for workers in args.workers:
+        with TextAnonymizerPool(workers) as pool:
+            start = time.perf_counter()
+            # Rozgrzewka: po jednej paczce na proces, żeby każdy załadował model
+            list(pool.mask_many(lines[: workers * args.batch_size], batch_size=args.batch_size))
+            startup = time.perf_counter() - start
+
+            start = time.perf_counter()
+            output = list(pool.mask_many(lines, batch_size=args.batch_size))
+            elapsed = time.perf_counter() - start
+
+        rate = len(lines) / elapsed
+        if reference is None:
+            reference, baseline_rate = output, rate
+        same = "tak" if output == reference else "NIE"
+        print(
+            f"{workers:>8} {startup:>10.1f} {elapsed:>9.1f} {rate:>9.1f} "
+            f"{rate / baseline_rate:>6.2f}  {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
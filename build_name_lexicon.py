@@ -0,0 +1,91 @@
+import argparse
+import csv
+import importlib.util
+import os
+
+import morfeusz2
+
+from lexicons import NAME_FEMALE, NAME_FIRST, NAME_LAST, NAME_MALE, NameLexicon
+
+OUTPUT_DIR = "name_lexicon"
+# Listy imion i nazwisk z rejestru PESEL dołączone do priv_masker
+SOURCES = (
+    ("male_first_name.csv", NAME_MALE | NAME_FIRST),
+    ("female_first_name.csv", NAME_FEMALE | NAME_FIRST),
+    ("male_second_name.csv", NAME_MALE | NAME_FIRST),
+    ("female_second_name.csv", NAME_FEMALE | NAME_FIRST),
+    ("male_last_name.csv", NAME_MALE | NAME_LAST),
+    ("female_last_name.csv", NAME_FEMALE | NAME_LAST),
+)
+
+
+def default_source_dir() -> str:
+    # Katalog pakietu bez importu (import priv_masker ładuje spaCy)
+    spec = importlib.util.find_spec("priv_masker")
+    return os.path.join(spec.submodule_search_locations[0], "data", "names")
+
+
+def read_names(path: str, min_count: int):
+    # Kolumny: nazwa, [płeć,] liczba wystąpień; nazwy WIELKIMI literami, od najczęstszych
+    with open(path, "r", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        next(rows)
+        for row in rows:
+            if int(row[-1]) >= min_count:
+                yield row[0].strip().title()
+
+
+def inflect(morfeusz, name: str, flags: int) -> set[str]:
+    # Wszystkie formy rzeczownikowe lematów morfeusza, które są imieniem/nazwiskiem
+    # o zgodnym rodzaju; nazwy spoza słownika zostają tylko w mianowniku
+    label = "imię" if flags & NAME_FIRST else "nazwisko"
+    gender = ":f" if flags & NAME_FEMALE else ":m1"
+    forms = {name}
+    lemmas = {
+        lemma
+        for start, end, (orth, lemma, tag, labels, _) in morfeusz.analyse(name)
+        if (start, end) == (0, 1) and tag.startswith("subst") and label in labels and gender in tag
+    }
+    for lemma in lemmas:
+        for orth, generated_lemma, tag, _, _ in morfeusz.generate(lemma):
+            if generated_lemma == lemma and tag.startswith("subst"):
+                forms.add(orth)
+    return forms
+
+
+def entries(source_dir: str, min_count: int):
+    morfeusz = morfeusz2.Morfeusz()
+    for file_name, flags in SOURCES:
+        for name in read_names(os.path.join(source_dir, file_name), min_count):
+            for form in inflect(morfeusz, name, flags):
+                yield form, name, flags
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Budowa leksykonu form imion i nazwisk (morfeusz2) dla masker.py"
+    )
+    parser.add_argument(
+        "--source-dir",
+        default=None,
+        help="Katalog z listami *_first_name.csv / *_last_name.csv (domyślnie dane priv_masker).",
+    )
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Katalog wynikowy leksykonu.")
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=10,
+        help="Pomiń imiona i nazwiska noszone przez mniej osób (domyślnie 10).",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    source_dir = args.source_dir or default_source_dir()
+    count = NameLexicon.compile(entries(source_dir, args.min_count), args.output)
+    print(f"Leksykon: {count} form -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,13 @@ Usage:
 import argparse
 import json
 import re
-import random
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Optional
 from tqdm import tqdm
+# Line-offset index shared with masker.py (line_index package from the repository root,
+# installed via requirements.txt): sample mode reads only the sampled lines
+from line_index import LineIndex
 from src.synthesis.morph_generator import MorphologicalGenerator
 
 
@@ -138,11 +141,10 @@ def process_file(
     if jsonl_file:
         print(f"JSONL output will be saved to {jsonl_file}")
     
-    # Read all lines
+    # Index line offsets (built once, cached next to the file as <file>.lines)
     print("\nReading file...")
-    with open(input_file, "r", encoding="utf-8") as f:
-        all_lines = f.readlines()
-        total_lines = len(all_lines)
+    index = LineIndex(input_file)
+    total_lines = len(index)
     
     # Sample mode vs normal mode
     if sample_size:
@@ -150,13 +152,13 @@ def process_file(
         if sample_size < total_lines:
             print(f"Randomly sampling {sample_size} lines from {total_lines} total lines...")
             # Get random line indices
-            sampled_indices = sorted(random.sample(range(total_lines), sample_size))
+            sampled_indices = sorted(index.sample(sample_size))
             # Create list of (line_num, line) tuples, preserving original line numbers
-            lines_to_process = [(idx + 1, all_lines[idx]) for idx in sampled_indices]
+            lines_to_process = [(idx + 1, index.line(idx, keepends=True)) for idx in sampled_indices]
             print(f"Selected lines: {', '.join(map(str, [idx+1 for idx in sampled_indices[:10]]))}{'...' if len(sampled_indices) > 10 else ''}\n")
         else:
             print(f"Sample size ({sample_size}) >= total lines ({total_lines}), processing all lines\n")
-            lines_to_process = [(i+1, line) for i, line in enumerate(all_lines)]
+            lines_to_process = [(i+1, line) for i, line in enumerate(index.lines(keepends=True))]
         
         # Process and show comparison
         print("=" * 80)
@@ -196,8 +198,7 @@ def process_file(
         print("  (No files created in sample mode)")
         
     else:
-        # NORMAL MODE: Process all lines and save to files
-        lines_to_process = [(i+1, line) for i, line in enumerate(all_lines)]
+        # NORMAL MODE: Process all lines and save to files as they are processed
         print(f"Found {total_lines} lines to process\n")
         
         processed_lines = 0
@@ -205,43 +206,33 @@ def process_file(
         
         # Create progress bar
         pbar = tqdm(
-            total=len(lines_to_process),
+            total=total_lines,
             desc="Processing",
             unit="lines",
             bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
         )
         
-        # Process lines sequentially
-        results = {}
-        
-        for line_num, line in lines_to_process:
-            original_line = line.rstrip('\n\r')
-            
-            if line.strip():  # Skip empty lines
-                try:
-                    anonymized_line = anonymize_text_with_synthesis(line, generator, use_llm=True)
-                    anonymized_clean = anonymized_line.rstrip('\n\r')
-                    results[line_num] = (original_line, anonymized_line, anonymized_clean, None)
-                    processed_lines += 1
-                except Exception as e:
-                    error_count += 1
-                    results[line_num] = (original_line, line, original_line, str(e))
-                    pbar.set_postfix({"errors": error_count})
-            else:
-                # Empty line
-                results[line_num] = ("", line, "", None)
-            
-            pbar.update(1)
-        
-        pbar.close()
-        
-        # Write results in order
-        print("\nWriting results to files...")
+        # Process lines sequentially, streaming them from the index (no full copy in memory)
         with open(output_file, "w", encoding="utf-8") as outfile, \
-             (open(jsonl_file, "w", encoding="utf-8") if jsonl_file else None) as jsonl_outfile:
+             (open(jsonl_file, "w", encoding="utf-8") if jsonl_file else nullcontext()) as jsonl_outfile:
             
-            for line_num in sorted(results.keys()):
-                original_line, anonymized_line, anonymized_clean, error = results[line_num]
+            for line_num, line in enumerate(index.lines(keepends=True), 1):
+                original_line = line.rstrip('\n\r')
+                error = None
+                
+                if line.strip():  # Skip empty lines
+                    try:
+                        anonymized_line = anonymize_text_with_synthesis(line, generator, use_llm=True)
+                        anonymized_clean = anonymized_line.rstrip('\n\r')
+                        processed_lines += 1
+                    except Exception as e:
+                        error_count += 1
+                        error = str(e)
+                        anonymized_line, anonymized_clean = line, original_line
+                        pbar.set_postfix({"errors": error_count})
+                else:
+                    # Empty line
+                    original_line, anonymized_line, anonymized_clean = "", line, ""
                 
                 # Write to text file
                 outfile.write(anonymized_line)
@@ -256,10 +247,14 @@ def process_file(
                     if error:
                         json_obj["error"] = error
                     jsonl_outfile.write(json.dumps(json_obj, ensure_ascii=False) + '\n')
+                
+                pbar.update(1)
+        
+        pbar.close()
         
         print(f"\n✓ Processing complete!")
         print(f"  Total lines in file: {total_lines}")
-        print(f"  Processed lines: {len(lines_to_process)}")
+        print(f"  Processed lines: {total_lines}")
         print(f"  Successfully processed: {processed_lines}")
         if error_count > 0:
             print(f"  Errors: {error_count}")
@@ -267,6 +262,8 @@ def process_file(
         if jsonl_file:
             print(f"  JSONL output saved to: {jsonl_file}")
 
+    index.close()
+
 
 def main():
     """Main function."""
@@ -319,6 +316,18 @@ Examples:
         metavar="N",
         help="Randomly sample N lines for processing (useful for testing)"
     )
+    parser.add_argument(
+        "--morph-store",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Read-only morfeusz2 analysis store built by ../morphology.py (shared with masker.py, implies --morfeusz)"
+    )
+    parser.add_argument(
+        "--morfeusz",
+        action="store_true",
+        help="Use morfeusz2 for name gender and, without Spacy, for morphological features"
+    )
     
     args = parser.parse_args()
     
@@ -365,9 +374,14 @@ Examples:
         # Try with morphology first, fallback to simple faking if Spacy not available
         try:
             if llm_mode:
-                generator = MorphologicalGenerator(use_morphology=True, llm_mode=llm_mode)
+                generator = MorphologicalGenerator(
+                    use_morphology=True, llm_mode=llm_mode,
+                    morph_store=args.morph_store, use_morfeusz=args.morfeusz
+                )
             else:
-                generator = MorphologicalGenerator(use_morphology=True)
+                generator = MorphologicalGenerator(
+                    use_morphology=True, morph_store=args.morph_store, use_morfeusz=args.morfeusz
+                )
             print("✓ Generator initialized with morphology support\n")
         except Exception as e:
             print(f"⚠️  Spacy not available ({e}), using simple faking (no morphology)\n")
@@ -393,6 +407,8 @@ Examples:
             generate_jsonl=not args.no_jsonl,
             sample_size=args.sample
         )
+        if generator.morphology:
+            print(generator.morphology.stats())
     except Exception as e:
         print(f"\n✗ Error during processing: {e}")
         raise
@@ -32,6 +32,22 @@ try:
 except ImportError:
     REQUESTS_AVAILABLE = False
 
+# Optional shared morfeusz2 analysis cache (morphology.py in the repository root,
+# also used by masker.py; installed by requirements.txt with the shared modules)
+try:
+    from morphology import MorphologyCache, morfeusz_available
+    MORPHOLOGY_AVAILABLE = morfeusz_available()
+except ImportError:
+    MORPHOLOGY_AVAILABLE = False
+
+# Morfeusz (NKJP) tag values -> Spacy/UD feature values used by _extract_morph_features
+MORFEUSZ_CASES = {
+    "nom": "Nom", "gen": "Gen", "dat": "Dat", "acc": "Acc",
+    "inst": "Ins", "loc": "Loc", "voc": "Voc",
+}
+MORFEUSZ_NUMBERS = {"sg": "Sing", "pl": "Plur"}
+MORFEUSZ_GENDERS = {"m1": "Masc", "m2": "Masc", "m3": "Masc", "f": "Fem", "n": "Neut"}
+
 
 class MorphologicalGenerator:
     """
@@ -47,7 +63,10 @@ class MorphologicalGenerator:
         spacy_model: str = "pl_core_news_lg",
         use_llm: Optional[bool] = None,
         use_morphology: bool = True,
-        llm_mode: Optional[str] = None
+        llm_mode: Optional[str] = None,
+        morphology: Optional["MorphologyCache"] = None,
+        morph_store: Optional[str] = None,
+        use_morfeusz: bool = False
     ):
         """
         Initialize the morphological generator.
@@ -60,6 +79,13 @@ class MorphologicalGenerator:
                            Set to False for simple faking without morphology preservation
             llm_mode: LLM mode - "online" (PLLuM API) or "local" (Ollama). 
                      If None, reads from config.yaml or env
+            morphology: Shared morfeusz2 analysis cache (morphology.MorphologyCache).
+                        Passing one enables morfeusz2 like use_morfeusz
+            morph_store: Read-only persistent analysis store built by morphology.py,
+                         memory-mapped and shareable between processes (implies use_morfeusz)
+            use_morfeusz: Use morfeusz2 (cached) for name gender and, without Spacy,
+                          for morphological features (default: False, Spacy and
+                          suffix heuristics only)
         """
         self.faker = Faker(locale)
         self.locale = locale
@@ -95,6 +121,16 @@ class MorphologicalGenerator:
             elif use_llm and not (LLM_AVAILABLE or OLLAMA_AVAILABLE):
                 print("Warning: LLM requested but langchain-openai or langchain-ollama not installed. Using Faker only.")
         
+        # morfeusz2 analyses (cached) for name gender and as a fallback
+        # for morphological features when Spacy is not available. Opt-in:
+        # without it results do not depend on whether morfeusz2 is installed
+        self.morphology = morphology
+        if self.morphology is None and use_morphology and (use_morfeusz or morph_store):
+            if MORPHOLOGY_AVAILABLE:
+                self.morphology = MorphologyCache(store=morph_store)
+            else:
+                print("Warning: morfeusz2 requested but not installed. Continuing without it.")
+        
         # Initialize Spacy only if morphology is enabled
         self.nlp = None
         if use_morphology:
@@ -108,7 +144,7 @@ class MorphologicalGenerator:
                     print(f"Warning: Spacy model '{spacy_model}' not found. Continuing without morphology.")
                     print("  Install with: python -m spacy download pl_core_news_lg")
                     self.nlp = None
-                    self.use_morphology = False
+                    self.use_morphology = self.morphology is not None
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from config.yaml if available."""
@@ -661,12 +697,15 @@ Odpowiedz TYLKO jednym słowem: "osoba", "adres", "miejscowosc", lub "nieznane".
         Returns:
             Dictionary with morphological features or None if analysis fails
         """
-        if not self.use_morphology or not self.nlp:
+        if not self.use_morphology:
             return None
         
         if not text or not text.strip():
             return None
         
+        if not self.nlp:
+            return self._extract_morfeusz_features(text)
+        
         try:
             doc = self.nlp(text)
             if not doc:
@@ -703,6 +742,41 @@ Odpowiedz TYLKO jednym słowem: "osoba", "adres", "miejscowosc", lub "nieznane".
             # If analysis fails, return None (will use simple replacement)
             return None
     
+    def _extract_morfeusz_features(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract morphological features of the first word using morfeusz2.
+        Takes the first first-name/surname interpretation, otherwise the first
+        noun or adjective interpretation.
+        
+        Args:
+            text: Text to analyze
+            
+        Returns:
+            Dictionary with morphological features or None if analysis fails
+        """
+        if not self.morphology:
+            return None
+        
+        first = None
+        for start, _, (_, _, tag, labels, _) in self.morphology.analyse(text.split()[0]):
+            parts = tag.split(":")
+            if start != 0 or parts[0] not in ("subst", "adj") or len(parts) < 4:
+                continue
+            # Ambiguous values ("gen.acc") keep the first one
+            number, case, gender = (part.split(".")[0] for part in parts[1:4])
+            is_name = "imię" in labels or "nazwisko" in labels
+            features = {
+                "case": MORFEUSZ_CASES.get(case),
+                "number": MORFEUSZ_NUMBERS.get(number),
+                "gender": MORFEUSZ_GENDERS.get(gender),
+                "pos": "ADJ" if parts[0] == "adj" else ("PROPN" if is_name else "NOUN"),
+            }
+            if is_name:
+                return features
+            if first is None:
+                first = features
+        return first
+    
     def _simple_case_mapping(self, original: str, replacement: str, case: Optional[str]) -> str:
         """
         Simple case mapping for Polish nouns.
@@ -745,6 +819,18 @@ Odpowiedz TYLKO jednym słowem: "osoba", "adres", "miejscowosc", lub "nieznane".
         Returns:
             True if name is typically male, False if female
         """
+        # Prefer morfeusz2: first-name interpretations carry the gender in the tag
+        if self.morphology and name.strip():
+            genders = set()
+            for _, _, (_, _, tag, labels, _) in self.morphology.analyse(name.split()[0]):
+                parts = tag.split(":")
+                if "imię" in labels and parts[0] == "subst" and len(parts) > 3:
+                    genders.update(parts[3].split("."))
+            if genders == {"m1"}:
+                return True
+            if genders == {"f"}:
+                return False
+        
         name_lower = name.lower().strip()
         
         # Common Polish female name endings
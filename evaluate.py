@@ -0,0 +1,296 @@
+"""
+Tablica wyników maskowania: dokładność (P/R/F1 na poziomie spanów) i wydajność
+(linie/s, opóźnienie linii) z jednego przebiegu.
+
+Wejście to surowy tekst (nask_train/anonymized.txt), a wzorzec to ten sam tekst z
+etykietami w nawiasach kwadratowych (nask_train/orig.txt, np. "[name] [surname]").
+Wzorzec i wynik masker.py (etykiety w klamrach) są wyrównywane do surowej linii na
+poziomie słów i znaków interpunkcyjnych (difflib.SequenceMatcher), więc różnice w
+interpunkcji między plikami nie przesuwają spanów. Etykieta zajmuje słowa surowej
+linii między sąsiednimi dopasowanymi tokenami; kilka etykiet z rzędu dzieli ten
+region po równo (po słowach rozdzielonych białymi znakami).
+
+Wyniki na kategorię: dokładne granice (strict) i dowolne nakładanie się spanów z tą
+samą etykietą (overlap), a zbiorczo także nakładanie bez względu na etykietę
+(czy tekst w ogóle został zamaskowany). Etykiety wzorca spoza taksonomii maskera
+(np. [amount], [time]) są pomijane. Opcje potoku są te same co w masker.py, więc
+--no-ner, --fast-path, --prune-components czy --workers ocenia się na obu osiach:
+
+    python evaluate.py --no-ner --workers 4 --output scoreboard.json
+"""
+
+import argparse
+import difflib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from masker import add_pipeline_arguments, build_anonymizer, check_pipeline_args, report_pipeline_stats
+
+# Słowa i pojedyncze znaki interpunkcyjne; we wzorcu i wyniku maskera także etykiety
+TOKEN_REGEX = re.compile(r"\w+|[^\w\s]")
+GOLD_PLACEHOLDER_REGEX = re.compile(r"\[([A-Za-z][\w /-]*)\]|" + TOKEN_REGEX.pattern)
+MASK_PLACEHOLDER_REGEX = re.compile(r"\{([a-z][a-z-]*)\}|" + TOKEN_REGEX.pattern)
+WORD_REGEX = re.compile(r"\S+")
+PLACEHOLDER_TOKEN = "\ue000"
+
+# Kategorie, które masker.py potrafi wstawić
+CATEGORIES = (
+    "name", "surname", "address", "city", "phone", "email", "age", "pesel",
+    "document-number", "sex", "company", "date", "date-of-birth", "job-title",
+    "health", "relative", "political-view", "username", "bank-account", "secret",
+    "school-name", "ethnicity", "religion", "sexual-orientation", "credit-card-number",
+)
+# Warianty etykiet we wzorcu
+GOLD_ALIASES = {
+    "id number": "document-number",
+    "name_1": "name",
+    "name_2": "name",
+    "surname_1": "surname",
+    "data": "date",
+}
+
+
+def template_spans(raw: str, template: str, placeholder_regex: re.Pattern) -> list[tuple[int, int, str]]:
+    """Spany (start, end, etykieta) w surowej linii odpowiadające etykietom szablonu."""
+    # Etykieta szablonu to jeden token PLACEHOLDER_TOKEN (grupa 1 wyrażenia to jej nazwa)
+    matches = list(placeholder_regex.finditer(template))
+    if not any(match.group(1) for match in matches):
+        return []
+    tokens = [PLACEHOLDER_TOKEN if match.group(1) else match.group() for match in matches]
+    raw_offsets = [token.span() for token in TOKEN_REGEX.finditer(raw)]
+    raw_tokens = [raw[start:end] for start, end in raw_offsets]
+
+    # Etykiety w przerwie między kolejnymi dopasowanymi blokami dzielą przerwę surowej linii
+    spans = []
+    raw_gap = gap = 0
+    matcher = difflib.SequenceMatcher(None, raw_tokens, tokens, autojunk=False)
+    for raw_start, start, size in matcher.get_matching_blocks():
+        group = [match.group(1) for match in matches[gap:start] if match.group(1)]
+        if group and raw_gap < raw_start:
+            # Podział po słowach rozdzielonych białymi znakami ("37/41" zostaje całe)
+            region = (raw_offsets[raw_gap][0], raw_offsets[raw_start - 1][1])
+            words = [word.span() for word in WORD_REGEX.finditer(raw, *region)]
+            for position, label in enumerate(group):
+                first = round(position * len(words) / len(group))
+                last = round((position + 1) * len(words) / len(group))
+                if first < last:
+                    spans.append((words[first][0], words[last - 1][1], label))
+        raw_gap, gap = raw_start + size, start + size
+    return spans
+
+
+def normalize_gold(label: str) -> str:
+    label = label.lower()
+    return GOLD_ALIASES.get(label, label)
+
+
+def match_spans(gold: list, predicted: list, overlap: bool, labelled: bool = True) -> tuple[list, list]:
+    # Zwraca listy dopasowanych etykiet (wzorca, predykcji); dopasowanie jeden do jednego
+    if not overlap:
+        exact = set(predicted) & set(gold)
+        return [span[2] for span in exact], [span[2] for span in exact]
+    used = set()
+    gold_hits, predicted_hits = [], []
+    for start, end, label in gold:
+        for index, (p_start, p_end, p_label) in enumerate(predicted):
+            if index in used or p_start >= end or p_end <= start or (labelled and p_label != label):
+                continue
+            used.add(index)
+            gold_hits.append(label)
+            predicted_hits.append(p_label)
+            break
+    return gold_hits, predicted_hits
+
+
+def score_line(pair: tuple[str, str, str]) -> dict:
+    raw, gold_template, masked = pair
+    gold = [
+        (start, end, label)
+        for start, end, label in (
+            (start, end, normalize_gold(label))
+            for start, end, label in template_spans(raw, gold_template, GOLD_PLACEHOLDER_REGEX)
+        )
+        if label in CATEGORIES
+    ]
+    predicted = template_spans(raw, masked, MASK_PLACEHOLDER_REGEX)
+    counts = {"gold": [span[2] for span in gold], "predicted": [span[2] for span in predicted]}
+    for mode in ("strict", "overlap"):
+        counts[f"{mode}_gold"], counts[f"{mode}_predicted"] = match_spans(gold, predicted, mode == "overlap")
+    gold_hits, predicted_hits = match_spans(gold, predicted, overlap=True, labelled=False)
+    counts["unlabelled"] = (len(gold_hits), len(predicted_hits))
+    return counts
+
+
+def prf(tp_predicted: int, predicted: int, tp_gold: int, gold: int) -> dict:
+    precision = tp_predicted / predicted if predicted else 0.0
+    recall = tp_gold / gold if gold else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1, "gold": gold, "predicted": predicted}
+
+
+def aggregate(line_counts) -> dict:
+    totals = {
+        key: dict.fromkeys(CATEGORIES, 0)
+        for key in ("gold", "predicted", "strict_gold", "strict_predicted", "overlap_gold", "overlap_predicted")
+    }
+    unlabelled_gold = unlabelled_predicted = 0
+    for counts in line_counts:
+        for key, table in totals.items():
+            for label in counts[key]:
+                if label in table:
+                    table[label] += 1
+        unlabelled_gold += counts["unlabelled"][0]
+        unlabelled_predicted += counts["unlabelled"][1]
+
+    gold, predicted = sum(totals["gold"].values()), sum(totals["predicted"].values())
+    report = {"categories": {}, "micro": {}}
+    for mode in ("strict", "overlap"):
+        report["micro"][mode] = prf(
+            sum(totals[f"{mode}_predicted"].values()), predicted, sum(totals[f"{mode}_gold"].values()), gold
+        )
+    report["micro"]["unlabelled"] = prf(unlabelled_predicted, predicted, unlabelled_gold, gold)
+    for label in CATEGORIES:
+        if not totals["gold"][label] and not totals["predicted"][label]:
+            continue
+        report["categories"][label] = {
+            mode: prf(
+                totals[f"{mode}_predicted"][label],
+                totals["predicted"][label],
+                totals[f"{mode}_gold"][label],
+                totals["gold"][label],
+            )
+            for mode in ("strict", "overlap")
+        }
+    return report
+
+
+def read_pairs(input_path: str, gold_path: str, limit: int | None):
+    # Pary (surowa linia, wzorzec); puste linie wejścia są pomijane jak w masker.py
+    with open(input_path, "r", encoding="utf-8") as raw_file, open(gold_path, "r", encoding="utf-8") as gold_file:
+        pairs = ((raw.rstrip("\n"), gold.rstrip("\n")) for raw, gold in zip(raw_file, gold_file) if raw.strip())
+        yield from islice(pairs, limit)
+
+
+def timed_mask(anonymizer, lines: list[str], batch_size: int) -> tuple[list[str], float, np.ndarray]:
+    # Opóźnienie linii: od pobrania z wejścia przez mask_many do otrzymania wyniku
+    read_at = []
+
+    def source():
+        for line in lines:
+            read_at.append(time.perf_counter())
+            yield line
+
+    masked, latencies = [], []
+    start = time.perf_counter()
+    for index, text in enumerate(anonymizer.mask_many(source(), batch_size=batch_size)):
+        latencies.append(time.perf_counter() - read_at[index])
+        masked.append(text)
+    return masked, time.perf_counter() - start, np.array(latencies)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Ocena maskowania: P/R/F1 na kategorię oraz przepustowość i opóźnienie"
+    )
+    parser.add_argument(
+        "--input",
+        default="nask_train/anonymized.txt",
+        help="Surowy tekst do zamaskowania (domyślnie nask_train/anonymized.txt).",
+    )
+    parser.add_argument(
+        "--gold",
+        default="nask_train/orig.txt",
+        help="Wzorzec z etykietami [label], linia w linię z --input (domyślnie nask_train/orig.txt).",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Oceń tylko tyle pierwszych linii.")
+    parser.add_argument("--output", default=None, help="Zapisz raport JSON do pliku.")
+    add_pipeline_arguments(parser)
+    return parser.parse_args()
+
+
+def print_report(report: dict) -> None:
+    speed = report["throughput"]
+    print(
+        f"Linie: {speed['lines']}  czas: {speed['seconds']:.2f} s  {speed['lines_per_s']:.0f} linii/s  "
+        f"{speed['chars_per_s'] / 1000:.0f} tys. znaków/s  (ładowanie potoku: {speed['setup_s']:.2f} s)"
+    )
+    latency = speed["latency_ms"]
+    print(f"Opóźnienie linii: p50 {latency['p50']:.2f} ms  p95 {latency['p95']:.2f} ms  p99 {latency['p99']:.2f} ms")
+    print(f"\n{'kategoria':<20} {'wzorzec':>8} {'predykcje':>9} {'P':>6} {'R':>6} {'F1':>6}   {'F1 overlap':>10}")
+    for label, entry in report["categories"].items():
+        strict, overlap = entry["strict"], entry["overlap"]
+        print(
+            f"{label:<20} {strict['gold']:>8} {strict['predicted']:>9} {strict['precision']:>6.3f} "
+            f"{strict['recall']:>6.3f} {strict['f1']:>6.3f}   {overlap['f1']:>10.3f}"
+        )
+    for mode, entry in report["micro"].items():
+        print(
+            f"{'micro ' + mode:<20} {entry['gold']:>8} {entry['predicted']:>9} {entry['precision']:>6.3f} "
+            f"{entry['recall']:>6.3f} {entry['f1']:>6.3f}"
+        )
+
+
+def main():
+    args = parse_args()
+    if args.limit is not None and args.limit <= 0:
+        print("limit musi być liczbą dodatnią.", file=sys.stderr)
+        sys.exit(1)
+    check_pipeline_args(args)
+
+    pairs = list(read_pairs(args.input, args.gold, args.limit))
+    if not pairs:
+        print("Plik wejściowy nie zawiera żadnych niepustych linii.", file=sys.stderr)
+        sys.exit(1)
+    lines = [raw for raw, _ in pairs]
+
+    start = time.perf_counter()
+    anonymizer = build_anonymizer(args)
+    setup = time.perf_counter() - start
+    try:
+        masked, elapsed, latencies = timed_mask(anonymizer, lines, args.batch_size)
+    finally:
+        report_pipeline_stats(anonymizer, args)
+
+    # Wyrównanie to czysty Python – przy --workers rozkładane na procesy
+    triples = [(raw, gold, text) for (raw, gold), text in zip(pairs, masked)]
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as executor:
+            line_counts = list(executor.map(score_line, triples, chunksize=64))
+    else:
+        line_counts = [score_line(triple) for triple in triples]
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    chars = sum(map(len, lines))
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "input": args.input,
+            "gold": args.gold,
+            "options": {key: value for key, value in vars(args).items() if key not in ("input", "gold", "output")},
+        },
+        "throughput": {
+            "lines": len(lines),
+            "chars": chars,
+            "setup_s": setup,
+            "seconds": elapsed,
+            "lines_per_s": len(lines) / elapsed,
+            "chars_per_s": chars / elapsed,
+            "latency_ms": {"p50": float(p50), "p95": float(p95), "p99": float(p99)},
+        },
+        **aggregate(line_counts),
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,51 @@
-from dbfread import DBF
+import argparse
+
+from lexicons import CityGazetteer
 
 DBF_PATH = "NOWE_PRG_Miejscowosci_POLSKA.dbf"
+NAMES_PATH = "city_names.txt"
+GAZETTEER_PATH = "city_gazetteer.npy"
+
+
+def extract_names(dbf_path: str, names_path: str) -> None:
+    from dbfread import DBF
 
-def main():
     table = DBF(
-        DBF_PATH,
+        dbf_path,
         encoding="utf-8",
         char_decode_errors="strict",
     )
 
-    with open("city_names.txt", "w", encoding="utf-8") as out:
+    with open(names_path, "w", encoding="utf-8") as out:
         for row in table:
             name = row["NAZWA_MSC"].strip()
             if name:
                 out.write(name + "\n")
 
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Eksport nazw miejscowości z PRG i kompilacja gazetera dla masker.py"
+    )
+    parser.add_argument("--dbf", default=DBF_PATH, help="Plik DBF z PRG.")
+    parser.add_argument("--names", default=NAMES_PATH, help="Lista nazw (po jednej w linii).")
+    parser.add_argument("--output", default=GAZETTEER_PATH, help="Skompilowany gazeter (.npy).")
+    parser.add_argument(
+        "--from-names",
+        action="store_true",
+        help="Pomiń DBF i skompiluj gazeter z istniejącego pliku --names.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.from_names:
+        extract_names(args.dbf, args.names)
+    with open(args.names, "r", encoding="utf-8") as f:
+        count = CityGazetteer.compile((line.strip() for line in f), args.output)
+    print(f"Gazeter: {count} nazw -> {args.output}")
+
+
 if __name__ == "__main__":
     main()
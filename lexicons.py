@@ -0,0 +1,198 @@
+"""
+Słowniki maskera ładowane przez mmap (masker.py) i budowane skryptami
+(extract_cities.py, build_name_lexicon.py).
+
+Moduł zależy tylko od numpy, więc kompilacja słowników nie ładuje spaCy ani
+priv_masker. CityGazetteer to gazeter nazw miejscowości PRG (--city-gazetteer)
+skompilowany do posortowanej tablicy 64-bitowych skrótów nazw, a NameLexicon –
+leksykon form imion i nazwisk (--name-lexicon).
+"""
+
+import hashlib
+import os
+import re
+from itertools import accumulate
+
+import numpy as np
+
+# Wielkie litery (BMP) dla wyrażeń szukających słów z wielkiej litery
+UPPERCASE_LETTERS = re.escape("".join(ch for ch in map(chr, range(0x10000)) if ch.isupper()))
+# Słowo nazwy miejscowości, także z łącznikiem ("Bielsko-Biała")
+CITY_WORD_REGEX = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+# Leksykon imion i nazwisk: flagi form, słowa z wielkiej litery i tytuły, po których
+# pojedyncze imię lub nazwisko jest maskowane
+NAME_MALE = 1
+NAME_FEMALE = 2
+NAME_FIRST = 4
+NAME_LAST = 8
+NAME_FLAG_BITS = 4
+NAME_FLAGS_MASK = (1 << NAME_FLAG_BITS) - 1
+NAME_WORD_REGEX = re.compile(
+    r"(?=[%s])(?<![^\W\d_])(?<![^\W\d_]-)[^\W\d_]+(?:-[^\W\d_]+)*" % UPPERCASE_LETTERS
+)
+NAME_HONORIFICS = r"pan|pana|panu|panem|panie|pani|panią|państwo|państwa|dr|mgr|inż|prof"
+NAME_HONORIFIC_REGEX = re.compile(r"\b(?:%s)\.?\s+$" % NAME_HONORIFICS, re.IGNORECASE)
+
+
+def phrase_hash(phrase: str) -> int:
+    # Stabilny między procesami i uruchomieniami 64-bitowy skrót (w przeciwieństwie do hash())
+    return int.from_bytes(hashlib.blake2b(phrase.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CityGazetteer:
+    """Gazeter nazw miejscowości PRG skompilowany do posortowanej tablicy skrótów.
+
+    Plik .npy (budowany przez extract_cities.py) to tablica uint64: element 0 to
+    największa liczba słów w nazwie, dalej posortowane 64-bitowe skróty BLAKE2b
+    nazw. Ładowany przez np.load(mmap_mode="r"), więc procesy robocze dzielą strony
+    pliku zamiast kopii słownika. find() skanuje linię raz: dla każdego słowa
+    z wielkiej litery zbiera ciągi do max_words słów i sprawdza je jednym
+    wektorowym searchsorted.
+    """
+
+    def __init__(self, path: str):
+        data = np.load(path, mmap_mode="r")
+        self.max_words = int(data[0])
+        self.hashes = data[1:]
+        # Od każdego słowa z wielkiej litery (także wewnątrz wcześniejszego trafienia)
+        # najdłuższy ciąg do max_words słów rozdzielonych pojedynczą spacją
+        self.candidate_regex = re.compile(
+            r"(?=[%s])(?<![^\W\d_])(?<![^\W\d_]-)(?=([^\W\d_]+(?:-[^\W\d_]+)*(?: %s){0,%d}))"
+            % (UPPERCASE_LETTERS, CITY_WORD_REGEX.pattern, max(self.max_words - 1, 0))
+        )
+
+    @classmethod
+    def compile(cls, names, path: str) -> int:
+        # Nazwy ze znakami spoza CITY_WORD_REGEX (nawiasy, cyfry) i tak nie mogłyby
+        # zostać znalezione przez find(), więc są pomijane. Zwraca liczbę nazw.
+        keys = set()
+        for name in names:
+            words = CITY_WORD_REGEX.findall(name)
+            if words and " ".join(words) == " ".join(name.split()):
+                keys.add(" ".join(words))
+        max_words = max((key.count(" ") + 1 for key in keys), default=0)
+        hashes = np.unique(np.fromiter(map(phrase_hash, keys), np.uint64, len(keys)))
+        np.save(path, np.concatenate([np.array([max_words], np.uint64), hashes]))
+        return len(keys)
+
+    def find(self, text: str, pos: int = 0, endpos: int | None = None) -> list[tuple[int, int]]:
+        # Najdłuższe, rozłączne wystąpienia nazw z gazetera w text[pos:endpos], od lewej
+        starts = []
+        keys = []
+        if endpos is None:
+            endpos = len(text)
+        for match in self.candidate_regex.finditer(text, pos, endpos):
+            start = match.start()
+            phrase = match.group(1)
+            cut = phrase.find(" ")
+            while cut != -1:
+                starts.append(start)
+                keys.append(phrase[:cut])
+                cut = phrase.find(" ", cut + 1)
+            starts.append(start)
+            keys.append(phrase)
+        if not keys or not len(self.hashes):
+            return []
+        hashes = np.fromiter(map(phrase_hash, keys), np.uint64, len(keys))
+        pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        longest = {}
+        for start, key, hit in zip(starts, keys, (self.hashes[pos] == hashes).tolist()):
+            if hit:
+                longest[start] = start + len(key)
+        matches = []
+        last = -1
+        for start, end in longest.items():
+            if start >= last:
+                matches.append((start, end))
+                last = end
+        return matches
+
+
+class NameLexicon:
+    """Leksykon form fleksyjnych imion i nazwisk (budowany przez build_name_lexicon.py).
+
+    Katalog z tablicami .npy ładowanymi przez mmap: forms.npy (posortowane skróty
+    phrase_hash form), info.npy (uint32: numer lematu << NAME_FLAG_BITS | flagi
+    NAME_*), lemmas.npy (lematy UTF-8 sklejone w jeden bufor) i lemma_offsets.npy.
+    Sprawdzenie słowa to jedno wyszukiwanie binarne; find_persons() sprawdza
+    wszystkie słowa linii jednym wektorowym searchsorted.
+    """
+
+    FILES = ("forms.npy", "info.npy", "lemmas.npy", "lemma_offsets.npy")
+
+    def __init__(self, directory: str):
+        self.hashes, self.info, self.lemma_blob, self.lemma_offsets = (
+            np.load(os.path.join(directory, name), mmap_mode="r") for name in self.FILES
+        )
+
+    @classmethod
+    def compile(cls, entries, directory: str) -> int:
+        # entries: (forma, lemat, flagi). Forma wspólna dla kilku lematów dostaje
+        # pierwszy z nich (listy wejściowe są od najczęstszych) i sumę flag.
+        forms = {}
+        lemma_ids = {}
+        for form, lemma, flags in entries:
+            lemma_id = lemma_ids.setdefault(lemma, len(lemma_ids))
+            key = phrase_hash(form)
+            if key in forms:
+                forms[key] = (forms[key][0], forms[key][1] | flags)
+            else:
+                forms[key] = (lemma_id, flags)
+        keys = sorted(forms)
+        encoded = [lemma.encode("utf-8") for lemma in lemma_ids]
+        os.makedirs(directory, exist_ok=True)
+        arrays = (
+            np.array(keys, np.uint64),
+            np.array([forms[key][0] << NAME_FLAG_BITS | forms[key][1] for key in keys], np.uint32),
+            np.frombuffer(b"".join(encoded), np.uint8),
+            np.fromiter(accumulate(map(len, encoded), initial=0), np.uint32, len(encoded) + 1),
+        )
+        for name, values in zip(cls.FILES, arrays):
+            np.save(os.path.join(directory, name), values)
+        return len(keys)
+
+    def lookup_many(self, forms: list[str]) -> list[int]:
+        # info dla każdej formy albo 0, gdy jej nie ma w leksykonie
+        if not forms or not len(self.hashes):
+            return [0] * len(forms)
+        hashes = np.fromiter(map(phrase_hash, forms), np.uint64, len(forms))
+        pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        return np.where(self.hashes[pos] == hashes, self.info[pos], 0).tolist()
+
+    def lookup(self, form: str) -> tuple[str, int] | None:
+        # (lemat, flagi NAME_*) albo None
+        info = self.lookup_many([form])[0]
+        if not info:
+            return None
+        lemma_id = info >> NAME_FLAG_BITS
+        start, end = self.lemma_offsets[lemma_id], self.lemma_offsets[lemma_id + 1]
+        return bytes(self.lemma_blob[start:end]).decode("utf-8"), info & NAME_FLAGS_MASK
+
+    def find_persons(self, text: str) -> list[tuple[int, int, str]]:
+        # Ciągi słów z leksykonu rozdzielonych spacją: co najmniej dwa słowa, wśród
+        # nich imię i nazwisko ("Jan Kowalski", "Kowalskiej Annie"), albo dowolna
+        # długość po tytule ("pan Kowalski", "dr Anna Nowak")
+        words = [match.span() for match in NAME_WORD_REGEX.finditer(text)]
+        info = self.lookup_many([text[start:end] for start, end in words])
+        spans = []
+        i = 0
+        n = len(words)
+        while i < n:
+            if not info[i]:
+                i += 1
+                continue
+            flags = info[i] & NAME_FLAGS_MASK
+            j = i + 1
+            while j < n and info[j] and text[words[j - 1][1]:words[j][0]] == " ":
+                flags |= info[j] & NAME_FLAGS_MASK
+                j += 1
+            start = words[i][0]
+            end = words[j - 1][1]
+            if j - i >= 2 and flags & NAME_FIRST and flags & NAME_LAST:
+                spans.append((start, end, "{name}"))
+            elif NAME_HONORIFIC_REGEX.search(text, max(0, start - 12), start):
+                single_surname = j - i == 1 and not (flags & NAME_FIRST)
+                spans.append((start, end, "{surname}" if single_surname else "{name}"))
+            i = j
+        return spans
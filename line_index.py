@@ -0,0 +1,203 @@
+"""
+Indeks początków linii dla dużych plików tekstowych (masker.py, synthesize, dawid_cli).
+
+LineIndex otwiera plik przez mmap i trzyma tablicę uint64 z bajtowymi pozycjami
+początków linii, więc dostęp do linii po numerze jest O(1), losowanie próbki nie
+wymaga czytania całego pliku, a podział na części o zbliżonej liczbie bajtów (dla
+równoległych procesów) to wyszukiwanie binarne w tablicy. Indeks jest zapisywany
+obok pliku (<plik>.lines: wersja formatu, rozmiar i mtime_ns pliku, potem pozycje
+w natywnej kolejności bajtów) i używany ponownie, dopóki plik się nie zmieni; gdy
+katalogu nie da się zapisać, indeks zostaje tylko w pamięci. Zbudowanie indeksu z góry:
+
+    python line_index.py nask_train/orig.txt
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import random
+import re
+from array import array
+from bisect import bisect_left
+
+INDEX_SUFFIX = ".lines"
+# Wersja formatu indeksu (zmieniona przy przejściu na uniwersalne końce linii)
+INDEX_VERSION = 2
+# Nagłówek pliku indeksu: wersja formatu, rozmiar i mtime_ns indeksowanego pliku
+INDEX_HEADER = 3
+# Rozmiar kawałka przy liczeniu SHA-256 (hashlib dostaje widoki mmap, bez kopii zakresu)
+HASH_CHUNK = 1 << 20
+# Końce linii trybu tekstowego (newline=None): "\r\n", samotne "\r" i "\n"
+LINE_END_REGEX = re.compile(rb"\r\n?|\n")
+
+
+def build_offsets(data) -> array:
+    # Początki linii jak przy czytaniu w trybie tekstowym; ostatnia linia bez końca
+    # linii też się liczy. Bez "\r" w pliku wystarcza szybkie find(b"\n"), w przeciwnym
+    # razie granice wyznacza LINE_END_REGEX.
+    starts = array("Q")
+    size = len(data)
+    if size and data.find(b"\r") != -1:
+        starts.append(0)
+        starts.extend(match.end() for match in LINE_END_REGEX.finditer(data))
+        if starts[-1] == size:
+            starts.pop()
+        return starts
+    find = data.find
+    position = 0
+    while position < size:
+        starts.append(position)
+        end = find(b"\n", position)
+        if end == -1:
+            break
+        position = end + 1
+    return starts
+
+
+class LineIndex:
+    """Linie pliku UTF-8 dostępne po numerze (od 0) bez wczytywania pliku do pamięci.
+
+    Granice linii są takie jak przy czytaniu pliku w trybie tekstowym (uniwersalne
+    końce linii: "\\n", "\\r\\n" i samotne "\\r"). line(i) zwraca linię bez końca
+    linii, jak rstrip("\\n") w trybie tekstowym; z keepends=True koniec linii jest
+    zamieniony na "\\n", tak jak zwraca go iteracja po pliku tekstowym.
+    """
+
+    def __init__(self, path: str, cache: bool = True):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.size = stat.st_size
+            # mmap nie przyjmuje pustych plików
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        # mmap zapisanego indeksu (starts to widok na nim), zamykany w close()
+        self.index_map = None
+        self.starts = self.load(stat) if cache else None
+        if self.starts is None:
+            self.starts = build_offsets(self.data)
+            if cache:
+                self.save(stat)
+
+    @property
+    def index_path(self) -> str:
+        return self.path + INDEX_SUFFIX
+
+    def load(self, stat):
+        # Zapisany indeks przez mmap; None, gdy go nie ma albo plik się zmienił
+        try:
+            with open(self.index_path, "rb") as f:
+                stored = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        starts = None
+        if len(stored) % 8 == 0:
+            values = memoryview(stored).cast("Q")
+            if tuple(values[:INDEX_HEADER]) == (INDEX_VERSION, stat.st_size, stat.st_mtime_ns):
+                starts = values[INDEX_HEADER:]
+            values.release()
+        if starts is None:
+            stored.close()
+        else:
+            self.index_map = stored
+        return starts
+
+    def save(self, stat):
+        # Zapis przez plik tymczasowy i os.replace: równoległe procesy nie widzą połowy indeksu
+        temporary = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                array("Q", (INDEX_VERSION, stat.st_size, stat.st_mtime_ns)).tofile(f)
+                self.starts.tofile(f)
+            os.replace(temporary, self.index_path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def byte_range(self, first: int, stop: int) -> tuple[int, int]:
+        # Bajty linii first..stop-1 (z końcami linii)
+        start = self.starts[first] if first < len(self.starts) else self.size
+        end = self.starts[stop] if stop < len(self.starts) else self.size
+        return start, end
+
+    def sha256(self, start: int = 0, end: int | None = None) -> str:
+        # SHA-256 bajtów start..end-1 (domyślnie całego pliku), kawałkami po HASH_CHUNK
+        end = self.size if end is None else end
+        digest = hashlib.sha256()
+        if start < end:
+            with memoryview(self.data) as view:
+                for position in range(start, end, HASH_CHUNK):
+                    digest.update(view[position:min(position + HASH_CHUNK, end)])
+        return digest.hexdigest()
+
+    def line(self, number: int, keepends: bool = False) -> str:
+        if not 0 <= number < len(self.starts):
+            raise IndexError(f"Linia {number} poza zakresem 0-{len(self.starts) - 1}")
+        raw = self.data[slice(*self.byte_range(number, number + 1))]
+        ending = 2 if raw.endswith(b"\r\n") else 1 if raw.endswith((b"\n", b"\r")) else 0
+        text = raw[:len(raw) - ending].decode("utf-8")
+        return text + "\n" if keepends and ending else text
+
+    def __getitem__(self, number: int) -> str:
+        return self.line(number)
+
+    def lines(self, first: int = 0, stop: int | None = None, keepends: bool = False):
+        # Leniwie, po kolei: linie first..stop-1
+        stop = len(self.starts) if stop is None else min(stop, len(self.starts))
+        for number in range(first, stop):
+            yield self.line(number, keepends)
+
+    def __iter__(self):
+        return self.lines()
+
+    def sample(self, sample_size: int, rng: random.Random | None = None) -> list[int]:
+        # Numery losowych linii bez powtórzeń, w kolejności losowania (jak random.sample);
+        # domyślnie globalny generator modułu random, więc random.seed() działa
+        rng = random if rng is None else rng
+        return rng.sample(range(len(self.starts)), min(sample_size, len(self.starts)))
+
+    def split(self, parts: int) -> list[tuple[int, int]]:
+        # Zakresy linii [first, stop) o zbliżonej liczbie bajtów: granica to pierwsza
+        # linia zaczynająca się na lub za kolejną częścią rozmiaru pliku. Bardzo długie
+        # linie mogą dać puste zakresy.
+        bounds = [0]
+        for part in range(1, parts):
+            bounds.append(max(bounds[-1], bisect_left(self.starts, self.size * part // parts)))
+        bounds.append(len(self.starts))
+        return list(zip(bounds, bounds[1:]))
+
+    def close(self):
+        if isinstance(self.starts, memoryview):
+            self.starts.release()
+        if self.index_map is not None:
+            self.index_map.close()
+            self.index_map = None
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zbuduj indeks początków linii (<plik>.lines)")
+    parser.add_argument("files", nargs="+", help="Pliki tekstowe")
+    parser.add_argument("--parts", type=int, default=None, help="Wypisz podział na N części o zbliżonej liczbie bajtów")
+    args = parser.parse_args()
+    for path in args.files:
+        with LineIndex(path) as index:
+            print(f"{path}: {len(index)} linii, {index.size} bajtów -> {index.index_path}")
+            if args.parts:
+                for number, (first, stop) in enumerate(index.split(args.parts)):
+                    start, end = index.byte_range(first, stop)
+                    print(f"  {number}: linie {first}-{stop} bajty {start}-{end}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,50 @@
 import re
+import heapq
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import os
+import shutil
+import sqlite3
 import textwrap
+import time
+from array import array
+from bisect import bisect_left
 from datetime import date
 from string import whitespace
 import random
 import argparse
 import sys
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import accumulate, chain, islice
+from json.decoder import scanstring
+from json.scanner import make_scanner
 
+import lexicons
+import numpy as np
 import spacy
+from lexicons import (
+    NAME_FIRST,
+    NAME_HONORIFICS,
+    NAME_LAST,
+    NAME_WORD_REGEX,
+    UPPERCASE_LETTERS,
+    CityGazetteer,
+    NameLexicon,
+)
+from line_index import LineIndex
+from morphology import MorphologyCache
 from priv_masker import add_pipeline
+from priv_masker.tools.components import ANNOTATIONS, MASKS
+from spacy.attrs import IDX, IS_PUNCT, IS_SPACE, LENGTH
+from spacy.lang.pl.stop_words import STOP_WORDS
+from spacy.language import Language
+from spacy.tokens import Doc, Token
+from spacy.tokens.underscore import Underscore
+from spacy.util import minibatch
 
 
 masked_components_default = {
@@ -29,12 +66,45 @@ MASK_PLACEHOLDERS = {
     "orgname_mask": "{company}",
 }
 
+# Tabela kategorii MaskSpans: identyfikator kategorii to indeks placeholdera
+SPAN_CATEGORIES = (
+    "{name}",
+    "{surname}",
+    "{address}",
+    "{city}",
+    "{phone}",
+    "{email}",
+    "{age}",
+    "{pesel}",
+    "{document-number}",
+    "{sex}",
+    "{company}",
+    "{school-name}",
+    "{date}",
+    "{date-of-birth}",
+    "{job-title}",
+    "{health}",
+    "{relative}",
+    "{political-view}",
+    "{username}",
+    "{bank-account}",
+    "{credit-card-number}",
+    "{secret}",
+    "{ethnicity}",
+    "{religion}",
+    "{sexual-orientation}",
+)
+SPAN_CATEGORY_IDS = {placeholder: index for index, placeholder in enumerate(SPAN_CATEGORIES)}
+
 PESEL_REGEX = re.compile(r"\b\d{11}\b")
 PESEL_CONTEXT_REGEX = re.compile(
     r"\bPESEL\b.{0,40}?([0-9A-Za-z]{11})",
     re.IGNORECASE | re.DOTALL,
 )
 PESEL_CANDIDATE_REGEX = re.compile(r"\b[0-9A-Za-z]{11}\b")
+# Wagi cyfr PESEL (z cyfrą kontrolną: suma ważona ≡ 0 mod 10) i ich odwrotności modulo 10
+PESEL_WEIGHTS = (1, 3, 7, 9, 1, 3, 7, 9, 1, 3, 1)
+PESEL_WEIGHT_INVERSE = {1: 1, 3: 7, 7: 3, 9: 9}
 
 BANK_ACCOUNT_REGEX = re.compile(r"\b(?:PL\d{26}|\d{26})\b")
 CREDIT_CARD_REGEX = re.compile(r"\b(?:\d{4}[- ]?){3}\d{4}\b")
@@ -161,6 +231,20 @@ MONTH_WORDS = {
     "grudnia",
 }
 
+# Słowa kontekstu daty w oknie wokół tokenu (should_mask_date_token), razem z nazwami miesięcy
+DATE_CONTEXT_KEYWORDS = (
+    "z dnia",
+    "data urodzenia",
+    "urodzony",
+    "urodzona",
+    "urodz.",
+    "rok",
+    "r.",
+    "r ",
+    "dnia",
+)
+DATE_CONTEXT_WORDS = (*DATE_CONTEXT_KEYWORDS, *sorted(MONTH_WORDS))
+
 DATE_ISO_REGEX = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
 DATE_DMY_REGEX = re.compile(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b")
 DATE_D_MONTH_Y_REGEX = re.compile(
@@ -186,23 +270,996 @@ GENERIC_LONG_NUMBER_REGEX = re.compile(
     r"\b(?:\d[ \-./]*){6,}\d\b"
 )
 
+DOCUMENT_NUMBER_PREFIX_REGEX = re.compile(
+    r"\b(?:NIP|REGON|Nr|nr|ZDP|GK|GN|MAP|Ewid|EWID)\b[^\n\r]{0,30}"
+)
+DOCUMENT_NUMBER_VALUE_REGEX = re.compile(r"\d[\d\s\-]{5,}")
+# typowe serie dowodu: 2–3 litery + 3–7 cyfr, np. HJG433, WL6371
+ID_CARD_SERIES_REGEX = re.compile(r"\b([A-Za-z]{2,3}\d{3,7})\b")
+DIGIT_REGEX = re.compile(r"\d")
+
+# Detektory "słownikowe" – (nazwa, regex, placeholder), w kolejności priorytetu.
+PATTERN_DETECTORS = [
+    ("age", AGE_REGEX, "{age}"),
+    ("sex", SEX_REGEX, "{sex}"),
+    ("username", USERNAME_REGEX, "{username}"),
+    ("secret", SECRET_REGEX, "{secret}"),
+    ("relative", RELATIVE_REGEX, "{relative}"),
+    ("relative_by_surname", RELATIVE_BY_SURNAME_REGEX, "{relative}"),
+    ("city", CITY_REGEX, "{city}"),
+    ("religion", RELIGION_REGEX, "{religion}"),
+    ("political", POLITICAL_REGEX, "{political-view}"),
+    ("ethnicity", ETHNICITY_REGEX, "{ethnicity}"),
+    ("sexual_orientation", SEXUAL_ORIENTATION_REGEX, "{sexual-orientation}"),
+    ("health", HEALTH_REGEX, "{health}"),
+    ("company", COMPANY_REGEX, "{company}"),
+    ("school", SCHOOL_REGEX, "{school-name}"),
+    ("job_title", JOB_TITLE_REGEX, "{job-title}"),
+    ("username_social", USERNAME_SOCIAL_REGEX, "{username}"),
+    ("email", EMAIL_REGEX, "{email}"),
+]
+
+# Warunki konieczne dopasowania każdego detektora: (słowa kluczowe, czy wymaga cyfry).
+# Słowa kluczowe są małymi literami; detektor jest "żywy", gdy w linii występuje
+# którekolwiek z nich (bez względu na wielkość liter). None = brak wymagań słownikowych.
+# Warunki muszą być nadzbiorem tego, co dopasowuje regex – inaczej zmieni się wynik.
+DETECTOR_TRIGGERS = {
+    "pesel": (None, True),
+    "pesel_context": (("pesel",), False),
+    "pesel_candidate": (None, True),
+    "dob": (("ur", "data urodzenia"), True),
+    "date_iso": (None, True),
+    "date_dmy": (None, True),
+    "date_month": (None, True),
+    "bank_account": (None, True),
+    "credit_card": (None, True),
+    "phone_context": (
+        ("tel", "kom", "phone", "fax", "zadzwoń", "zadzwon", "kontakt", "+"),
+        True,
+    ),
+    "document_context": (
+        ("nip", "regon", "nr", "zdp", "gk", "gn", "map", "ewid"),
+        True,
+    ),
+    "id_card": (("dowod", "dowód"), True),
+    "age": (None, True),
+    "sex": (("mężczyzna", "kobieta", "inna", "niebinarn"), False),
+    "username": (("login", "username", "użytkownik"), False),
+    "secret": (
+        ("hasło", "password", "passwd", "pwd", "token", "api key", "klucz api"),
+        False,
+    ),
+    "relative": (
+        ("mój", "moja", "moje", "syn", "córka", "brat", "siostra", "ojciec",
+         "matka", "mąż", "żona"),
+        False,
+    ),
+    "relative_by_surname": (("syn", "córka"), False),
+    "city": (("miasto", "w mieście"), False),
+    "religion": (("wyznanie", "religia"), False),
+    "political": (("polityczne",), False),
+    "ethnicity": (("narodowość", "pochodzenie"), False),
+    "sexual_orientation": (("orientacja seksualna",), False),
+    "health": (
+        ("rozpoznanie", "diagnoza", "choruje na", "leczony z powodu"),
+        False,
+    ),
+    "company": (("firma", "przedsiębiorstwo", "spółka"), False),
+    "school": (
+        ("szkoła", "liceum", "technikum", "uniwersytet", "politechnika",
+         "akademia"),
+        False,
+    ),
+    "job_title": (("stanowisko", "funkcja"), False),
+    "username_social": (("@",), False),
+    "email": (("@",), False),
+    "phone": (None, True),
+    "generic_number": (None, True),
+}
+
+# Znaki, które re.IGNORECASE utożsamia z literami słów kluczowych,
+# a których str.lower() nie sprowadza do tej samej litery.
+IGNORECASE_FOLD = str.maketrans({"İ": "i", "ı": "i", "ſ": "s"})
+
+
+class DetectorPlan:
+    """Skompilowany plan detektorów regexowych.
+
+    Zamiast uruchamiać każdy regex na każdej linii, plan raz sprawdza warunki
+    konieczne (słowa kluczowe, obecność cyfr) i zwraca zbiór detektorów,
+    które w ogóle mogą coś dopasować. Pozostałe są pomijane bez zmiany wyniku.
+    """
+
+    def __init__(self, triggers: dict):
+        self.detectors = frozenset(triggers)
+        self.always = frozenset(
+            name for name, (keywords, needs_digit) in triggers.items()
+            if keywords is None and not needs_digit
+        )
+        self.digit_only = frozenset(
+            name for name, (keywords, needs_digit) in triggers.items()
+            if keywords is None and needs_digit
+        )
+        # słowo kluczowe -> detektory, które od niego zależą
+        self.keyword_detectors = {}
+        self.needs_digit = {}
+        for name, (keywords, needs_digit) in triggers.items():
+            self.needs_digit[name] = needs_digit
+            for keyword in keywords or ():
+                self.keyword_detectors.setdefault(keyword, set()).add(name)
+
+    def live_detectors(self, text: str) -> frozenset:
+        has_digit = DIGIT_REGEX.search(text) is not None
+        folded = text.translate(IGNORECASE_FOLD).lower()
+        live = set(self.always)
+        if has_digit:
+            live.update(self.digit_only)
+        for keyword, names in self.keyword_detectors.items():
+            if keyword in folded:
+                for name in names:
+                    if has_digit or not self.needs_digit[name]:
+                        live.add(name)
+        return frozenset(live)
+
+
+DETECTOR_PLAN = DetectorPlan(DETECTOR_TRIGGERS)
+
+# Szybka ścieżka (--fast-path): warunki konieczne, żeby komponenty NER/priv_masker
+# mogły cokolwiek oznaczyć. Linie bez nich przechodzą tylko przez regexy.
+FAST_PATH_TRIGGER_REGEX = re.compile(
+    # e-mail w contact_mask (@, © lub Q jako "małpa" po OCR)
+    r"[@©Q]"
+    # długie numery: id_numbers_mask (PESEL, NIP, REGON)
+    r"|\d{5,}"
+    # rok dla priv_year (date_mask)
+    r"|(?<!\d)(?:19|20)\d\d(?!\d)"
+    # liczby obok siebie: daty, kody pocztowe, numery domów i mieszkań, telefony
+    r"|\d(?:\s?[./\\\-]\s?|\s)\d"
+    # dzień + nazwa miesiąca lub rzymski numer miesiąca
+    r"|(?i:\d\.?\s*(?:stycz|lut|mar|kwie|maj|czerw|lip|sierp|wrze|pa[zź]dz|listop|grud|[ivx]{1,4}\b))"
+    # słowa kontekstowe contact_mask, id_numbers_mask i address_mask
+    r"|(?i:kontakt|tel|fax|mail|dow[oó]d|osobist|pesel|regon|\bnip\b|\b(?:ul|al|pl|os)\b"
+    r"|alej|alei|plac|osiedl|rondo|\bróg\b|mieszkani|lokal|\b(?:m|lok|pok)\b)"
+)
+# cash_mask (domyślnie wyłączony): nazwy i symbole walut
+FAST_PATH_CASH_REGEX = re.compile(r"[$€£]|(?i:zł|złot|pln|eur|usd|dolar|frank|funt|groszy)")
+# Słowa zawierające wielką literę: kandydaci na imiona, nazwiska i encje NER
+CAPITALIZED_WORD_REGEX = re.compile(r"\w*[%s]\w*" % UPPERCASE_LETTERS)
+# Znaki, które mogą stać między końcem zdania a pierwszym słowem kolejnego. Wielka
+# litera na początku zdania nie jest sygnałem tylko dla słów funkcyjnych (STOP_WORDS):
+# "Jan" czy "Kraków" otwierające zdanie wciąż trafiają do modelu.
+SENTENCE_OPENERS = " \t\"'„”«»()[]-–—"
+
+# Gazeter miejscowości (--city-gazetteer, lexicons.CityGazetteer): kontekst, w którym
+# trafienie w gazeterze jest maskowane jako {city} (kod pocztowy, "miejscowość:",
+# "gmina", nagłówek pisma "Warszawa, dnia ...")
+CITY_CONTEXT_BEFORE_REGEX = re.compile(
+    r"(?=[\dmgw])(?:\b\d{2}-\d{3}|\b(?:miejscowo[śs][ćc]i?|miasto|msc\.|gmin[aey]|gm\.|wie[śs])\s*:?)\s*",
+    re.IGNORECASE,
+)
+CITY_CONTEXT_AFTER_REGEX = re.compile(r"\s*,\s*(?:dnia|dn\.)", re.IGNORECASE)
+
+# --morfeusz: jedno lub dwa słowa z wielkiej litery po tytule, sprawdzane w morfeuszu
+MORPH_PERSON_REGEX = re.compile(
+    r"\b(?i:%s)\.?\s+(%s)(?: (%s))?" % (NAME_HONORIFICS, NAME_WORD_REGEX.pattern, NAME_WORD_REGEX.pattern)
+)
+
+# Granice segmentów dla --segment-cache: koniec zdania po słowie z co najmniej 4 liter
+# (pomija skróty typu "ul.", "r.", "J.") i wielka litera na początku kolejnego
+SEGMENT_BOUNDARY_REGEX = re.compile(
+    r"(?<=[^\W\d_]{4}[.!?])(?<!prof\.)(?<!godz\.)(?<!sygn\.)\s+(?=[„\"(]?[A-ZĄĆĘŁŃÓŚŹŻ])"
+)
+# Krótsze zdania są dołączane do następnego – nie opłaca się ich osobno pamiętać
+SEGMENT_MIN_LENGTH = 40
+
+# Zależności komponentów priv_masker (--prune-components): inne komponenty priv_masker
+# oraz możliwości modelu spaCy, z których korzystają (POS/tag, drzewo zależności,
+# lematy, encje NER). Wyznaczone na podstawie atrybutów czytanych przez każdy komponent;
+# tests/test_components.py porównuje je ze źródłami zainstalowanego priv_masker.
+COMPONENT_DEPENDENCIES = {
+    "mask": (),
+    "priv_capitalized": ("tagger",),
+    "priv_currency": ("lemmatizer",),
+    "priv_day": (),
+    "priv_month": ("lemmatizer",),
+    "priv_year": (),
+    "priv_name": ("lemmatizer",),
+    "priv_last_name": ("lemmatizer",),
+    "priv_number": ("tagger", "lemmatizer"),
+    "priv_street_name": ("tagger", "lemmatizer"),
+    "priv_place_name": ("lemmatizer",),
+    "priv_nominal_phrases": ("priv_number", "tagger", "parser"),
+    "priv_stop_word": ("lemmatizer",),
+    "contact_mask": ("mask", "priv_nominal_phrases", "priv_number", "lemmatizer"),
+    "date_mask": ("mask", "priv_day", "priv_month", "priv_year"),
+    "persname_mask": (
+        "mask", "priv_name", "priv_last_name", "priv_stop_word", "tagger", "lemmatizer", "ner",
+    ),
+    "address_mask": (
+        "mask", "priv_street_name", "priv_number", "priv_place_name", "priv_nominal_phrases",
+        "tagger", "lemmatizer", "ner",
+    ),
+    "id_numbers_mask": ("mask", "priv_nominal_phrases", "priv_number", "lemmatizer"),
+    "cash_mask": ("mask", "priv_currency", "priv_number", "priv_nominal_phrases"),
+    "orgname_mask": ("mask", "ner"),
+    "invalid_unmask": ("mask", "priv_number", "lemmatizer"),
+    # lematyzator modelu korzysta z tagów morfologicznych
+    "lemmatizer": ("tagger",),
+}
+# Możliwości modelu spaCy -> nazwy komponentów, które można pominąć przy ładowaniu.
+# tok2vec i komponenty o innych nazwach zostają zawsze.
+UPSTREAM_COMPONENTS = {
+    "tagger": ("tagger", "morphologizer", "attribute_ruler"),
+    "parser": ("parser",),
+    "lemmatizer": ("lemmatizer",),
+    "ner": ("ner",),
+}
+
+
+def required_components(masked_components: dict) -> set:
+    """Domknięcie zależności komponentów potrzebnych dla włączonych masek.
+
+    Maski priv_masker działają po kolei i każda nadpisuje token._.mask, więc wyłączona
+    maska uruchamiana po włączonej wpływa na wynik (odznacza tokeny) i musi zostać.
+    Pomijane są tylko maski, przed którymi nie działa żadna włączona.
+    """
+    needed = {"mask"}
+    shadowing = False
+    for _, name in MASKS:
+        if masked_components.get(name, False):
+            shadowing = True
+        if shadowing:
+            needed.add(name)
+    pending = list(needed)
+    while pending:
+        for dependency in COMPONENT_DEPENDENCIES.get(pending.pop(), ()):
+            if dependency not in needed:
+                needed.add(dependency)
+                pending.append(dependency)
+    return needed
+
+
+class SpanIndex:
+    """Posortowany zbiór rozłącznych spanów (start, end, placeholder).
+
+    Zapytanie o nakładanie się to jedno wyszukiwanie binarne: spany są rozłączne,
+    więc jedynym kandydatem jest ostatni span zaczynający się przed końcem zapytania.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.placeholders = []
+
+    @classmethod
+    def from_sorted(cls, spans):
+        index = cls()
+        for start, end, placeholder in spans:
+            index.starts.append(start)
+            index.ends.append(end)
+            index.placeholders.append(placeholder)
+        return index
+
+    def overlaps(self, start: int, end: int) -> bool:
+        pos = bisect_left(self.starts, end) - 1
+        return pos >= 0 and self.ends[pos] > start
+
+    def add(self, start: int, end: int, placeholder: str) -> bool:
+        pos = bisect_left(self.starts, end)
+        if pos > 0 and self.ends[pos - 1] > start:
+            return False
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.placeholders.insert(pos, placeholder)
+        return True
+
+    def spans(self) -> list:
+        return list(zip(self.starts, self.ends, self.placeholders))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.placeholders)
+
+
+class MaskSpans:
+    """Wynik analizy jednej linii: kolumny array("i") start, end i id kategorii.
+
+    Spany są rozłączne i posortowane po starcie (stan po scalaniu w resolve_spans),
+    a nazwę kategorii daje SPAN_CATEGORIES[id]. apply_spans() składa z nich tekst;
+    odbiorcy potrzebujący tylko pozycji czytają kolumny wprost albo jako tablice
+    numpy bez kopiowania (columns()). Iteracja zwraca krotki (start, end, placeholder).
+    """
+
+    __slots__ = ("starts", "ends", "categories")
+
+    def __init__(self):
+        self.starts = array("i")
+        self.ends = array("i")
+        self.categories = array("i")
+
+    def append(self, start: int, end: int, placeholder: str) -> None:
+        self.starts.append(start)
+        self.ends.append(end)
+        self.categories.append(SPAN_CATEGORY_IDS[placeholder])
+
+    def placeholders(self) -> list[str]:
+        return [SPAN_CATEGORIES[category] for category in self.categories]
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Widoki int32 na bufory kolumn; do czasu ich zwolnienia kolumn nie można powiększać
+        return tuple(np.frombuffer(column, np.int32) for column in (self.starts, self.ends, self.categories))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, map(SPAN_CATEGORIES.__getitem__, self.categories))
+
+    def __eq__(self, other):
+        if not isinstance(other, MaskSpans):
+            return NotImplemented
+        return (self.starts, self.ends, self.categories) == (other.starts, other.ends, other.categories)
+
+    def __repr__(self):
+        return f"MaskSpans({list(self)!r})"
+
+
+class DateContextIndex:
+    """Czy w oknie ±radius tokenów występuje słowo kontekstu daty lub nazwa miesiąca.
+
+    Okno tokenu to ciąg małych liter tokenów połączonych spacjami (jak w dawnym
+    should_mask_date_token). Zamiast budować je dla każdego tokenu, wystąpienia słów
+    są szukane raz w całym dokumencie; okno zawiera słowo, gdy najwcześniej kończące się
+    wystąpienie zaczynające się w oknie kończy się przed jego końcem. Budowa indeksu
+    kosztuje mniej więcej tyle co kilka okien, więc pierwsze zapytania (direct_queries)
+    są sprawdzane wprost, a indeks powstaje dopiero dla dokumentów z większą liczbą dat.
+    """
+
+    def __init__(self, doc, radius: int = 3, direct_queries: int = 6):
+        self.doc = doc
+        self.radius = radius
+        self.direct_queries = direct_queries
+        self.lowered = None
+
+    def build(self) -> None:
+        self.lowered = [token.text.lower() for token in self.doc]
+        # początki tokenów w połączonym tekście
+        self.starts = list(accumulate((len(word) + 1 for word in self.lowered), initial=0))
+        joined = " ".join(self.lowered)
+        occurrences = []
+        for word in DATE_CONTEXT_WORDS:
+            position = joined.find(word)
+            while position != -1:
+                occurrences.append((position, position + len(word)))
+                position = joined.find(word, position + 1)
+        occurrences.sort()
+        self.occurrence_starts = [start for start, _ in occurrences]
+        # min_end[j]: najwcześniejszy koniec wystąpienia spośród j-tego i dalszych
+        self.min_end = list(
+            accumulate((end for _, end in reversed(occurrences)), min, initial=len(joined) + 1)
+        )
+        self.min_end.reverse()
+
+    def has_context(self, i: int) -> bool:
+        first = max(0, i - self.radius)
+        last = min(len(self.doc), i + self.radius + 1) - 1
+        if self.lowered is None:
+            if self.direct_queries > 0:
+                self.direct_queries -= 1
+                window = " ".join(token.text.lower() for token in self.doc[first:last + 1])
+                return any(word in window for word in DATE_CONTEXT_WORDS)
+            self.build()
+        window_start = self.starts[first]
+        window_end = self.starts[last] + len(self.lowered[last])
+        return self.min_end[bisect_left(self.occurrence_starts, window_start)] <= window_end
+
+
+# Liczba dni w miesiącu (indeks = numer miesiąca; 0 i 13+ niepoprawne), luty bez roku przestępnego
+DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31, 0, 0, 0, 0, 0, 0, 0])
+# Stulecie PESEL wg przesunięcia miesiąca: 01–12 -> 1900, 21–32 -> 2000, ..., 81–92 -> 1800
+PESEL_CENTURY = np.array([1900, 2000, 2100, 2200, 1800])
+
+
+def digit_matrix(numbers: list[str]) -> np.ndarray:
+    # Ciągi cyfr ASCII tej samej długości -> macierz (liczba ciągów, długość)
+    raw = np.frombuffer("".join(numbers).encode("ascii"), dtype=np.uint8)
+    return raw.reshape(len(numbers), -1).astype(np.int64) - ord("0")
+
+
+def pesel_valid_rows(digits: np.ndarray) -> np.ndarray:
+    year_part = digits[:, 0] * 10 + digits[:, 1]
+    month_raw = digits[:, 2] * 10 + digits[:, 3]
+    day = digits[:, 4] * 10 + digits[:, 5]
+    month = month_raw % 20
+    year = PESEL_CENTURY[month_raw // 20] + year_part
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days = DAYS_IN_MONTH[month] + ((month == 2) & leap)
+    checksum = digits @ np.array(PESEL_WEIGHTS)
+    return (day >= 1) & (day <= days) & (checksum % 10 == 0)
+
+
+def luhn_valid_rows(digits: np.ndarray) -> np.ndarray:
+    doubled = digits[:, ::-1].copy()
+    doubled[:, 1::2] *= 2
+    doubled[doubled > 9] -= 9
+    return doubled.sum(axis=1) % 10 == 0
+
+
+def validate_grouped(numbers: dict[str, str], check) -> dict[str, bool]:
+    # numbers: kandydat -> jego cyfry; jedno wywołanie check na grupę o tej samej długości
+    by_length = {}
+    for candidate, digits in numbers.items():
+        by_length.setdefault(len(digits), []).append(candidate)
+    result = {}
+    for length, candidates in by_length.items():
+        rows = check(digit_matrix([numbers[c] for c in candidates]))
+        result.update(zip(candidates, rows.tolist()))
+    return result
+
+
+class CandidateValidation:
+    """Zbiorcza walidacja kandydatów numerycznych z paczki linii (mask_many).
+
+    Wszystkie PESEL-e i numery kart z paczki są sprawdzane naraz na macierzach
+    cyfr NumPy. Interfejs jak metody is_valid_* w TextAnonymizer; kandydaci spoza
+    paczki lub z cyframi spoza ASCII trafiają do walidacji pojedynczej.
+    Dopasowania (także rachunków, maskowanych bez walidacji) są zapamiętywane
+    (matches), żeby build_regex_spans nie szukał ich ponownie.
+    """
+
+    PATTERNS = (PESEL_REGEX, CREDIT_CARD_REGEX, BANK_ACCOUNT_REGEX)
+
+    def __init__(self, texts, fallback):
+        self.fallback = fallback
+        # tekst -> {regex: lista dopasowań}
+        self.matches = {}
+        pesels, cards = {}, {}
+        for text in texts:
+            if text in self.matches or not DIGIT_REGEX.search(text):
+                continue
+            found = {pattern: list(pattern.finditer(text)) for pattern in self.PATTERNS}
+            self.matches[text] = found
+            for match in found[PESEL_REGEX]:
+                pesel = match.group(0)
+                if pesel.isascii():
+                    pesels[pesel] = pesel
+            for match in found[CREDIT_CARD_REGEX]:
+                card = match.group(0)
+                digits = card.replace(" ", "").replace("-", "")
+                if card.isascii() and 13 <= len(digits) <= 19:
+                    cards[card] = digits
+        self.pesel = validate_grouped(pesels, pesel_valid_rows)
+        self.credit_card = validate_grouped(cards, luhn_valid_rows)
+
+    def is_valid_pesel(self, pesel: str) -> bool:
+        valid = self.pesel.get(pesel)
+        return self.fallback.is_valid_pesel(pesel) if valid is None else valid
+
+    def is_valid_credit_card(self, number: str) -> bool:
+        valid = self.credit_card.get(number)
+        return self.fallback.is_valid_credit_card(number) if valid is None else valid
+
+
+def package_version(name: str) -> str | None:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def cache_fingerprint(
+    model_name: str = "pl_nask",
+    masked_components: dict | None = None,
+    fast_path: bool = False,
+    segment_cache_size: int = 0,
+    chunk_chars: int = 0,
+    chunk_overlap: int = 200,
+    city_gazetteer: str | None = None,
+    name_lexicon: str | None = None,
+    no_ner: bool = False,
+    morfeusz: bool = False,
+    **_,
+) -> str:
+    # Wszystko, od czego zależy wynik maskowania linii: model (z wersją pakietu), zestaw
+    # masek, opcje zmieniające wynik, wersja priv_masker i kod tego modułu (z lexicons).
+    # Przyjmuje te same argumenty co TextAnonymizer; pozostałe (np. prune_components) pomija.
+    if masked_components is None:
+        masked_components = masked_components_default
+    code = hashlib.sha256()
+    for module_path in (__file__, lexicons.__file__):
+        with open(module_path, "rb") as source:
+            code.update(source.read())
+    code_version = code.hexdigest()
+    gazetteer_version = None
+    if city_gazetteer is not None:
+        with open(city_gazetteer, "rb") as gazetteer:
+            gazetteer_version = hashlib.sha256(gazetteer.read()).hexdigest()
+    lexicon_version = None
+    if name_lexicon is not None:
+        digest = hashlib.sha256()
+        for name in NameLexicon.FILES:
+            with open(os.path.join(name_lexicon, name), "rb") as lexicon:
+                digest.update(lexicon.read())
+        lexicon_version = digest.hexdigest()
+    return json.dumps(
+        {
+            "model": model_name,
+            "model_version": package_version(model_name),
+            "priv_masker": package_version("priv-masker"),
+            "masked_components": sorted(masked_components.items()),
+            "fast_path": fast_path,
+            "segments": bool(segment_cache_size),
+            "chunks": (chunk_chars, chunk_overlap) if chunk_chars else None,
+            "city_gazetteer": gazetteer_version,
+            "name_lexicon": lexicon_version,
+            "no_ner": no_ner,
+            "morfeusz": package_version("morfeusz2") if morfeusz else None,
+            "code": code_version,
+        },
+        sort_keys=True,
+    )
+
+
+class MaskCache:
+    """Trwały cache wyników maskowania linii w SQLite (--cache-dir).
+
+    Klucz to SHA-256 z odcisku konfiguracji (cache_fingerprint) i tekstu linii, więc
+    zmiana modelu, masek lub kodu po prostu przestaje trafiać w stare wpisy. Po
+    przekroczeniu max_entries usuwane są najdawniej używane wpisy (LRU), z zapasem
+    10%, żeby nie sprzątać po każdej paczce.
+    """
+
+    FILENAME = "masker_cache.sqlite3"
+    # Limit parametrów jednego zapytania SQLite
+    QUERY_CHUNK = 500
+
+    def __init__(self, directory: str, fingerprint: str, max_entries: int = 1_000_000):
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, self.FILENAME), timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS masks "
+            "(key BLOB PRIMARY KEY, masked TEXT NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS masks_last_used ON masks (last_used)")
+        self.db.commit()
+        self.prefix = fingerprint.encode("utf-8") + b"\0"
+        self.max_entries = max_entries
+        self.entries = self.db.execute("SELECT COUNT(*) FROM masks").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(self.prefix + text.encode("utf-8")).digest()
+
+    def lookup(self, texts: list[str]) -> dict[str, str]:
+        # Zwraca tekst -> wynik dla trafień i odświeża ich czas użycia
+        keys = {self.key(text): text for text in texts}
+        key_list = list(keys)
+        found = {}
+        for i in range(0, len(key_list), self.QUERY_CHUNK):
+            part = key_list[i:i + self.QUERY_CHUNK]
+            placeholders = ",".join("?" * len(part))
+            for key, masked in self.db.execute(
+                f"SELECT key, masked FROM masks WHERE key IN ({placeholders})", part
+            ):
+                found[key] = masked
+        if found:
+            now = time.time_ns()
+            with self.db:
+                self.db.executemany(
+                    "UPDATE masks SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+        hits = {keys[key]: masked for key, masked in found.items()}
+        for text in texts:
+            if text in hits:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hits
+
+    def store(self, results: dict[str, str]) -> None:
+        now = time.time_ns()
+        with self.db:
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO masks VALUES (?, ?, ?)",
+                [(self.key(text), masked, now) for text, masked in results.items()],
+            )
+            self.entries += self.db.total_changes - before
+        if self.entries > self.max_entries:
+            self.evict()
+
+    def evict(self) -> None:
+        keep = int(self.max_entries * 0.9)
+        with self.db:
+            self.db.execute(
+                "DELETE FROM masks WHERE key IN "
+                "(SELECT key FROM masks ORDER BY last_used LIMIT ?)",
+                (max(0, self.entries - keep),),
+            )
+        self.entries = self.db.execute("SELECT COUNT(*) FROM masks").fetchone()[0]
+
+    def mask_many(self, texts, batch_size: int, mask_misses):
+        # Paczkami: trafienia z cache, pozostałe (bez powtórzeń) przez mask_misses(lista)
+        texts = iter(texts)
+        while chunk := list(islice(texts, batch_size)):
+            results = self.lookup(chunk)
+            misses = list(dict.fromkeys(text for text in chunk if text not in results))
+            if misses:
+                computed = dict(zip(misses, mask_misses(misses)))
+                self.store(computed)
+                results.update(computed)
+            for text in chunk:
+                yield results[text]
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return (
+            f"Cache: {self.hits} trafień, {self.misses} chybień ({rate:.1%}), "
+            f"{self.entries} wpisów"
+        )
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def split_segments(text: str, min_length: int = SEGMENT_MIN_LENGTH) -> list[str]:
+    # Naprzemiennie segment, separator, segment...; "".join(...) odtwarza tekst
+    parts = []
+    start = 0
+    for match in SEGMENT_BOUNDARY_REGEX.finditer(text):
+        if match.start() - start < min_length:
+            continue
+        parts.append(text[start:match.start()])
+        parts.append(match.group())
+        start = match.end()
+    parts.append(text[start:])
+    return parts
+
+
+class SegmentCache:
+    """Pamięć LRU zamaskowanych zdań (--segment-cache).
+
+    Linie różniące się kilkoma polami dzielą długie, identyczne akapity, więc cache
+    całych linii w nie nie trafia. Linia jest dzielona na zdania (split_segments),
+    przez potok przechodzą tylko zdania niewidziane wcześniej, a wynik jest sklejany
+    z oryginalnymi separatorami. Zdanie maskowane jest bez kontekstu sąsiednich,
+    więc NER na granicach może się różnić od maskowania całej linii.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def mask_many(self, texts, batch_size: int, mask_misses):
+        # Ten sam kontrakt co MaskCache.mask_many, ale na poziomie zdań
+        texts = iter(texts)
+        while chunk := list(islice(texts, batch_size)):
+            split = [split_segments(text) for text in chunk]
+            results = {}
+            for parts in split:
+                for segment in parts[0::2]:
+                    if segment in results:
+                        continue
+                    masked = self.entries.get(segment)
+                    if masked is None:
+                        results[segment] = None
+                        continue
+                    self.entries.move_to_end(segment)
+                    results[segment] = masked
+            misses = [segment for segment, masked in results.items() if masked is None]
+            results.update(zip(misses, mask_misses(misses)))
+            for segment in misses:
+                self.entries[segment] = results[segment]
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.misses += len(misses)
+            self.hits += sum(len(parts) // 2 + 1 for parts in split) - len(misses)
+            for parts in split:
+                parts[0::2] = [results[segment] for segment in parts[0::2]]
+                yield "".join(parts)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return (
+            f"Cache zdań: {self.hits} trafień, {self.misses} chybień ({rate:.1%}), "
+            f"{len(self.entries)} wpisów"
+        )
+
+
+@Language.component("release_doc_annotations")
+def release_doc_annotations(doc):
+    # priv_nominal_phrases (listy tokenów) są potrzebne tylko komponentowi contact_mask,
+    # a blokują serializację Doc w nlp.pipe(n_process > 1) – zwalniamy je na końcu potoku.
+    if doc.has_extension("priv_nominal_phrases"):
+        doc._.priv_nominal_phrases = None
+    return doc
+
+
+# Górne granice kubełków histogramów MaskMetrics w mikrosekundach: 1 µs .. ~16,8 s
+METRICS_BUCKETS_US = tuple(2**i for i in range(25))
+
+
+class MaskMetrics:
+    """Metryki maskowania (--metrics-out): czasy etapów, dopasowania detektorów, kategorie.
+
+    TextAnonymizer.instrument() podmienia etapy instancji (regexy, spany tokenowe,
+    scalanie, apply) na wersje mierzące czas, a TextAnonymizer.pipe() uruchamia
+    komponenty spaCy (nlp.pipeline) po kolei, mierząc każdy osobno; bez metryk nic
+    się nie zmienia i nie jest mierzone. Czas etapu trafia do histogramu o kubełkach
+    potęg dwójki w µs; komponenty spaCy przetwarzające paczki dokumentów zapisują
+    średni czas na dokument.
+    """
+
+    def __init__(self):
+        self.lines = 0
+        self.chars = 0
+        # etap -> [liczba, suma sekund, maksimum sekund, kubełki histogramu]
+        self.stages = {}
+        self.detector_spans = Counter()
+        self.detector_seconds = Counter()
+        self.categories = Counter()
+
+    def record(self, stage: str, seconds: float, count: int = 1) -> None:
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = [0, 0.0, 0.0, [0] * (len(METRICS_BUCKETS_US) + 1)]
+        per_item = seconds / count
+        entry[0] += count
+        entry[1] += seconds
+        entry[2] = max(entry[2], per_item)
+        entry[3][bisect_left(METRICS_BUCKETS_US, per_item * 1e6)] += count
+
+    def timed_pipe(self, stage: str, proc, docs, batch_size: int):
+        # Komponent spaCy na strumieniu dokumentów, paczkami po batch_size jak w
+        # Language.pipe; czas paczki nie obejmuje komponentów wcześniejszych w potoku,
+        # bo paczka jest pobrana, zanim zacznie się pomiar
+        for batch in minibatch(docs, batch_size):
+            start = time.perf_counter()
+            if hasattr(proc, "pipe"):
+                batch = list(proc.pipe(batch, batch_size=batch_size))
+            else:
+                batch = [proc(doc) for doc in batch]
+            self.record(stage, time.perf_counter() - start, len(batch))
+            yield from batch
+
+    def timed(self, stage: str, func):
+        clock = time.perf_counter
+
+        def measured(*args, **kwargs):
+            start = clock()
+            result = func(*args, **kwargs)
+            self.record(stage, clock() - start)
+            return result
+
+        return measured
+
+    def detector_marker(self, spans):
+        # mark(nazwa) po każdym detektorze: spany dodane i czas od poprzedniego znacznika
+        clock = time.perf_counter
+        last = [clock(), len(spans)]
+
+        def mark(name: str) -> None:
+            now = clock()
+            count = len(spans)
+            self.detector_seconds[name] += now - last[0]
+            self.detector_spans[name] += count - last[1]
+            last[0] = now
+            last[1] = count
+
+        return mark
+
+    def record_line(self, text: str, spans) -> None:
+        self.lines += 1
+        self.chars += len(text)
+        self.categories.update(spans.placeholders())
+
+    def merge(self, other: "MaskMetrics") -> None:
+        self.lines += other.lines
+        self.chars += other.chars
+        for stage, (count, total, peak, buckets) in other.stages.items():
+            entry = self.stages.get(stage)
+            if entry is None:
+                self.stages[stage] = [count, total, peak, list(buckets)]
+                continue
+            entry[0] += count
+            entry[1] += total
+            entry[2] = max(entry[2], peak)
+            entry[3] = [a + b for a, b in zip(entry[3], buckets)]
+        self.detector_spans.update(other.detector_spans)
+        self.detector_seconds.update(other.detector_seconds)
+        self.categories.update(other.categories)
+
+    def drain(self) -> "MaskMetrics":
+        # Kopia zebranych metryk i wyzerowanie tej instancji (procesy robocze puli
+        # odsyłają metryki razem z każdą paczką)
+        drained = MaskMetrics()
+        drained.merge(self)
+        self.__init__()
+        return drained
+
+    def to_dict(self) -> dict:
+        stages = {}
+        for stage, (count, total, peak, buckets) in sorted(self.stages.items()):
+            edges = (*METRICS_BUCKETS_US, float("inf"))
+            cumulative = list(accumulate(buckets))
+
+            def percentile(q):
+                # górna granica kubełka, w którym wypada q-ty kwantyl
+                edge = edges[bisect_left(cumulative, q * count)]
+                return min(edge / 1000, peak * 1000)
+
+            stages[stage] = {
+                "count": count,
+                "total_s": total,
+                "mean_ms": total / count * 1000,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": peak * 1000,
+                "histogram_us": {
+                    f"<={edge}" if edge != float("inf") else f">{METRICS_BUCKETS_US[-1]}": n
+                    for edge, n in zip(edges, buckets)
+                    if n
+                },
+            }
+        return {
+            "lines": self.lines,
+            "chars": self.chars,
+            "stages": stages,
+            "detectors": {
+                name: {"spans": self.detector_spans[name], "seconds": self.detector_seconds[name]}
+                for name in sorted(self.detector_seconds)
+            },
+            "categories": dict(self.categories.most_common()),
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
 
 class TextAnonymizer:
     def __init__(
         self,
         model_name: str = "pl_nask",
         masked_components: dict | None = None,
+        fast_path: bool = False,
+        prune_components: bool = False,
+        cache_dir: str | None = None,
+        cache_max_entries: int = 1_000_000,
+        segment_cache_size: int = 0,
+        chunk_chars: int = 0,
+        chunk_overlap: int = 200,
+        city_gazetteer: str | None = None,
+        name_lexicon: str | None = None,
+        no_ner: bool = False,
+        morfeusz: bool = False,
+        morph_cache_size: int = 100_000,
+        morph_store: str | None = None,
+        metrics: MaskMetrics | None = None,
+        nlp: Language | None = None,
     ):
         if masked_components is None:
             masked_components = dict(masked_components_default)
         self.masked_components = masked_components
-        self.nlp = spacy.load(model_name)
-        self.nlp = add_pipeline(self.nlp)
+        # fast_path: zdania, w których NER/priv_masker nie mogą nic znaleźć, omijają spaCy
+        self.fast_path = fast_path
+        self.cache = None
+        if cache_dir is not None:
+            fingerprint = cache_fingerprint(
+                model_name,
+                masked_components,
+                fast_path,
+                segment_cache_size,
+                chunk_chars,
+                chunk_overlap,
+                city_gazetteer,
+                name_lexicon,
+                no_ner,
+                morfeusz,
+            )
+            self.cache = MaskCache(cache_dir, fingerprint, cache_max_entries)
+        self.segment_cache = SegmentCache(segment_cache_size) if segment_cache_size else None
+        # chunk_chars: linie dłuższe niż tyle znaków idą przez model oknami (chunk_windows)
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.city_gazetteer = None if city_gazetteer is None else CityGazetteer(city_gazetteer)
+        self.name_lexicon = None if name_lexicon is None else NameLexicon(name_lexicon)
+        # morfeusz: imiona i nazwiska po tytule rozpoznawane etykietami morfeusz2;
+        # analizy przez MorphologyCache (LRU + opcjonalny magazyn mmap morph_store)
+        self.morphology = MorphologyCache(morph_cache_size, morph_store) if morfeusz else None
+        # no_ner: bez spaCy/priv_masker – tylko regexy, gazeter i leksykon imion
+        self.no_ner = no_ner
+        if no_ner:
+            self.nlp = None
+        elif nlp is not None:
+            # Gotowy potok spaCy (np. spacy.blank w benchmarkach) – bez dokładania priv_masker
+            self.nlp = nlp
+        elif prune_components:
+            # Ładujemy tylko komponenty modelu i priv_masker potrzebne włączonym maskom
+            needed = required_components(masked_components)
+            excluded = [
+                pipe_name
+                for capability, pipe_names in UPSTREAM_COMPONENTS.items()
+                if capability not in needed
+                for pipe_name in pipe_names
+            ]
+            self.nlp = spacy.load(model_name, exclude=excluded)
+            for _, name in ANNOTATIONS + MASKS:
+                if name in needed:
+                    self.nlp.add_pipe(name)
+        else:
+            self.nlp = spacy.load(model_name)
+            self.nlp = add_pipeline(self.nlp)
+        if self.nlp is not None:
+            self.nlp.add_pipe("release_doc_annotations", last=True)
+        self.metrics = None
+        if metrics is not None:
+            self.instrument(metrics)
+
+    def close(self) -> None:
+        # Zamyka trwały cache (--cache-dir); potok spaCy nie trzyma zasobów do zwolnienia
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def instrument(self, metrics: MaskMetrics) -> None:
+        # Etapy tej instancji zastępowane wersjami mierzącymi czas (komponenty spaCy
+        # mierzy pipe()); detektory regexowe liczy build_regex_spans (detector_marker)
+        self.metrics = metrics
+        for stage, name in (
+            ("regex", "build_regex_spans"),
+            ("token_spans", "build_token_spans"),
+            ("person_spans", "add_person_spans"),
+            ("merge", "merge_adjacent_same_placeholders"),
+        ):
+            setattr(self, name, metrics.timed(stage, getattr(self, name)))
+        self.apply_spans = metrics.timed("apply", self.apply_spans)
+        resolve_spans = self.resolve_spans
+
+        def counted_resolve_spans(text, regex_spans, token_spans):
+            spans = resolve_spans(text, regex_spans, token_spans)
+            metrics.record_line(text, spans)
+            return spans
+
+        self.resolve_spans = counted_resolve_spans
+
+    def pipe(self, texts, batch_size: int = 64, n_process: int = 1):
+        # Dokumenty spaCy dla tekstów. Z metrykami komponenty nlp.pipeline działają po
+        # kolei na strumieniu (jak w Language.pipe), każdy mierzony jako "nlp:<nazwa>";
+        # przy n_process > 1 pomiar komponentów jest pomijany.
+        if self.metrics is None or n_process != 1:
+            return self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        docs = (self.nlp.make_doc(text) for text in texts)
+        for name, proc in self.nlp.pipeline:
+            docs = self.metrics.timed_pipe(f"nlp:{name}", proc, docs, batch_size)
+        return docs
 
     def is_valid_pesel(self, pesel: str) -> bool:
         if not PESEL_REGEX.fullmatch(pesel):
             return False
         digits = [int(ch) for ch in pesel]
+        if not self.is_valid_pesel_date(digits):
+            return False
+        checksum = sum(digits[i] * PESEL_WEIGHTS[i] for i in range(10))
+        control_digit = (10 - (checksum % 10)) % 10
+        return control_digit == digits[10]
+
+    def is_valid_pesel_date(self, digits) -> bool:
+        # digits: cyfry PESEL jako liczby; sprawdzane są tylko pola daty (pozycje 0–5)
         year_part = digits[0] * 10 + digits[1]
         month_raw = digits[2] * 10 + digits[3]
         day = digits[4] * 10 + digits[5]
@@ -227,10 +1284,7 @@ class TextAnonymizer:
             date(year, month, day)
         except ValueError:
             return False
-        weights = [1, 3, 7, 9, 1, 3, 7, 9, 1, 3]
-        checksum = sum(digits[i] * weights[i] for i in range(10))
-        control_digit = (10 - (checksum % 10)) % 10
-        return control_digit == digits[10]
+        return True
 
     def is_valid_credit_card(self, number: str) -> bool:
         digits = re.sub(r"\D", "", number)
@@ -262,22 +1316,34 @@ class TextAnonymizer:
             if self.is_valid_pesel(token):
                 return token
             return None
-        base_digits = []
+        digits = []
         for ch in token:
-            if ch.isdigit():
-                base_digits.append(ch)
-            elif ch.isalpha():
-                base_digits.append(None)
+            if ch.isalpha():
+                digits.append(None)
+            elif ch.isdecimal():
+                digits.append(int(ch))
             else:
                 return None
-        from itertools import product
-        for combo in product("0123456789", repeat=len(letter_positions)):
-            candidate_digits = list(base_digits)
-            for pos, digit in zip(letter_positions, combo):
-                candidate_digits[pos] = digit
-            candidate = "".join(candidate_digits)
-            if self.is_valid_pesel(candidate):
-                return candidate
+        # Zamiast sprawdzać wszystkie 10^k podstawień: ostatnią brakującą cyfrę
+        # wyznacza suma kontrolna (wagi są odwracalne modulo 10), więc zgadujemy
+        # co najwyżej jedną cyfrę. Kolejność jak w przeszukiwaniu leksykograficznym.
+        solved = letter_positions[-1]
+        guessed = letter_positions[:-1]
+        inverse = PESEL_WEIGHT_INVERSE[PESEL_WEIGHTS[solved]]
+        # Litery tylko poza polami daty – datę wystarczy sprawdzić raz
+        date_known = letter_positions[0] > 5
+        if date_known and not self.is_valid_pesel_date(digits):
+            return None
+        for guess in range(10) if guessed else (None,):
+            if guessed:
+                digits[guessed[0]] = guess
+            digits[solved] = 0
+            remainder = sum(w * d for w, d in zip(PESEL_WEIGHTS, digits)) % 10
+            digits[solved] = (-remainder * inverse) % 10
+            if date_known or self.is_valid_pesel_date(digits):
+                return "".join(
+                    str(digits[i]) if ch.isalpha() else ch for i, ch in enumerate(token)
+                )
         return None
 
     def normalize_phone_candidate(self, fragment: str) -> str | None:
@@ -317,33 +1383,17 @@ class TextAnonymizer:
             return True
         return False
 
-    def should_mask_date_token(self, token) -> bool:
+    def should_mask_date_token(self, token, date_context=None) -> bool:
+        # date_context: DateContextIndex dokumentu, współdzielony przez jego tokeny
         text_val = token.text
         lower = text_val.lower()
         if re.search(r"\d{1,2}[./-]\d{1,2}[./-]\d{2,4}", text_val):
             return True
         if lower in MONTH_WORDS:
             return True
-        doc = token.doc
-        start = max(0, token.i - 3)
-        end = min(len(doc), token.i + 4)
-        window = " ".join(t.text.lower() for t in doc[start:end])
-        date_keywords = [
-            "z dnia",
-            "data urodzenia",
-            "urodzony",
-            "urodzona",
-            "urodz.",
-            "rok",
-            "r.",
-            "r ",
-            "dnia",
-        ]
-        if any(kw in window for kw in date_keywords):
-            return True
-        if any(month in window for month in MONTH_WORDS):
-            return True
-        return False
+        if date_context is None:
+            date_context = DateContextIndex(token.doc)
+        return date_context.has_context(token.i)
 
     def classify_address_text(self, fragment: str) -> str:
         if POSTAL_CODE_REGEX.search(fragment):
@@ -354,7 +1404,7 @@ class TextAnonymizer:
                 return "{address}"
         return "{city}"
 
-    def placeholder_for_span(self, mask_name: str, fragment: str, tokens):
+    def placeholder_for_span(self, mask_name: str, fragment: str, tokens, date_context=None):
         if not fragment.strip():
             return None
         if mask_name == "persname_mask":
@@ -375,9 +1425,11 @@ class TextAnonymizer:
                 return "{phone}"
             return self.classify_address_text(fragment)
         if mask_name == "date_mask":
-            if self.is_date_like_fragment(fragment) or any(
-                self.should_mask_date_token(t) for t in tokens
-            ):
+            if self.is_date_like_fragment(fragment):
+                return "{date}"
+            if date_context is None:
+                date_context = DateContextIndex(tokens.doc)
+            if any(self.should_mask_date_token(t, date_context) for t in tokens):
                 return "{date}"
             return None
         if mask_name == "id_numbers_mask":
@@ -395,235 +1447,566 @@ class TextAnonymizer:
             return "{company}"
         return MASK_PLACEHOLDERS.get(mask_name, "{secret}")
 
-    def build_regex_spans(self, text: str):
-        spans = []
+    def build_regex_spans(self, text: str, live=None, validation=None):
+        # live: zbiór detektorów do uruchomienia; domyślnie wyznaczany przez DETECTOR_PLAN
+        # validation: CandidateValidation paczki z mask_many; domyślnie walidacja pojedyncza
+        if live is None:
+            live = DETECTOR_PLAN.live_detectors(text)
+        validator = self if validation is None else validation
+        found = {} if validation is None else validation.matches.get(text, {})
 
-        def add_span(start: int, end: int, placeholder: str):
-            for existing_start, existing_end, _ in spans:
-                if not (end <= existing_start or start >= existing_end):
-                    return
-            spans.append((start, end, placeholder))
+        def finditer(pattern):
+            # dopasowania zebrane już przez CandidateValidation albo nowe wyszukiwanie
+            matches = found.get(pattern)
+            return pattern.finditer(text) if matches is None else matches
+
+        spans = SpanIndex()
+        add_span = spans.add
+        mark = None if self.metrics is None else self.metrics.detector_marker(spans)
 
         # PESEL i warianty
-        for match in PESEL_REGEX.finditer(text):
-            if self.is_valid_pesel(match.group(0)):
-                add_span(match.start(), match.end(), "{pesel}")
+        if "pesel" in live:
+            for match in finditer(PESEL_REGEX):
+                if validator.is_valid_pesel(match.group(0)):
+                    add_span(match.start(), match.end(), "{pesel}")
+            if mark:
+                mark("pesel")
 
-        for match in PESEL_CONTEXT_REGEX.finditer(text):
-            add_span(match.start(1), match.end(1), "{pesel}")
+        if "pesel_context" in live:
+            for match in PESEL_CONTEXT_REGEX.finditer(text):
+                add_span(match.start(1), match.end(1), "{pesel}")
+            if mark:
+                mark("pesel_context")
 
-        for match in PESEL_CANDIDATE_REGEX.finditer(text):
-            raw = match.group(0)
-            normalized = self.normalize_pesel_candidate(raw)
-            if normalized is not None:
-                add_span(match.start(), match.end(), "{pesel}")
+        if "pesel_candidate" in live:
+            for match in PESEL_CANDIDATE_REGEX.finditer(text):
+                raw = match.group(0)
+                normalized = self.normalize_pesel_candidate(raw)
+                if normalized is not None:
+                    add_span(match.start(), match.end(), "{pesel}")
+            if mark:
+                mark("pesel_candidate")
 
         # Daty urodzenia + inne daty
-        for match in DOB_REGEX.finditer(text):
-            add_span(match.start(1), match.end(1), "{date-of-birth}")
+        if "dob" in live:
+            for match in DOB_REGEX.finditer(text):
+                add_span(match.start(1), match.end(1), "{date-of-birth}")
+            if mark:
+                mark("dob")
 
-        for match in DATE_ISO_REGEX.finditer(text):
-            add_span(match.start(), match.end(), "{date}")
+        if "date_iso" in live:
+            for match in DATE_ISO_REGEX.finditer(text):
+                add_span(match.start(), match.end(), "{date}")
+            if mark:
+                mark("date_iso")
 
-        for match in DATE_DMY_REGEX.finditer(text):
-            add_span(match.start(), match.end(), "{date}")
+        if "date_dmy" in live:
+            for match in DATE_DMY_REGEX.finditer(text):
+                add_span(match.start(), match.end(), "{date}")
+            if mark:
+                mark("date_dmy")
 
-        for match in DATE_D_MONTH_Y_REGEX.finditer(text):
-            add_span(match.start(), match.end(), "{date}")
+        if "date_month" in live:
+            for match in DATE_D_MONTH_Y_REGEX.finditer(text):
+                add_span(match.start(), match.end(), "{date}")
+            if mark:
+                mark("date_month")
 
         # Rachunki, karty
-        for match in BANK_ACCOUNT_REGEX.finditer(text):
-            add_span(match.start(), match.end(), "{bank-account}")
+        if "bank_account" in live:
+            for match in finditer(BANK_ACCOUNT_REGEX):
+                add_span(match.start(), match.end(), "{bank-account}")
+            if mark:
+                mark("bank_account")
 
-        for match in CREDIT_CARD_REGEX.finditer(text):
-            if self.is_valid_credit_card(match.group(0)):
-                add_span(match.start(), match.end(), "{credit-card-number}")
+        if "credit_card" in live:
+            for match in finditer(CREDIT_CARD_REGEX):
+                if validator.is_valid_credit_card(match.group(0)):
+                    add_span(match.start(), match.end(), "{credit-card-number}")
+            if mark:
+                mark("credit_card")
 
         # Telefony w kontekście
-        for match in PHONE_CONTEXT_REGEX.finditer(text):
-            raw_fragment = match.group(1)
-            normalized = self.normalize_phone_candidate(raw_fragment)
-            if normalized is not None:
-                start = match.start(1)
-                end = match.end(1)
-                add_span(start, end, "{phone}")
+        if "phone_context" in live:
+            for match in PHONE_CONTEXT_REGEX.finditer(text):
+                raw_fragment = match.group(1)
+                normalized = self.normalize_phone_candidate(raw_fragment)
+                if normalized is not None:
+                    start = match.start(1)
+                    end = match.end(1)
+                    add_span(start, end, "{phone}")
+            if mark:
+                mark("phone_context")
 
         # Numery dokumentów w kontekście NIP/REGON/Nr...
-        for m in re.finditer(r"\b(?:NIP|REGON|Nr|nr|ZDP|GK|GN|MAP|Ewid|EWID)\b[^\n\r]{0,30}", text):
-            prefix_end = m.end()
-            num_match = re.search(r"\d[\d\s\-]{5,}", text[prefix_end:prefix_end + 40])
-            if num_match:
-                start = prefix_end + num_match.start()
-                end = prefix_end + num_match.end()
-                fragment = text[start:end]
-                if self.is_date_like_fragment(fragment):
-                    add_span(start, end, "{date}")
-                else:
-                    add_span(start, end, "{document-number}")
+        if "document_context" in live:
+            for m in DOCUMENT_NUMBER_PREFIX_REGEX.finditer(text):
+                prefix_end = m.end()
+                num_match = DOCUMENT_NUMBER_VALUE_REGEX.search(text[prefix_end:prefix_end + 40])
+                if num_match:
+                    start = prefix_end + num_match.start()
+                    end = prefix_end + num_match.end()
+                    fragment = text[start:end]
+                    if self.is_date_like_fragment(fragment):
+                        add_span(start, end, "{date}")
+                    else:
+                        add_span(start, end, "{document-number}")
+            if mark:
+                mark("document_context")
 
         # NOWA HEURYSTYKA: numery dowodu osobistego w kontekście "dowód" / "numer dowodu"
-        for m in ID_CARD_CONTEXT_REGEX.finditer(text):
-            ctx_end = m.end()
-            segment = text[ctx_end:ctx_end + 30]
-            # typowe serie: 2–3 litery + 3–7 cyfr, np. HJG433, WL6371
-            series_match = re.search(r"\b([A-Za-z]{2,3}\d{3,7})\b", segment)
-            if series_match:
-                start = ctx_end + series_match.start(1)
-                end = ctx_end + series_match.end(1)
-                add_span(start, end, "{document-number}")
-
-        pattern_placeholders = [
-            (AGE_REGEX, "{age}"),
-            (SEX_REGEX, "{sex}"),
-            (USERNAME_REGEX, "{username}"),
-            (SECRET_REGEX, "{secret}"),
-            (RELATIVE_REGEX, "{relative}"),
-            (RELATIVE_BY_SURNAME_REGEX, "{relative}"),
-            (CITY_REGEX, "{city}"),
-            (RELIGION_REGEX, "{religion}"),
-            (POLITICAL_REGEX, "{political-view}"),
-            (ETHNICITY_REGEX, "{ethnicity}"),
-            (SEXUAL_ORIENTATION_REGEX, "{sexual-orientation}"),
-            (HEALTH_REGEX, "{health}"),
-            (COMPANY_REGEX, "{company}"),
-            (SCHOOL_REGEX, "{school-name}"),
-            (JOB_TITLE_REGEX, "{job-title}"),
-            (USERNAME_SOCIAL_REGEX, "{username}"),
-            (EMAIL_REGEX, "{email}"),
-        ]
+        if "id_card" in live:
+            for m in ID_CARD_CONTEXT_REGEX.finditer(text):
+                ctx_end = m.end()
+                segment = text[ctx_end:ctx_end + 30]
+                series_match = ID_CARD_SERIES_REGEX.search(segment)
+                if series_match:
+                    start = ctx_end + series_match.start(1)
+                    end = ctx_end + series_match.end(1)
+                    add_span(start, end, "{document-number}")
+            if mark:
+                mark("id_card")
 
-        for pattern, placeholder in pattern_placeholders:
+        for name, pattern, placeholder in PATTERN_DETECTORS:
+            if name not in live:
+                continue
             for match in pattern.finditer(text):
                 add_span(match.start(), match.end(), placeholder)
+            if mark:
+                mark(name)
+
+        # Miejscowości z gazetera PRG, tylko w jednoznacznym kontekście
+        if self.city_gazetteer is not None:
+            for start, end in self.city_spans(text):
+                add_span(start, end, "{city}")
+            if mark:
+                mark("city_gazetteer")
 
         # Telefony bez kontekstu
-        for match in PHONE_REGEX.finditer(text):
-            start, end = match.start(), match.end()
-            overlap = False
-            for es, ee, _ in spans:
-                if not (end <= es or start >= ee):
-                    overlap = True
-                    break
-            if overlap:
-                continue
-            prefix = text[max(0, start - 40):start].lower()
-            if DOCUMENT_NUMBER_CONTEXT_REGEX.search(prefix):
-                add_span(start, end, "{document-number}")
-            else:
-                add_span(start, end, "{phone}")
+        if "phone" in live:
+            for match in PHONE_REGEX.finditer(text):
+                start, end = match.start(), match.end()
+                if spans.overlaps(start, end):
+                    continue
+                prefix = text[max(0, start - 40):start].lower()
+                if DOCUMENT_NUMBER_CONTEXT_REGEX.search(prefix):
+                    add_span(start, end, "{document-number}")
+                else:
+                    add_span(start, end, "{phone}")
+            if mark:
+                mark("phone")
 
         # Długie numery ogólne
-        for match in GENERIC_LONG_NUMBER_REGEX.finditer(text):
-            start, end = match.start(), match.end()
-            fragment = text[start:end]
-            overlap = False
-            for es, ee, _ in spans:
-                if not (end <= es or start >= ee):
-                    overlap = True
-                    break
-            if overlap:
-                continue
-            normalized_phone = self.normalize_phone_candidate(fragment)
-            if normalized_phone is not None:
-                add_span(start, end, "{phone}")
-                continue
-            add_span(start, end, "{document-number}")
+        if "generic_number" in live:
+            for match in GENERIC_LONG_NUMBER_REGEX.finditer(text):
+                start, end = match.start(), match.end()
+                fragment = text[start:end]
+                if spans.overlaps(start, end):
+                    continue
+                normalized_phone = self.normalize_phone_candidate(fragment)
+                if normalized_phone is not None:
+                    add_span(start, end, "{phone}")
+                    continue
+                add_span(start, end, "{document-number}")
+            if mark:
+                mark("generic_number")
 
-        spans.sort(key=lambda span: span[0])
-        return spans
+        return spans.spans()
 
-    def build_token_spans(self, doc, text: str, enabled_masks, regex_spans):
+    def city_spans(self, text: str) -> list[tuple[int, int]]:
+        # Gazeter sprawdzany tylko tuż za kontekstem ("00-950 X", "miejscowość: X")
+        # i tuż przed ", dnia" – bez skanowania całej linii
+        gazetteer = self.city_gazetteer
+        reach = gazetteer.max_words * 30
         spans = []
-        regex_ranges = [(s, e) for s, e, _ in regex_spans]
+        for match in CITY_CONTEXT_BEFORE_REGEX.finditer(text):
+            start = match.end()
+            for span in gazetteer.find(text, start, start + reach)[:1]:
+                if span[0] == start:
+                    spans.append(span)
+        for match in CITY_CONTEXT_AFTER_REGEX.finditer(text):
+            end = match.start()
+            for span in gazetteer.find(text, max(0, end - reach), end):
+                if span[1] == end:
+                    spans.append(span)
+        return sorted(spans)
 
-        def is_covered(start: int, end: int) -> bool:
-            for rs, re_ in regex_ranges:
-                if not (end <= rs or start >= re_):
-                    return True
-            return False
+    def build_token_spans(self, doc, text: str, enabled_masks, regex_spans):
+        spans = []
+        n = len(doc)
+        if not n:
+            return spans
+        enabled_masks = set(enabled_masks)
+        # Pozycje i flagi wszystkich tokenów jedną tablicą z Doc zamiast atrybutów token po tokenie
+        attrs = doc.to_array([IDX, LENGTH, IS_SPACE, IS_PUNCT]).astype(np.int64)
+        token_starts = attrs[:, 0]
+        token_ends = token_starts + attrs[:, 1]
+        blocked = (attrs[:, 2] | attrs[:, 3]).astype(bool)
+        if regex_spans:
+            # Pokrycie przez spany regexowe dla wszystkich tokenów naraz – to samo
+            # wyszukiwanie binarne co SpanIndex.overlaps, wektorowo (spany są rozłączne)
+            regex_starts = np.fromiter((s[0] for s in regex_spans), np.int64, len(regex_spans))
+            regex_ends = np.fromiter((s[1] for s in regex_spans), np.int64, len(regex_spans))
+            pos = np.searchsorted(regex_starts, token_ends, side="left") - 1
+            blocked |= (pos >= 0) & (regex_ends[np.maximum(pos, 0)] > token_starts)
+        token_starts = token_starts.tolist()
+        token_ends = token_ends.tolist()
+        blocked = blocked.tolist()
+        masks = self.token_masks(doc, token_starts, blocked)
+        # Kontekst dat wspólny dla wszystkich spanów date_mask dokumentu
+        date_context = DateContextIndex(doc)
 
         i = 0
-        n = len(doc)
         while i < n:
-            token = doc[i]
-            if token.is_space or token.is_punct:
+            mask_name = masks[i]
+            if blocked[i] or mask_name not in enabled_masks:
                 i += 1
                 continue
-            start_char = token.idx
-            end_char = token.idx + len(token.text)
-            if is_covered(start_char, end_char):
-                i += 1
-                continue
-            mask_name = getattr(token._, "mask", None)
-            if mask_name not in enabled_masks:
-                i += 1
-                continue
-            start_token = i
             end_token = i + 1
-            while end_token < n:
-                t = doc[end_token]
-                if t.is_space or t.is_punct:
-                    break
-                t_start = t.idx
-                t_end = t.idx + len(t.text)
-                if is_covered(t_start, t_end):
-                    break
-                if getattr(t._, "mask", None) != mask_name:
-                    break
+            while end_token < n and not blocked[end_token] and masks[end_token] == mask_name:
                 end_token += 1
-            span_start = doc[start_token].idx
-            span_end = doc[end_token - 1].idx + len(doc[end_token - 1].text)
+            span_start = token_starts[i]
+            span_end = token_ends[end_token - 1]
             fragment = text[span_start:span_end]
-            placeholder = self.placeholder_for_span(mask_name, fragment, doc[start_token:end_token])
+            placeholder = self.placeholder_for_span(
+                mask_name, fragment, doc[i:end_token], date_context
+            )
             if placeholder:
                 spans.append((span_start, span_end, placeholder))
             i = end_token
 
-        spans.sort(key=lambda s: s[0])
         return spans
 
-    def merge_adjacent_same_placeholders(self, text: str, spans):
-        if not spans:
-            return spans
-        merged = [list(spans[0])]
-        for start, end, placeholder in spans[1:]:
-            last_start, last_end, last_placeholder = merged[-1]
-            if placeholder == last_placeholder:
-                between = text[last_end:start]
-                if between.strip(" -") == "":
-                    merged[-1][1] = end
-                    continue
-            merged.append([start, end, placeholder])
-        return [tuple(m) for m in merged]
+    def token_masks(self, doc, token_starts, blocked) -> list:
+        # token._.mask dla wszystkich tokenów (None dla pominiętych). Zwykłe rozszerzenie
+        # spaCy trzyma wartości w doc.user_data pod kluczem ("._.", nazwa, token.idx, None);
+        # odczyt wprost omija tworzenie obiektu Underscore dla każdego tokenu. To wewnętrzny
+        # układ spaCy, więc dla każdego dokumentu sprawdza go user_data_masks_valid,
+        # a przy niezgodności maski są czytane przez publiczne token._.mask.
+        extension = Token.get_extension("mask")
+        if (
+            extension is not None
+            and extension[1:] == (None, None, None)
+            and not isinstance(extension[0], Underscore.mutable_types)
+        ):
+            default = extension[0]
+            user_data = doc.user_data
+            masks = [
+                None if skip else user_data.get(("._.", "mask", start, None), default)
+                for start, skip in zip(token_starts, blocked)
+            ]
+            if self.user_data_masks_valid(doc, masks, blocked, default):
+                return masks
+        return [
+            None if skip else getattr(token._, "mask", None)
+            for token, skip in zip(doc, blocked)
+        ]
+
+    @staticmethod
+    def user_data_masks_valid(doc, masks, blocked, default) -> bool:
+        # Zapis przez token._.mask na próbnym dokumencie musi trafić pod klucz czytany
+        # w token_masks, a dla pierwszego tokenu z maską (albo pierwszego niepominiętego)
+        # odczyt z user_data musi być równy token._.mask
+        probe = Doc(doc.vocab, words=["probe"])
+        marker = object()
+        probe[0]._.mask = marker
+        if probe.user_data.get(("._.", "mask", 0, None)) is not marker:
+            return False
+        checked = next((i for i, mask in enumerate(masks) if mask is not default and not blocked[i]), None)
+        if checked is None:
+            checked = next((i for i, skip in enumerate(blocked) if not skip), None)
+        return checked is None or masks[checked] == doc[checked]._.mask
+
+    def merge_adjacent_same_placeholders(self, text: str, spans) -> MaskSpans:
+        # spans: dowolny iterowalny ciąg rozłącznych spanów posortowanych po starcie
+        # (lista, SpanIndex, heapq.merge) – jedno przejście, bez ponownego sortowania;
+        # wynik od razu w kolumnach MaskSpans
+        merged = MaskSpans()
+        ends = merged.ends
+        last_placeholder = None
+        for start, end, placeholder in spans:
+            if placeholder == last_placeholder and text[ends[-1]:start].strip(" -") == "":
+                ends[-1] = end
+                continue
+            merged.append(start, end, placeholder)
+            last_placeholder = placeholder
+        return merged
 
-    def apply_spans(self, text: str, spans):
+    def apply_spans(self, text: str, spans: MaskSpans) -> str:
         if not spans:
             return text
         parts = []
         last_index = 0
-        for start, end, placeholder in spans:
+        for start, end, category in zip(spans.starts, spans.ends, spans.categories):
             if start > last_index:
                 parts.append(text[last_index:start])
             fragment = text[start:end]
             m = re.search(r"\s+$", fragment)
             trailing_ws = m.group(0) if m else ""
-            parts.append(placeholder + trailing_ws)
+            parts.append(SPAN_CATEGORIES[category] + trailing_ws)
             last_index = end
         if last_index < len(text):
             parts.append(text[last_index:])
         return "".join(parts)
 
+    def needs_nlp(self, text: str) -> bool:
+        # Wstępna selekcja dla fast_path (zdanie z split_segments albo cała linia): False
+        # tylko wtedy, gdy nie ma żadnego sygnału, na który reagują komponenty priv_masker
+        # (cyfry w układzie daty/numeru, słowa kontekstowe, e-mail) ani słowa z wielką
+        # literą innego niż słowo funkcyjne otwierające zdanie.
+        if FAST_PATH_TRIGGER_REGEX.search(text):
+            return True
+        if self.masked_components.get("cash_mask") and FAST_PATH_CASH_REGEX.search(text):
+            return True
+        for match in CAPITALIZED_WORD_REGEX.finditer(text):
+            start = match.start()
+            while start > 0 and text[start - 1] in SENTENCE_OPENERS:
+                start -= 1
+            if start > 0 and text[start - 1] not in ".!?":
+                return True
+            if match.group().lower() not in STOP_WORDS:
+                return True
+        return False
+
+    def fast_path_windows(self, text: str) -> list[tuple[int, int, int, int]]:
+        # Okna dla modelu (jak chunk_windows) tylko wokół zdań, w których needs_nlp widzi
+        # sygnał; kolejne takie zdania tworzą jeden rdzeń. Zdania bez sygnału maskują same
+        # regexy (liczone na całej linii), a [] oznacza, że linia w ogóle omija model.
+        cores = []
+        parts = split_segments(text)
+        start = previous_end = 0
+        for i in range(0, len(parts), 2):
+            end = start + len(parts[i])
+            if self.needs_nlp(parts[i]):
+                if cores and cores[-1][1] == previous_end:
+                    cores[-1] = (cores[-1][0], end)
+                else:
+                    cores.append((start, end))
+            previous_end = end
+            start = end + (len(parts[i + 1]) if i + 1 < len(parts) else 0)
+        return [window for first, last in cores for window in self.chunk_windows(text, first, last)]
+
+    def model_windows(self, text: str) -> list[tuple[int, int, int, int]]:
+        # Fragmenty linii dla modelu: z fast_path tylko zdania z sygnałem, inaczej cała
+        # linia (pocięta przez chunk_windows, gdy jest dłuższa niż chunk_chars)
+        if self.fast_path:
+            return self.fast_path_windows(text)
+        return self.chunk_windows(text)
+
     def mask(self, text: str) -> str:
-        doc = self.nlp(text)
+        if self.cache is not None or self.segment_cache is not None:
+            return next(self.mask_many([text], batch_size=1))
+        return self.apply_spans(text, self.analyze(text))
+
+    def analyze(self, text: str) -> MaskSpans:
+        # Wykryte spany zamiast tekstu; warstwy cache (teksty gotowe) są pomijane
+        if self.no_ner:
+            return self.analyze_regex_only(text)
+        if self.fast_path or (self.chunk_chars and len(text) > self.chunk_chars):
+            return next(self.analyze_many_chunked([text]))[1]
+        doc = self.nlp(text) if self.metrics is None else next(self.pipe([text], batch_size=1))
+        return self.analyze_doc(doc)
+
+    def analyze_many(self, texts, batch_size: int = 64, n_process: int = 1):
+        # Jak mask_many, ale MaskSpans dla każdej linii, bez składania tekstu i bez cache
+        for _, spans in self.analyze_many_uncached(texts, batch_size, n_process):
+            yield spans
+
+    def mask_spans_many(self, texts, batch_size: int = 64, n_process: int = 1):
+        # Pary (zamaskowany tekst, MaskSpans) z jednej analizy; bez cache
+        for text, spans in self.analyze_many_uncached(texts, batch_size, n_process):
+            yield self.apply_spans(text, spans), spans
+
+    def mask_many(self, texts, batch_size: int = 64, n_process: int = 1):
+        # Warstwy: cache linii (--cache-dir) -> cache zdań (--segment-cache) -> potok
+        def masker(lines):
+            return self.mask_many_uncached(lines, batch_size, n_process)
+
+        return layer_caches(texts, batch_size, masker, self.cache, self.segment_cache)
+
+    def mask_many_uncached(self, texts, batch_size: int = 64, n_process: int = 1):
+        for text, spans in self.analyze_many_uncached(texts, batch_size, n_process):
+            yield self.apply_spans(text, spans)
+
+    def analyze_many_uncached(self, texts, batch_size: int = 64, n_process: int = 1):
+        # Generator par (tekst, MaskSpans): dokumenty z nlp.pipe (wsadowo, opcjonalnie
+        # w wielu procesach) trafiają do tej samej logiki co analyze(); wyniki w
+        # kolejności wejścia. Kandydaci numeryczni każdej paczki są walidowani
+        # zbiorczo (CandidateValidation).
+        if self.no_ner:
+            texts = iter(texts)
+            while chunk := list(islice(texts, batch_size)):
+                validation = CandidateValidation(chunk, self)
+                for text in chunk:
+                    yield text, self.analyze_regex_only(text, validation)
+            return
+        if self.chunk_chars or self.fast_path:
+            yield from self.analyze_many_chunked(texts, batch_size, n_process)
+            return
+        docs = self.pipe(texts, batch_size=batch_size, n_process=n_process)
+        while chunk := list(islice(docs, batch_size)):
+            validation = CandidateValidation([doc.text for doc in chunk], self)
+            for doc in chunk:
+                yield doc.text, self.analyze_doc(doc, validation)
+
+    def analyze_many_chunked(self, texts, batch_size: int = 64, n_process: int = 1):
+        # Jak analyze_many_uncached, ale do nlp.pipe trafiają okna z model_windows: długie
+        # linie pocięte (chunk_chars), z fast_path tylko zdania z sygnałem – razem z
+        # krótkimi liniami tej samej paczki
+        texts = iter(texts)
+        while chunk := list(islice(texts, batch_size)):
+            validation = CandidateValidation(chunk, self)
+            plans = [self.model_windows(text) for text in chunk]
+            docs = self.pipe(
+                [text[start:end] for text, windows in zip(chunk, plans) for start, end, _, _ in windows],
+                batch_size=batch_size,
+                n_process=n_process,
+            )
+            for text, windows in zip(chunk, plans):
+                if not windows:
+                    yield text, self.analyze_regex_only(text, validation)
+                elif windows == [(0, len(text), 0, len(text))]:
+                    yield text, self.analyze_doc(next(docs), validation)
+                else:
+                    window_docs = [next(docs) for _ in windows]
+                    yield text, self.analyze_windows(text, windows, window_docs, validation)
+
+    def chunk_windows(
+        self, text: str, first: int = 0, last: int | None = None
+    ) -> list[tuple[int, int, int, int]]:
+        # (start, end, core_start, core_end): rdzenie dzielą fragment first..last tekstu
+        # (domyślnie cały) na kawałki do chunk_chars znaków (0 = bez cięcia), cięte na
+        # granicy zdania, a w razie jej braku na spacji. Okno podawane do modelu to rdzeń
+        # poszerzony o chunk_overlap znaków z obu stron, żeby encje na granicy rdzeni
+        # miały pełny kontekst.
+        n = len(text)
+        last = n if last is None else last
+        windows = []
+        core_start = first
+        while core_start < last:
+            limit = core_start + self.chunk_chars if self.chunk_chars else last
+            if limit >= last:
+                core_end = last
+            else:
+                lowest = core_start + self.chunk_chars // 2
+                core_end = None
+                for match in SEGMENT_BOUNDARY_REGEX.finditer(text, lowest, limit):
+                    core_end = match.end()
+                if core_end is None:
+                    space = text.rfind(" ", lowest, limit)
+                    core_end = space + 1 if space != -1 else limit
+            start = max(0, core_start - self.chunk_overlap)
+            if start:
+                space = text.find(" ", start, core_start)
+                start = space + 1 if space != -1 else start
+            end = min(n, core_end + self.chunk_overlap)
+            if end < n:
+                space = text.rfind(" ", core_end, end)
+                end = space if space != -1 else end
+            windows.append((start, end, core_start, core_end))
+            core_start = core_end
+        return windows
+
+    def analyze_windows(self, text: str, windows, docs, validation=None) -> MaskSpans:
+        # Regexy na całej linii; spany tokenowe z każdego okna, przesunięte do pozycji
+        # w linii. Span należy do okna, w którego rdzeniu się zaczyna. Span nachodzący
+        # na już przyjęty z tym samym placeholderem go przedłuża (encja dłuższa niż
+        # zakładka, którą poprzednie okno ucięło na swoim końcu); inne są pomijane.
         enabled_masks = [
             component for component, enabled in self.masked_components.items() if enabled
         ]
-        regex_spans = self.build_regex_spans(text)
+        regex_spans = self.build_regex_spans(text, validation=validation)
+        token_spans = []
+        last_end = 0
+        for (start, end, core_start, core_end), doc in zip(windows, docs):
+            local_regex_spans = [
+                (s - start, e - start, placeholder)
+                for s, e, placeholder in regex_spans
+                if e > start and s < end
+            ]
+            for s, e, placeholder in self.build_token_spans(
+                doc, doc.text, enabled_masks, local_regex_spans
+            ):
+                s += start
+                e += start
+                if s >= core_end:
+                    break
+                if s >= last_end:
+                    if s >= core_start:
+                        token_spans.append((s, e, placeholder))
+                        last_end = e
+                elif e > last_end and token_spans[-1][2] == placeholder:
+                    token_spans[-1] = (token_spans[-1][0], e, placeholder)
+                    last_end = e
+        return self.resolve_spans(text, regex_spans, token_spans)
+
+    def mask_doc(self, doc, validation=None) -> str:
+        return self.apply_spans(doc.text, self.analyze_doc(doc, validation))
+
+    def analyze_doc(self, doc, validation=None) -> MaskSpans:
+        text = doc.text
+        enabled_masks = [
+            component for component, enabled in self.masked_components.items() if enabled
+        ]
+        regex_spans = self.build_regex_spans(text, validation=validation)
         token_spans = self.build_token_spans(doc, text, enabled_masks, regex_spans)
-        all_spans = sorted(regex_spans + token_spans, key=lambda s: s[0])
-        all_spans = self.merge_adjacent_same_placeholders(text, all_spans)
-        result = self.apply_spans(text, all_spans)
-        return result
+        return self.resolve_spans(text, regex_spans, token_spans)
+
+    def mask_regex_only(self, text: str, validation=None) -> str:
+        return self.apply_spans(text, self.analyze_regex_only(text, validation))
+
+    def analyze_regex_only(self, text: str, validation=None) -> MaskSpans:
+        return self.resolve_spans(text, self.build_regex_spans(text, validation=validation), [])
+
+    def resolve_spans(self, text: str, regex_spans, token_spans) -> MaskSpans:
+        # Spany regexów i tokenów (plus osoby z leksykonu/morfeusza) scalone w MaskSpans
+        if self.name_lexicon is not None or self.morphology is not None:
+            token_spans = self.add_person_spans(text, regex_spans, token_spans)
+        all_spans = heapq.merge(regex_spans, token_spans, key=lambda s: s[0])
+        return self.merge_adjacent_same_placeholders(text, all_spans)
+
+    def add_person_spans(self, text: str, regex_spans, token_spans) -> list:
+        # Osoby z leksykonu imion i z morfeusza tam, gdzie regexy i priv_masker niczego
+        # nie oznaczyły; przy nakładaniu się pierwszeństwo ma leksykon
+        persons = []
+        if self.name_lexicon is not None:
+            persons += self.name_lexicon.find_persons(text)
+        if self.morphology is not None:
+            persons += self.morph_person_spans(text)
+        if not persons:
+            return token_spans
+        taken = SpanIndex.from_sorted(heapq.merge(regex_spans, token_spans, key=lambda s: s[0]))
+        extra = sorted(span for span in persons if taken.add(*span))
+        return list(heapq.merge(token_spans, extra, key=lambda s: s[0]))
+
+    def name_flags(self, word: str) -> int:
+        # NAME_FIRST/NAME_LAST z etykiet interpretacji rzeczownikowych morfeusza
+        flags = 0
+        for _, _, (_, _, tag, labels, _) in self.morphology.analyse(word):
+            if tag.startswith("subst"):
+                if "imię" in labels:
+                    flags |= NAME_FIRST
+                if "nazwisko" in labels:
+                    flags |= NAME_LAST
+        return flags
+
+    def morph_person_spans(self, text: str) -> list[tuple[int, int, str]]:
+        # "pan Kowalski" -> {surname}, "dr Anna Nowak" / "pani Anna" -> {name}; drugie
+        # słowo tylko wtedy, gdy też jest imieniem lub nazwiskiem
+        spans = []
+        for match in MORPH_PERSON_REGEX.finditer(text):
+            flags = self.name_flags(match.group(1))
+            if not flags:
+                continue
+            end = match.end(1)
+            if match.group(2) is not None:
+                second = self.name_flags(match.group(2))
+                if second:
+                    flags |= second
+                    end = match.end(2)
+            single_surname = end == match.end(1) and not (flags & NAME_FIRST)
+            spans.append((match.start(1), end, "{surname}" if single_surname else "{name}"))
+        return spans
 
     def print_comparison(self, original: str, masked: str, index: int, file=sys.stdout) -> None:
         # Zostawione tylko do ewentualnego debugowania, nieużywane w CLI.
@@ -636,6 +2019,605 @@ class TextAnonymizer:
         print("\n", file=file)
 
 
+# Anonimizator procesu roboczego – ładowany raz na proces przez _init_pool_worker
+_pool_anonymizer = None
+
+
+def layer_caches(texts, batch_size: int, masker, cache=None, segment_cache=None):
+    # Owija masker (lista linii -> wyniki w kolejności) w cache zdań, a ten w cache linii
+    if segment_cache is not None:
+        def masker(lines, inner=masker):
+            return segment_cache.mask_many(lines, batch_size, inner)
+
+    if cache is not None:
+        return cache.mask_many(texts, batch_size, masker)
+    return masker(texts)
+
+
+def _init_pool_worker(anonymizer_kwargs: dict) -> None:
+    global _pool_anonymizer
+    _pool_anonymizer = TextAnonymizer(**anonymizer_kwargs)
+
+
+def _mask_pool_chunk(chunk: list[str]) -> tuple[list[str], MaskMetrics | None]:
+    # Metryki procesu roboczego wracają razem z paczką i są zerowane
+    masked = list(_pool_anonymizer.mask_many(chunk, batch_size=len(chunk)))
+    metrics = _pool_anonymizer.metrics
+    return masked, None if metrics is None else metrics.drain()
+
+
+def _analyze_pool_chunk(chunk: list[str]) -> tuple[list[MaskSpans], MaskMetrics | None]:
+    analyzed = list(_pool_anonymizer.analyze_many(chunk, batch_size=len(chunk)))
+    metrics = _pool_anonymizer.metrics
+    return analyzed, None if metrics is None else metrics.drain()
+
+
+def _mask_spans_pool_chunk(chunk: list[str]) -> tuple[list[tuple[str, MaskSpans]], MaskMetrics | None]:
+    results = list(_pool_anonymizer.mask_spans_many(chunk, batch_size=len(chunk)))
+    metrics = _pool_anonymizer.metrics
+    return results, None if metrics is None else metrics.drain()
+
+
+class TextAnonymizerPool:
+    """Pula procesów, z których każdy ma własny TextAnonymizer (pl_nask + priv_masker).
+
+    Linie są wysyłane paczkami po batch_size; wyniki wracają w kolejności wejścia,
+    bo linia N wyjścia musi odpowiadać linii N wejścia.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        cache_dir: str | None = None,
+        cache_max_entries: int = 1_000_000,
+        segment_cache_size: int = 0,
+        metrics: MaskMetrics | None = None,
+        **anonymizer_kwargs,
+    ):
+        self.workers = workers
+        # Metryki zbierają procesy robocze; tu są sumowane po każdej paczce
+        self.metrics = metrics
+        if metrics is not None:
+            anonymizer_kwargs["metrics"] = MaskMetrics()
+        # Ile paczek może być jednocześnie w obróbce/buforze – ogranicza pamięć
+        self.max_in_flight = workers * 2
+        # Cache prowadzi proces główny: do procesów roboczych trafiają tylko chybienia
+        self.segment_cache = SegmentCache(segment_cache_size) if segment_cache_size else None
+        self.cache = None
+        if cache_dir is not None:
+            fingerprint = cache_fingerprint(
+                segment_cache_size=segment_cache_size, **anonymizer_kwargs
+            )
+            self.cache = MaskCache(cache_dir, fingerprint, cache_max_entries)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_pool_worker,
+            initargs=(anonymizer_kwargs,),
+        )
+
+    def mask_many(self, texts, batch_size: int = 64):
+        if self.cache is None and self.segment_cache is None:
+            return self.dispatch(texts, batch_size)
+
+        # Cache sprawdzany oknami, które wypełniają wszystkie procesy robocze naraz
+        def masker(lines):
+            return self.dispatch(lines, batch_size)
+
+        window = batch_size * self.max_in_flight
+        return layer_caches(texts, window, masker, self.cache, self.segment_cache)
+
+    def analyze_many(self, texts, batch_size: int = 64):
+        # MaskSpans z procesów roboczych (kolumny array("i") przesyłane tanio); bez cache
+        return self.dispatch(texts, batch_size, _analyze_pool_chunk)
+
+    def mask_spans_many(self, texts, batch_size: int = 64):
+        return self.dispatch(texts, batch_size, _mask_spans_pool_chunk)
+
+    def dispatch(self, texts, batch_size: int, worker=_mask_pool_chunk):
+        texts = iter(texts)
+        # Bufor porządkujący: futures w kolejności wysłania. Paczki kończące się
+        # wcześniej czekają w kolejce, aż wszystkie poprzednie zostaną zapisane.
+        pending = deque()
+        while True:
+            while len(pending) < self.max_in_flight:
+                chunk = list(islice(texts, batch_size))
+                if not chunk:
+                    break
+                pending.append(self.executor.submit(worker, chunk))
+            if not pending:
+                return
+            masked, metrics = pending.popleft().result()
+            if metrics is not None:
+                self.metrics.merge(metrics)
+            yield from masked
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_lines(handle):
+    # Leniwie: niepuste linie bez końcowego "\n", bez wczytywania całego pliku
+    for line in handle:
+        if line.strip():
+            yield line.rstrip("\n")
+
+
+def reservoir_sample(lines, sample_size: int, rng: random.Random) -> list[str]:
+    # Jednoprzebiegowe losowanie (algorytm R): pamięć O(sample_size) niezależnie
+    # od długości wejścia. Wynik w kolejności występowania w wejściu.
+    reservoir = []
+    for index, line in enumerate(lines):
+        if index < sample_size:
+            reservoir.append((index, line))
+            continue
+        slot = rng.randint(0, index)
+        if slot < sample_size:
+            reservoir[slot] = (index, line)
+    reservoir.sort()
+    return [line for _, line in reservoir]
+
+
+def indexed_sample(index: LineIndex, sample_size: int, rng: random.Random) -> list[str]:
+    # Losowanie numerów linii z indeksu (bez czytania całego pliku). Wylosowane puste
+    # linie są zastępowane kolejnymi losowaniami; gdy wylosowano już ponad połowę pliku,
+    # reszta numerów jest tasowana, żeby nie losować w kółko tych samych.
+    chosen = {}
+    drawn = set()
+    remaining = None
+    while len(chosen) < sample_size and len(drawn) < len(index):
+        if remaining is None and len(drawn) * 2 > len(index):
+            remaining = [number for number in range(len(index)) if number not in drawn]
+            rng.shuffle(remaining)
+        number = remaining.pop() if remaining is not None else rng.randrange(len(index))
+        if number in drawn:
+            continue
+        drawn.add(number)
+        line = index.line(number)
+        if line.strip():
+            chosen[number] = line
+    return [chosen[number] for number in sorted(chosen)]
+
+
+# Wejście/wyjście tabelaryczne (wymaga pyarrow): rozszerzenie pliku -> format
+TABLE_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def table_format(path: str) -> str | None:
+    return TABLE_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def read_record_batches(path: str, batch_rows: int):
+    # Paczki rekordów po najwyżej batch_rows wierszy; w pamięci jest tylko bieżąca
+    # grupa wierszy Parquet albo fragment pliku Arrow IPC (mmap)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if table_format(path) == "parquet":
+        parquet_file = pq.ParquetFile(path)
+        yield parquet_file.schema_arrow
+        yield from parquet_file.iter_batches(batch_size=batch_rows)
+        return
+    source = pa.memory_map(path, "r")
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+        batches = iter(reader)
+    yield reader.schema
+    for batch in batches:
+        for offset in range(0, batch.num_rows, batch_rows):
+            yield batch.slice(offset, batch_rows)
+
+
+def span_list_arrays(results: list, valid: list[bool]) -> tuple:
+    # Kolumny list<int32> start/end i list<dictionary<int8, string>> kategorii
+    # z kolumn MaskSpans; wiersze z pustym tekstem (null) mają null
+    import pyarrow as pa
+
+    lengths = np.zeros(len(valid), np.int32)
+    lengths[np.flatnonzero(valid)] = [len(spans) for _, spans in results]
+    offsets = np.zeros(len(valid) + 1, np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    offsets = pa.array(offsets)
+    mask = pa.array(np.logical_not(valid))
+    columns = [[], [], []]
+    for _, spans in results:
+        if spans:
+            for values, column in zip(columns, spans.columns()):
+                values.append(column)
+    starts, ends, categories = (
+        np.concatenate(values) if values else np.zeros(0, np.int32) for values in columns
+    )
+    categories = pa.DictionaryArray.from_arrays(
+        pa.array(categories.astype(np.int8)), pa.array(SPAN_CATEGORIES)
+    )
+    return tuple(
+        pa.ListArray.from_arrays(offsets, values, mask=mask)
+        for values in (pa.array(starts), pa.array(ends), categories)
+    )
+
+
+def mask_table(
+    anonymizer, input_path: str, output_path: str, column: str, batch_size: int, batch_rows: int
+) -> int:
+    """Maskuje kolumnę tekstu w pliku Parquet/Arrow IPC, paczkami rekordów.
+
+    Kolumna column zostaje zastąpiona tekstem zamaskowanym, a dopisane są kolumny
+    <column>_span_starts, <column>_span_ends i <column>_span_categories (pozycje
+    spanów w oryginalnym tekście i placeholdery). Pozostałe kolumny przechodzą bez
+    zmian. Zwraca liczbę wierszy.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    batches = read_record_batches(input_path, batch_rows)
+    schema = next(batches)
+    index = schema.get_field_index(column)
+    if index == -1:
+        raise KeyError(f"Brak kolumny {column!r} w {input_path}.")
+    text_field = schema.field(index)
+    for name in ("starts", "ends", "categories"):
+        if schema.get_field_index(f"{column}_span_{name}") != -1:
+            raise KeyError(f"Kolumna {column}_span_{name} już istnieje w {input_path}.")
+    span_fields = [
+        pa.field(f"{column}_span_starts", pa.list_(pa.int32())),
+        pa.field(f"{column}_span_ends", pa.list_(pa.int32())),
+        pa.field(f"{column}_span_categories", pa.list_(pa.dictionary(pa.int8(), pa.string()))),
+    ]
+    output_schema = schema
+    for field in span_fields:
+        output_schema = output_schema.append(field)
+
+    if table_format(output_path) == "parquet":
+        writer = pq.ParquetWriter(output_path, output_schema)
+    else:
+        writer = pa.ipc.new_file(output_path, output_schema)
+    rows = 0
+    with writer:
+        for batch in batches:
+            texts = batch.column(index).to_pylist()
+            valid = [text is not None for text in texts]
+            present = [text for text in texts if text is not None]
+            results = list(anonymizer.mask_spans_many(present, batch_size=batch_size))
+            masked = iter(results)
+            masked_column = pa.array(
+                [next(masked)[0] if flag else None for flag in valid], type=text_field.type
+            )
+            columns = list(batch.columns)
+            columns[index] = masked_column
+            columns.extend(span_list_arrays(results, valid))
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=output_schema))
+            rows += batch.num_rows
+    return rows
+
+
+JSON_WHITESPACE_REGEX = re.compile(r"[ \t\n\r]*")
+# Kroki selektora: .klucz, .*, [N], [*], ['klucz'], ["klucz"]
+JSON_SELECTOR_STEP_REGEX = re.compile(r"\.([^.\[\]]+)|\[(\*|\d+)\]|\['([^']*)'\]|\[\"([^\"]*)\"\]")
+# Ile paczek batch_size wybranych napisów zbierać przed maskowaniem (zajmuje pulę procesów)
+JSONL_WINDOW_BATCHES = 16
+
+
+def parse_json_selector(selector: str) -> tuple:
+    # "$.messages[*].content" -> ("messages", None, "content"); None = dowolny klucz/indeks
+    path = selector[1:] if selector.startswith("$") else selector
+    if path and not path.startswith((".", "[")):
+        path = "." + path
+    steps = []
+    pos = 0
+    while pos < len(path):
+        match = JSON_SELECTOR_STEP_REGEX.match(path, pos)
+        if match is None:
+            raise ValueError(f"Niepoprawny selektor JSON: {selector!r}")
+        key, index, quoted, double_quoted = match.groups()
+        if index is not None:
+            steps.append(None if index == "*" else int(index))
+        elif key is not None:
+            steps.append(None if key == "*" else key)
+        else:
+            steps.append(quoted if quoted is not None else double_quoted)
+        pos = match.end()
+    if not steps:
+        raise ValueError(f"Pusty selektor JSON: {selector!r}")
+    return tuple(steps)
+
+
+class JsonFieldSelector:
+    """Napisy rekordu JSON wskazane selektorami (JSONPath: $.messages[*].content).
+
+    Rekord nie jest dekodowany w całości: parser schodzi tylko wzdłuż selektorów,
+    a pozostałe wartości przeskakuje skanerem C modułu json. Wynik to pozycje
+    literałów napisów w linii, więc podmiana zamaskowanych wartości zostawia resztę
+    rekordu bajt w bajt (białe znaki, kolejność kluczy, sekwencje ucieczki).
+    """
+
+    def __init__(self, selectors: list[str]):
+        self.paths = [parse_json_selector(selector) for selector in selectors]
+        self.scan = make_scanner(json.JSONDecoder())
+
+    def find(self, line: str) -> list[tuple[int, int, str]]:
+        # (start, end, wartość) literałów napisów; start/end obejmują cudzysłowy
+        found = []
+        try:
+            end = self.walk(line, self.skip_whitespace(line, 0), self.paths, found)
+        except (IndexError, StopIteration):
+            raise ValueError("Niepoprawny rekord JSON.") from None
+        if self.skip_whitespace(line, end) != len(line):
+            raise ValueError("Niepoprawny rekord JSON: dane po końcu wartości.")
+        return found
+
+    def skip_whitespace(self, line: str, pos: int) -> int:
+        return JSON_WHITESPACE_REGEX.match(line, pos).end()
+
+    def walk(self, line: str, pos: int, paths: list, found: list) -> int:
+        char = line[pos]
+        if char == '"':
+            value, end = scanstring(line, pos + 1)
+            if () in paths:
+                found.append((pos, end, value))
+            return end
+        steps = [path for path in paths if path]
+        if char == "{" and any(not isinstance(path[0], int) for path in steps):
+            pos = self.skip_whitespace(line, pos + 1)
+            if line[pos] == "}":
+                return pos + 1
+            while True:
+                if line[pos] != '"':
+                    raise ValueError("Niepoprawny rekord JSON: oczekiwano klucza.")
+                key, pos = scanstring(line, pos + 1)
+                pos = self.skip_whitespace(line, pos)
+                if line[pos] != ":":
+                    raise ValueError("Niepoprawny rekord JSON: oczekiwano \":\".")
+                pos = self.skip_whitespace(line, pos + 1)
+                children = [path[1:] for path in steps if path[0] is None or path[0] == key]
+                pos = self.walk(line, pos, children, found) if children else self.scan(line, pos)[1]
+                pos = self.skip_whitespace(line, pos)
+                if line[pos] == "}":
+                    return pos + 1
+                if line[pos] != ",":
+                    raise ValueError("Niepoprawny rekord JSON: oczekiwano \",\" lub \"}\".")
+                pos = self.skip_whitespace(line, pos + 1)
+        if char == "[" and any(path[0] is None or isinstance(path[0], int) for path in steps):
+            pos = self.skip_whitespace(line, pos + 1)
+            if line[pos] == "]":
+                return pos + 1
+            index = 0
+            while True:
+                children = [path[1:] for path in steps if path[0] is None or path[0] == index]
+                pos = self.walk(line, pos, children, found) if children else self.scan(line, pos)[1]
+                pos = self.skip_whitespace(line, pos)
+                if line[pos] == "]":
+                    return pos + 1
+                if line[pos] != ",":
+                    raise ValueError("Niepoprawny rekord JSON: oczekiwano \",\" lub \"]\".")
+                pos = self.skip_whitespace(line, pos + 1)
+                index += 1
+        return self.scan(line, pos)[1]
+
+
+def splice_json_strings(line: str, found: list, masked: list[str]) -> str:
+    # Podmienia tylko zmienione literały; nowy napis kodowany jak json.dumps (UTF-8)
+    parts = []
+    last = 0
+    for (start, end, value), text in zip(found, masked):
+        if text == value:
+            continue
+        parts.append(line[last:start])
+        parts.append(json.dumps(text, ensure_ascii=False))
+        last = end
+    if not parts:
+        return line
+    parts.append(line[last:])
+    return "".join(parts)
+
+
+def mask_jsonl(anonymizer, lines, selector: JsonFieldSelector, batch_size: int):
+    """Maskuje wybrane pola rekordów JSONL; linie wynikowe w kolejności wejścia.
+
+    Napisy wielu rekordów trafiają razem do mask_many (paczki nlp.pipe, cache i pula
+    procesów jak dla linii tekstu), oknami po JSONL_WINDOW_BATCHES paczek. Linie
+    zawierają swój koniec linii, który zostaje bez zmian; puste linie przechodzą
+    w całości, a niepoprawny JSON kończy się ValueError z numerem linii.
+    """
+    window = []
+    strings = []
+    window_limit = batch_size * JSONL_WINDOW_BATCHES
+
+    def flush():
+        masked = iter(list(anonymizer.mask_many(strings, batch_size=batch_size)))
+        for line, found in window:
+            values = [next(masked) if value.strip() else value for _, _, value in found]
+            yield splice_json_strings(line, found, values)
+        window.clear()
+        strings.clear()
+
+    for number, line in enumerate(lines, 1):
+        found = []
+        if line.strip():
+            try:
+                found = selector.find(line)
+            except ValueError as error:
+                raise ValueError(f"Linia {number}: {error}") from None
+        window.append((line, found))
+        strings.extend(value for _, _, value in found if value.strip())
+        if len(strings) >= window_limit or len(window) >= window_limit:
+            yield from flush()
+    yield from flush()
+
+
+@contextmanager
+def open_text(path: str, mode: str, newline: str | None = None):
+    # "-" oznacza stdin/stdout, dzięki czemu masker.py działa w potokach Uniksa;
+    # newline="" zostawia końce linii bez tłumaczenia (JSONL bajt w bajt)
+    if path == "-":
+        stream = sys.stdin if "r" in mode else sys.stdout
+        stream.reconfigure(encoding="utf-8", newline=newline)
+        yield stream
+        stream.flush()
+        return
+    with open(path, mode, encoding="utf-8", newline=newline) as handle:
+        yield handle
+
+
+@contextmanager
+def open_binary(path: str):
+    # Zapis binarny; "-" oznacza stdout
+    if path == "-":
+        yield sys.stdout.buffer
+        sys.stdout.buffer.flush()
+        return
+    with open(path, "wb") as handle:
+        yield handle
+
+
+# Manifest shardu (--shard) zapisywany obok jego pliku wynikowego
+SHARD_MANIFEST_SUFFIX = ".manifest.json"
+SHARD_REGEX = re.compile(r"(\d+)/(\d+)")
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    # "i/N" -> (i, N); shardy numerowane od 0
+    match = SHARD_REGEX.fullmatch(value)
+    if match is None or not 0 <= int(match.group(1)) < int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"oczekiwano i/N dla 0 <= i < N (np. 0/4), podano {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def mask_shard(
+    anonymizer, input_path: str, output_path: str, shard: int, shards: int, batch_size: int, fingerprint: str
+) -> dict:
+    """Maskuje shard-tą z shards części pliku i zapisuje manifest obok wyniku.
+
+    Części to zakresy linii o zbliżonej liczbie bajtów (LineIndex.split), więc na
+    każdej maszynie ten sam plik daje ten sam podział. Wynik shardu ma format zwykłego
+    wyjścia (niepuste linie, po jednej zamaskowanej linii), a sklejenie wszystkich
+    shardów w kolejności daje to samo co przebieg bez --shard. Manifest zapisuje plik
+    wejściowy (nazwa, rozmiar i SHA-256 całości), zakres wejścia (bajty, linie i SHA-256
+    zakresu), odcisk konfiguracji, liczbę linii i SHA-256 wyniku – sprawdza je
+    merge_shards. Sumy wejścia są liczone kawałkami po widokach mmap, bez kopiowania
+    zakresu do pamięci. Zwraca manifest.
+    """
+    with LineIndex(input_path) as index:
+        first, stop = index.split(shards)[shard]
+        start, end = index.byte_range(first, stop)
+        lines = (line for line in index.lines(first, stop) if line.strip())
+        written = 0
+        with open_text(output_path, "w") as out:
+            for masked_text in anonymizer.mask_many(lines, batch_size=batch_size):
+                out.write(masked_text + "\n")
+                written += 1
+        manifest = {
+            "shard": shard,
+            "shards": shards,
+            "input": {
+                "name": os.path.basename(input_path),
+                "size": index.size,
+                "sha256": index.sha256(),
+                "bytes": [start, end],
+                "lines": [first, stop],
+                "range_sha256": index.sha256(start, end),
+            },
+            "fingerprint": fingerprint,
+            "output": {"lines": written, "sha256": file_sha256(output_path)},
+        }
+    with open(output_path + SHARD_MANIFEST_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return manifest
+
+
+def merge_shards(shard_paths: list[str], output_path: str) -> int:
+    """Skleja wyniki --shard w kolejności shardów, po sprawdzeniu ich manifestów.
+
+    Wymaga kompletu shardów 0..N-1 tego samego pliku wejściowego (nazwa, rozmiar
+    i SHA-256 zawartości, więc inny plik o tym samym rozmiarze jest odrzucany), z tym
+    samym odciskiem konfiguracji i ciągłymi zakresami pokrywającymi cały plik, a każdy
+    wynik musi mieć SHA-256 z manifestu. Niezgodności zgłasza ValueError, zanim
+    cokolwiek zostanie zapisane. Zwraca liczbę linii wyniku.
+    """
+    manifests = []
+    for path in shard_paths:
+        with open(path + SHARD_MANIFEST_SUFFIX, "r", encoding="utf-8") as f:
+            manifests.append((json.load(f), path))
+    manifests.sort(key=lambda item: item[0]["shard"])
+    reference = manifests[0][0]
+    shards = reference["shards"]
+    found = [manifest["shard"] for manifest, _ in manifests]
+    if found != list(range(shards)):
+        missing = sorted(set(range(shards)) - set(found))
+        raise ValueError(
+            f"Oczekiwano shardów 0..{shards - 1}, podano {found}"
+            + (f" (brak: {', '.join(map(str, missing))})." if missing else ".")
+        )
+    position, line = 0, 0
+    for manifest, path in manifests:
+        source = manifest["input"]
+        if manifest["shards"] != shards or (source["name"], source["size"], source["sha256"]) != (
+            reference["input"]["name"],
+            reference["input"]["size"],
+            reference["input"]["sha256"],
+        ):
+            raise ValueError(f"{path}: shard innego podziału lub innego pliku wejściowego.")
+        if manifest["fingerprint"] != reference["fingerprint"]:
+            raise ValueError(f"{path}: inna konfiguracja maskowania niż shard 0.")
+        if source["bytes"][0] != position or source["lines"][0] != line:
+            raise ValueError(f"{path}: zakres wejścia nie styka się z poprzednim shardem.")
+        position, line = source["bytes"][1], source["lines"][1]
+        if file_sha256(path) != manifest["output"]["sha256"]:
+            raise ValueError(f"{path}: suma kontrolna wyniku nie zgadza się z manifestem.")
+    if position != reference["input"]["size"]:
+        raise ValueError("Shardy nie pokrywają całego pliku wejściowego.")
+
+    with open_binary(output_path) as out:
+        for _, path in manifests:
+            with open(path, "rb") as shard_file:
+                shutil.copyfileobj(shard_file, out)
+    return sum(manifest["output"]["lines"] for manifest, _ in manifests)
+
+
+def parse_merge_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="masker.py merge",
+        description="Sklejanie wyników masker.py --shard i/N w kolejności shardów (po sprawdzeniu manifestów).",
+    )
+    parser.add_argument(
+        "shards",
+        nargs="+",
+        help=f"Pliki wynikowe shardów, w dowolnej kolejności (obok każdego <plik>{SHARD_MANIFEST_SUFFIX}).",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="Ścieżka do pliku wyjściowego (\"-\" = stdout).",
+    )
+    return parser.parse_args(argv)
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Anonimizacja tekstów linia-po-linii."
@@ -644,13 +2626,13 @@ def parse_args() -> argparse.Namespace:
         "-i",
         "--input",
         required=True,
-        help="Ścieżka do pliku wejściowego z tekstami (po jednej linii).",
+        help="Ścieżka do pliku wejściowego z tekstami (po jednej linii, \"-\" = stdin).",
     )
     parser.add_argument(
         "-o",
         "--output",
         required=True,
-        help="Ścieżka do pliku wyjściowego (po jednej zanonimizowanej linii).",
+        help="Ścieżka do pliku wyjściowego (po jednej zanonimizowanej linii, \"-\" = stdout).",
     )
     parser.add_argument(
         "-n",
@@ -659,37 +2641,405 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help=(
             "Opcjonalnie: liczba losowo wybranych linii do anonimizacji. "
-            "Jeśli nie podano, przetwarzane są wszystkie linie."
+            "Jeśli nie podano, przetwarzane są wszystkie linie. Dla pliku wejściowego "
+            "losowanie korzysta z indeksu linii (<plik>.lines), dla stdin – z rezerwuaru."
         ),
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Ziarno losowania dla --sample-size (powtarzalna próbka).",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="i/N",
+        help=(
+            "Przetwórz tylko i-tą (od 0) z N części pliku wejściowego o zbliżonej liczbie "
+            f"bajtów i zapisz obok wyniku manifest (<wyjście>{SHARD_MANIFEST_SUFFIX}). "
+            "Wyniki skleja: masker.py merge -o WYNIK SHARD..."
+        ),
+    )
+    parser.add_argument(
+        "--text-column",
+        default="text",
+        help="Kolumna z tekstem dla wejścia Parquet/Arrow IPC (domyślnie text).",
+    )
+    parser.add_argument(
+        "--table-batch-rows",
+        type=int,
+        default=8192,
+        help=(
+            "Wejście Parquet/Arrow IPC (.parquet, .arrow, .feather): wiersze w paczce "
+            "rekordów czytanej, maskowanej i zapisywanej naraz (domyślnie 8192)."
+        ),
+    )
+    parser.add_argument(
+        "--json-field",
+        action="append",
+        default=None,
+        metavar="SELEKTOR",
+        help=(
+            "Wejście JSONL: maskuj tylko napisy wskazane selektorem w stylu JSONPath, "
+            "np. '$.messages[*].content' (można podać wielokrotnie). Reszta rekordu "
+            "przechodzi bez zmian, bajt w bajt."
+        ),
+    )
+    add_pipeline_arguments(parser)
     return parser.parse_args()
 
 
+def add_pipeline_arguments(parser: argparse.ArgumentParser) -> None:
+    # Opcje potoku wspólne dla masker.py i evaluate.py
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=64,
+        help="Liczba linii przetwarzanych jednym wywołaniem nlp.pipe (domyślnie 64).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Liczba procesów roboczych (domyślnie 1). Każdy ładuje model raz, "
+            "dostaje paczki po --batch-size linii, a wynik zachowuje kolejność wejścia."
+        ),
+    )
+    parser.add_argument(
+        "--fast-path",
+        action="store_true",
+        help=(
+            "Zdania bez kandydatów dla NER/priv_masker (cyfr w układzie daty/numeru, "
+            "słów kontekstowych, słów z wielkiej litery poza słowem funkcyjnym na początku "
+            "zdania) tylko przez regexy; do modelu trafiają pozostałe zdania z kontekstem."
+        ),
+    )
+    parser.add_argument(
+        "--masks",
+        nargs="+",
+        choices=sorted(masked_components_default),
+        default=None,
+        metavar="MASK",
+        help=(
+            "Włączone maski priv_masker (domyślnie: wszystkie poza cash_mask). "
+            "Pozostałe są wyłączone."
+        ),
+    )
+    parser.add_argument(
+        "--prune-components",
+        action="store_true",
+        help=(
+            "Ładuj tylko komponenty spaCy/priv_masker potrzebne włączonym maskom "
+            "(szybszy start i mniej pamięci przy zawężonym --masks, wynik bez zmian)."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=(
+            "Katalog trwałego cache wyników (SQLite). Linie już zamaskowane tą samą "
+            "konfiguracją i wersją kodu nie przechodzą ponownie przez model."
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=1_000_000,
+        help="Maksymalna liczba wpisów w cache; najdawniej używane są usuwane (domyślnie 1000000).",
+    )
+    parser.add_argument(
+        "--segment-cache",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Pamiętaj do N zamaskowanych zdań i maskuj tylko zdania niewidziane wcześniej "
+            "(powtarzalne akapity w długich liniach; domyślnie 0 = wyłączone)."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-chars",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Linie dłuższe niż N znaków przetwarzaj oknami po ok. N znaków z zakładką "
+            "(czas rośnie liniowo z długością linii; domyślnie 0 = całe linie)."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=int,
+        default=200,
+        help="Zakładka okien --chunk-chars w znakach, z każdej strony (domyślnie 200).",
+    )
+    parser.add_argument(
+        "--city-gazetteer",
+        default=None,
+        metavar="PATH",
+        help=(
+            "Gazeter miejscowości PRG zbudowany przez extract_cities.py (city_gazetteer.npy); "
+            "nazwy po kodzie pocztowym, \"miejscowość\", \"gmina\" itp. maskowane jako {city}."
+        ),
+    )
+    parser.add_argument(
+        "--name-lexicon",
+        default=None,
+        metavar="DIR",
+        help=(
+            "Leksykon form imion i nazwisk zbudowany przez build_name_lexicon.py; "
+            "dodaje osoby (imię + nazwisko, tytuł + nazwisko), których nie oznaczył priv_masker."
+        ),
+    )
+    parser.add_argument(
+        "--no-ner",
+        action="store_true",
+        help=(
+            "Nie ładuj spaCy/priv_masker: tylko regexy oraz --name-lexicon i --city-gazetteer "
+            "(najwyższa przepustowość kosztem trafności)."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-out",
+        default=None,
+        metavar="PATH",
+        help=(
+            "Zapisz na koniec metryki w JSON: histogramy czasów etapów (także komponentów "
+            "spaCy), spany dodane przez każdy detektor regexowy i liczby spanów na kategorię."
+        ),
+    )
+    parser.add_argument(
+        "--morfeusz",
+        action="store_true",
+        help=(
+            "Maskuj imiona i nazwiska po tytule (\"pan\", \"dr\"), które morfeusz2 oznacza "
+            "etykietą imię/nazwisko, także spoza --name-lexicon."
+        ),
+    )
+    parser.add_argument(
+        "--morph-cache-size",
+        type=int,
+        default=100_000,
+        metavar="N",
+        help="Pamięć LRU analiz morfeusz2 w każdym procesie (domyślnie 100000 form).",
+    )
+    parser.add_argument(
+        "--morph-store",
+        default=None,
+        metavar="DIR",
+        help=(
+            "Magazyn analiz zbudowany przez morphology.py, otwierany przez mmap tylko do "
+            "odczytu i współdzielony przez procesy --workers."
+        ),
+    )
+
+
+def check_pipeline_args(args: argparse.Namespace) -> None:
+    if args.batch_size <= 0 or args.workers <= 0:
+        print("batch-size i workers muszą być liczbami dodatnimi.", file=sys.stderr)
+        sys.exit(1)
+    if args.segment_cache < 0:
+        print("segment-cache nie może być ujemne.", file=sys.stderr)
+        sys.exit(1)
+    if args.chunk_chars < 0 or args.chunk_overlap < 0:
+        print("chunk-chars i chunk-overlap nie mogą być ujemne.", file=sys.stderr)
+        sys.exit(1)
+    if args.morph_cache_size < 0:
+        print("morph-cache-size nie może być ujemne.", file=sys.stderr)
+        sys.exit(1)
+    if args.cache_max_entries <= 0:
+        print("cache-max-entries musi być liczbą dodatnią.", file=sys.stderr)
+        sys.exit(1)
+
+
+def pipeline_kwargs(args: argparse.Namespace) -> dict:
+    # Argumenty TextAnonymizer z opcji potoku (bez metryk); też dla cache_fingerprint
+    anonymizer_kwargs = {
+        "fast_path": args.fast_path,
+        "prune_components": args.prune_components,
+        "segment_cache_size": args.segment_cache,
+        "chunk_chars": args.chunk_chars,
+        "chunk_overlap": args.chunk_overlap,
+        "city_gazetteer": args.city_gazetteer,
+        "name_lexicon": args.name_lexicon,
+        "no_ner": args.no_ner,
+        "morfeusz": args.morfeusz,
+        "morph_cache_size": args.morph_cache_size,
+        "morph_store": args.morph_store,
+    }
+    if args.cache_dir is not None:
+        anonymizer_kwargs["cache_dir"] = args.cache_dir
+        anonymizer_kwargs["cache_max_entries"] = args.cache_max_entries
+    if args.masks is not None:
+        anonymizer_kwargs["masked_components"] = {
+            name: name in args.masks for name in masked_components_default
+        }
+    return anonymizer_kwargs
+
+
+def build_anonymizer(args: argparse.Namespace):
+    # TextAnonymizer albo – przy --workers > 1 – TextAnonymizerPool z opcji potoku
+    anonymizer_kwargs = pipeline_kwargs(args)
+    if args.metrics_out is not None:
+        anonymizer_kwargs["metrics"] = MaskMetrics()
+    if args.workers > 1:
+        # Model ładują tylko procesy robocze
+        return TextAnonymizerPool(args.workers, **anonymizer_kwargs)
+    return TextAnonymizer(**anonymizer_kwargs)
+
+
+def report_pipeline_stats(anonymizer, args: argparse.Namespace) -> None:
+    # Liczniki cache na stderr i metryki do --metrics-out; zamyka cache i pulę procesów
+    if anonymizer.cache is not None:
+        print(anonymizer.cache.stats(), file=sys.stderr)
+    if anonymizer.segment_cache is not None:
+        print(anonymizer.segment_cache.stats(), file=sys.stderr)
+    if getattr(anonymizer, "morphology", None) is not None:
+        # Przy --workers liczniki zostają w procesach roboczych
+        print(anonymizer.morphology.stats(), file=sys.stderr)
+    if anonymizer.metrics is not None:
+        anonymizer.metrics.write(args.metrics_out)
+    anonymizer.close()
+
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["merge"]:
+        merge_args = parse_merge_args(sys.argv[2:])
+        try:
+            merged = merge_shards(merge_args.shards, merge_args.output)
+        except (OSError, ValueError, KeyError) as error:
+            print(f"merge: {error}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Sklejono {len(merge_args.shards)} shardów, {merged} linii.", file=sys.stderr)
+        sys.exit(0)
+
     args = parse_args()
 
-    anonymizer = TextAnonymizer()
+    if args.sample_size is not None and args.sample_size <= 0:
+        print("sample-size musi być liczbą dodatnią.", file=sys.stderr)
+        sys.exit(1)
+    check_pipeline_args(args)
+
+    if args.shard is not None:
+        # Shard to zakres bajtów pliku: potrzebne są pliki (nie stdin/stdout) i zwykły tekst
+        if (
+            "-" in (args.input, args.output)
+            or args.sample_size is not None
+            or args.json_field
+            or table_format(args.input) is not None
+            or table_format(args.output) is not None
+        ):
+            print(
+                "--shard wymaga plików wejścia i wyjścia (nie \"-\") i nie działa z --sample-size, "
+                "--json-field ani plikami Parquet/Arrow IPC.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        shard, shards = args.shard
+        fingerprint = hashlib.sha256(cache_fingerprint(**pipeline_kwargs(args)).encode("utf-8")).hexdigest()
+        anonymizer = build_anonymizer(args)
+        try:
+            manifest = mask_shard(anonymizer, args.input, args.output, shard, shards, args.batch_size, fingerprint)
+        finally:
+            report_pipeline_stats(anonymizer, args)
+        first, stop = manifest["input"]["lines"]
+        print(
+            f"Shard {shard}/{shards}: linie {first}-{stop}, zapisano {manifest['output']['lines']} -> {args.output}",
+            file=sys.stderr,
+        )
+        sys.exit(0)
+
+    if table_format(args.input) is not None or table_format(args.output) is not None:
+        # Parquet/Arrow IPC: paczki rekordów zamiast linii, bez eksportu do tekstu
+        if table_format(args.input) is None or table_format(args.output) is None:
+            print("Wejście i wyjście muszą być plikami Parquet/Arrow IPC.", file=sys.stderr)
+            sys.exit(1)
+        if args.sample_size is not None or args.json_field or args.cache_dir is not None or args.segment_cache:
+            print(
+                "--sample-size, --json-field, --cache-dir i --segment-cache nie działają "
+                "z plikami Parquet/Arrow IPC.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        if args.table_batch_rows <= 0:
+            print("table-batch-rows musi być liczbą dodatnią.", file=sys.stderr)
+            sys.exit(1)
+        if importlib.util.find_spec("pyarrow") is None:
+            print("Pliki Parquet/Arrow IPC wymagają pakietu pyarrow.", file=sys.stderr)
+            sys.exit(1)
+        anonymizer = build_anonymizer(args)
+        try:
+            rows = mask_table(
+                anonymizer, args.input, args.output, args.text_column, args.batch_size, args.table_batch_rows
+            )
+        except KeyError as error:
+            print(error.args[0], file=sys.stderr)
+            sys.exit(1)
+        finally:
+            report_pipeline_stats(anonymizer, args)
+        if not rows:
+            print("Plik wejściowy nie zawiera żadnych wierszy.", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
 
-    # Wczytujemy wszystkie niepuste linie
-    with open(args.input, "r", encoding="utf-8") as f:
-        all_lines = [line.rstrip("\n") for line in f if line.strip()]
+    if args.json_field:
+        if args.sample_size is not None:
+            print("--sample-size działa tylko z plikami tekstowymi.", file=sys.stderr)
+            sys.exit(1)
+        try:
+            selector = JsonFieldSelector(args.json_field)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            sys.exit(1)
+        with open_text(args.input, "r", newline="") as source:
+            # Pusty plik wejściowy kończy się błędem, zanim wyjście zostanie otwarte (nadpisane)
+            lines = iter(source)
+            first_line = next(lines, None)
+            if first_line is None:
+                print("Plik wejściowy nie zawiera żadnych linii.", file=sys.stderr)
+                sys.exit(1)
+            anonymizer = build_anonymizer(args)
+            with open_text(args.output, "w", newline="") as out:
+                try:
+                    for line in mask_jsonl(anonymizer, chain([first_line], lines), selector, args.batch_size):
+                        out.write(line)
+                except ValueError as error:
+                    print(error, file=sys.stderr)
+                    sys.exit(1)
+                finally:
+                    report_pipeline_stats(anonymizer, args)
+        sys.exit(0)
 
-    if not all_lines:
-        print("Plik wejściowy nie zawiera żadnych niepustych linii.", file=sys.stderr)
-        sys.exit(1)
+    # Tryb strumieniowy: linie czytane leniwie, wynik zapisywany na bieżąco.
+    # Tylko --sample-size trzyma w pamięci próbkę: z pliku losowaną przez indeks linii
+    # (czytane są tylko wylosowane linie), ze stdin – rezerwuarem o rozmiarze sample_size.
+    with open_text(args.input, "r") as source:
+        lines_to_process = read_lines(source)
+        if args.sample_size is not None:
+            rng = random.Random(args.seed)
+            if args.input == "-":
+                lines_to_process = reservoir_sample(lines_to_process, args.sample_size, rng)
+            else:
+                with LineIndex(args.input) as index:
+                    lines_to_process = indexed_sample(index, args.sample_size, rng)
 
-    # Obsługa sample_size (opcjonalna)
-    if args.sample_size is not None:
-        if args.sample_size <= 0:
-            print("sample-size musi być liczbą dodatnią.", file=sys.stderr)
+        # Jak dawniej: brak niepustych linii kończy się błędem, zanim wyjście zostanie
+        # otwarte (nadpisane) i zanim zostanie załadowany model
+        lines_to_process = iter(lines_to_process)
+        first_line = next(lines_to_process, None)
+        if first_line is None:
+            print("Plik wejściowy nie zawiera żadnych niepustych linii.", file=sys.stderr)
             sys.exit(1)
-        sample_size = min(args.sample_size, len(all_lines))
-        lines_to_process = random.sample(all_lines, sample_size)
-    else:
-        lines_to_process = all_lines
+        anonymizer = build_anonymizer(args)
 
-    # Zapisujemy TYLKO zamaskowane linie, jedna linia na jedną linię wejściową
-    with open(args.output, "w", encoding="utf-8") as out:
-        for text in lines_to_process:
-            masked_text = anonymizer.mask(text)
-            out.write(masked_text + "\n")
+        # Zapisujemy TYLKO zamaskowane linie, jedna linia na jedną linię wejściową
+        lines_to_process = chain([first_line], lines_to_process)
+        with open_text(args.output, "w") as out:
+            try:
+                for masked_text in anonymizer.mask_many(lines_to_process, batch_size=args.batch_size):
+                    out.write(masked_text + "\n")
+            finally:
+                report_pipeline_stats(anonymizer, args)
@@ -0,0 +1,215 @@
+"""
+Wspólny cache analiz morfeusz2 dla masker.py (--morfeusz) i dawid_cli
+(MorphologicalGenerator).
+
+Jedno wywołanie Morfeusz.analyse() to kilkadziesiąt mikrosekund, a te same formy
+powtarzają się w milionach linii. MorphologyCache trzyma wyniki analyse() w
+ograniczonej pamięci LRU kluczowanej formą powierzchniową, a pod nią opcjonalny
+trwały magazyn (MorphologyStore): tablice .npy otwierane przez mmap tylko do
+odczytu, więc procesy robocze otwierające ten sam katalog dzielą strony pamięci.
+Magazyn buduje się z korpusu:
+
+    python morphology.py --input nask_train/orig.txt --output morph_store
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+from collections import Counter, OrderedDict
+from itertools import accumulate
+
+import numpy as np
+
+STORE_DIR = "morph_store"
+# Formy zapisywane w magazynie: słowa (także z łącznikiem), bez cyfr
+WORD_REGEX = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+
+def morfeusz_available() -> bool:
+    return importlib.util.find_spec("morfeusz2") is not None
+
+
+def form_hash(form: str) -> int:
+    # Stabilny między procesami i uruchomieniami 64-bitowy skrót (w przeciwieństwie do hash())
+    return int.from_bytes(hashlib.blake2b(form.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def encode_record(form: str, analysis) -> bytes:
+    # Forma w pierwszym wierszu, potem po wierszu na interpretację: pola rozdzielone
+    # tabulatorem, etykiety i kwalifikatory znakiem "|"
+    rows = [form]
+    for start, end, (orth, lemma, tag, labels, quals) in analysis:
+        rows.append("\t".join((str(start), str(end), orth, lemma, tag, "|".join(labels), "|".join(quals))))
+    return "\n".join(rows).encode("utf-8")
+
+
+def decode_record(record: bytes) -> tuple[str, tuple]:
+    form, *rows = record.decode("utf-8").split("\n")
+    analysis = []
+    for row in rows:
+        start, end, orth, lemma, tag, labels, quals = row.split("\t")
+        labels = tuple(labels.split("|")) if labels else ()
+        quals = tuple(quals.split("|")) if quals else ()
+        analysis.append((int(start), int(end), (orth, lemma, tag, labels, quals)))
+    return form, tuple(analysis)
+
+
+def freeze(analysis) -> tuple:
+    # Wynik analyse() (lista krawędzi grafu) jako niezmienna krotka – bezpieczna do
+    # współdzielenia między wywołującymi: ((start, end, (orth, lemma, tag, labels, quals)), ...)
+    return tuple(
+        (start, end, (orth, lemma, tag, tuple(labels), tuple(quals)))
+        for start, end, (orth, lemma, tag, labels, quals) in analysis
+    )
+
+
+class MorphologyStore:
+    """Trwały magazyn analiz morfeusz2 (katalog z tablicami .npy ładowanymi przez mmap).
+
+    forms.npy to posortowane skróty form_hash, offsets.npy granice rekordów, a
+    analyses.npy sklejone rekordy encode_record. Odczyt to jedno wyszukiwanie
+    binarne i podział tekstu rekordu; zapisana forma chroni przed kolizją skrótów.
+    Formy ze znakami tabulacji lub nowej linii nie są zapisywane.
+    """
+
+    FILES = ("forms.npy", "offsets.npy", "analyses.npy")
+
+    def __init__(self, directory: str):
+        self.hashes, self.offsets, self.blob = (
+            np.load(os.path.join(directory, name), mmap_mode="r") for name in self.FILES
+        )
+        # Wycinki memoryview są wielokrotnie tańsze niż indeksowanie tablicy numpy
+        self.records = memoryview(self.blob)
+
+    @classmethod
+    def compile(cls, analyses, directory: str) -> int:
+        # analyses: (forma, wynik analyse()); powtórzona forma zostaje przy pierwszym wyniku
+        records = {}
+        for form, analysis in analyses:
+            key = form_hash(form)
+            if key not in records and "\t" not in form and "\n" not in form:
+                records[key] = encode_record(form, analysis)
+        keys = sorted(records)
+        encoded = [records[key] for key in keys]
+        os.makedirs(directory, exist_ok=True)
+        arrays = (
+            np.array(keys, np.uint64),
+            np.fromiter(accumulate(map(len, encoded), initial=0), np.uint64, len(encoded) + 1),
+            np.frombuffer(b"".join(encoded), np.uint8),
+        )
+        for name, array in zip(cls.FILES, arrays):
+            np.save(os.path.join(directory, name), array)
+        return len(keys)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def get(self, form: str) -> tuple | None:
+        if not len(self.hashes):
+            return None
+        key = np.uint64(form_hash(form))
+        pos = int(self.hashes.searchsorted(key))
+        if pos == len(self.hashes) or self.hashes[pos] != key:
+            return None
+        start, end = self.offsets[pos:pos + 2].tolist()
+        stored, analysis = decode_record(self.records[start:end].tobytes())
+        return analysis if stored == form else None
+
+
+class MorphologyCache:
+    """Analizy morfeusz2 z pamięcią LRU i opcjonalnym magazynem MorphologyStore.
+
+    Kolejność: LRU procesu -> magazyn (mmap) -> Morfeusz.analyse(). Obiekt Morfeusz
+    tworzony jest dopiero przy pierwszym chybieniu, więc z pełnym magazynem
+    morfeusz2 nie jest nawet ładowany. Liczniki hits/store_hits/misses pozwalają
+    dobrać max_entries i zawartość magazynu (stats()).
+    """
+
+    def __init__(self, max_entries: int = 100_000, store: str | None = None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.store = None if store is None else MorphologyStore(store)
+        self.morfeusz = None
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def analyse(self, form: str) -> tuple:
+        analysis = self.entries.get(form)
+        if analysis is not None:
+            self.entries.move_to_end(form)
+            self.hits += 1
+            return analysis
+        if self.store is not None:
+            analysis = self.store.get(form)
+        if analysis is None:
+            self.misses += 1
+            analysis = self.analyse_uncached(form)
+        else:
+            self.store_hits += 1
+        if self.max_entries:
+            self.entries[form] = analysis
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return analysis
+
+    def analyse_uncached(self, form: str) -> tuple:
+        if self.morfeusz is None:
+            import morfeusz2
+
+            self.morfeusz = morfeusz2.Morfeusz()
+        return freeze(self.morfeusz.analyse(form))
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.store_hits + self.misses
+        return (self.hits + self.store_hits) / total if total else 0.0
+
+    def stats(self) -> str:
+        return (
+            f"Cache morfeusza: {self.hits} trafień LRU, {self.store_hits} trafień magazynu, "
+            f"{self.misses} chybień ({self.hit_rate():.1%}), {len(self.entries)} wpisów"
+        )
+
+
+def corpus_forms(paths: list[str], min_count: int, max_forms: int) -> list[str]:
+    counts = Counter()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                counts.update(WORD_REGEX.findall(line))
+    return [form for form, count in counts.most_common(max_forms) if count >= min_count]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Budowa magazynu analiz morfeusz2 (MorphologyStore) z korpusu"
+    )
+    parser.add_argument("--input", nargs="+", required=True, help="Pliki tekstowe z korpusem.")
+    parser.add_argument("--output", default=STORE_DIR, help="Katalog wynikowy magazynu.")
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=2,
+        help="Pomiń formy występujące rzadziej (domyślnie 2).",
+    )
+    parser.add_argument(
+        "--max-forms",
+        type=int,
+        default=1_000_000,
+        help="Najwyżej tyle najczęstszych form (domyślnie 1000000).",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    forms = corpus_forms(args.input, args.min_count, args.max_forms)
+    cache = MorphologyCache(max_entries=0)
+    count = MorphologyStore.compile(((form, cache.analyse_uncached(form)) for form in forms), args.output)
+    print(f"Magazyn: {count} form -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
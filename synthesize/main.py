@@ -36,6 +36,10 @@ try:
 except ImportError:
     pass  # python-dotenv nie jest wymagane, ale zalecane
 
+# Indeks linii wspólny z masker.py (pakiet line_index z katalogu głównego repozytorium,
+# zależność w pyproject.toml): --line i --random-n czytają tylko wybrane linie
+from line_index import LineIndex
+
 from src.core import synthesize_line, process_file, synthesize_batch
 from src.llm_client import init_llm, is_initialized
 from src.faker_processor import get_supported_tokens
@@ -130,13 +134,29 @@ def test(
         console.print(f"[red]✗ Plik nie istnieje: {input_path}[/red]")
         raise typer.Exit(1)
     
-    # Wczytaj plik
-    with open(input_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    total_lines = len(lines)
-    console.print(f"[blue]📂 Plik:[/blue] {input_path} ({total_lines} linii)")
-    console.print()
+    # Indeks linii (budowany raz i zapisywany obok pliku jako <plik>.lines); wybrane
+    # linie są czytane od razu, a indeks zamykany przed przetwarzaniem
+    with LineIndex(input_path) as lines:
+        total_lines = len(lines)
+        console.print(f"[blue]📂 Plik:[/blue] {input_path} ({total_lines} linii)")
+        console.print()
+        
+        # Wybierz linijki do testowania
+        if line is not None:
+            if line < 1 or line > total_lines:
+                console.print(f"[red]✗ Numer linii poza zakresem (1-{total_lines})[/red]")
+                raise typer.Exit(1)
+            test_indices = [line - 1]
+        elif random_line:
+            test_indices = [random.randint(0, total_lines - 1)]
+        elif random_n:
+            test_indices = lines.sample(random_n)
+        else:
+            console.print("[yellow]Użyj --line, --random lub --random-n[/yellow]")
+            raise typer.Exit(1)
+        
+        # Linie z końcem "\n", tak jak zwracało readlines()
+        test_lines = [(idx, lines.line(idx, keepends=True)) for idx in test_indices]
     
     # Inicjalizuj LLM jeśli potrzebny
     if not no_llm:
@@ -147,24 +167,8 @@ def test(
             else:
                 init_llm(model=model, use_online=False)
     
-    # Wybierz linijki do testowania
-    if line is not None:
-        if line < 1 or line > total_lines:
-            console.print(f"[red]✗ Numer linii poza zakresem (1-{total_lines})[/red]")
-            raise typer.Exit(1)
-        test_indices = [line - 1]
-    elif random_line:
-        test_indices = [random.randint(0, total_lines - 1)]
-    elif random_n:
-        n = min(random_n, total_lines)
-        test_indices = random.sample(range(total_lines), n)
-    else:
-        console.print("[yellow]Użyj --line, --random lub --random-n[/yellow]")
-        raise typer.Exit(1)
-    
     # Testuj każdą linijkę
-    for idx in test_indices:
-        line_text = lines[idx]
+    for idx, line_text in test_lines:
         line_num = idx + 1
         
         console.print(Panel(f"[bold]Linia {line_num}/{total_lines}[/bold]", style="blue"))
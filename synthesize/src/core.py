@@ -11,6 +11,7 @@ import json
 from pathlib import Path
 from typing import Optional, TypedDict
 from tqdm import tqdm
+from line_index import LineIndex
 
 from .faker_processor import process_with_faker, has_remaining_tokens
 from .llm_client import (
@@ -144,10 +145,10 @@ def process_file(
             model = llm_model or "ollama/PRIHLOP/PLLuM:latest"
             init_llm(model=model, use_online=False)
     
-    # Wczytaj linie
+    # Indeks linii (budowany raz i zapisywany obok pliku jako <plik>.lines): liczba linii
+    # bez wczytywania pliku do listy, linie czytane po kolei w trakcie przetwarzania
     print(f"📂 Reading: {input_path}")
-    with open(input_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+    lines = LineIndex(input_path)
     
     total_lines = len(lines)
     print(f"📊 Total lines: {total_lines}")
@@ -174,7 +175,7 @@ def process_file(
     
     try:
         # Przetwarzaj z progress barem i zapisuj na bieżąco
-        for line in tqdm(lines, desc="Synthesizing", unit="lines"):
+        for line in tqdm(lines.lines(keepends=True), total=total_lines, desc="Synthesizing", unit="lines"):
             line_number += 1
             try:
                 result = synthesize_line(line, use_llm=use_llm, use_prompt_mode=use_prompt_mode)
@@ -219,6 +220,7 @@ def process_file(
     
     finally:
         # Zamknij pliki
+        lines.close()
         txt_file.close()
         if jsonl_file:
             jsonl_file.close()
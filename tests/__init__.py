@@ -0,0 +1 @@
+"""Testy masker.py i line_index.py."""
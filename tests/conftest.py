@@ -0,0 +1,23 @@
+"""Wspólne fikstury testów: TextAnonymizer bez modelu spaCy (no_ner)."""
+
+from pathlib import Path
+
+import pytest
+
+from masker import TextAnonymizer
+
+CORPUS = Path(__file__).resolve().parent.parent / "nask_train" / "anonymized.txt"
+
+
+@pytest.fixture(scope="session")
+def anonymizer():
+    """Tylko regexy, gazeter i leksykon – działa bez pl_nask."""
+    return TextAnonymizer(no_ner=True)
+
+
+@pytest.fixture(scope="session")
+def corpus_lines():
+    """Pierwsze 500 niepustych linii korpusu treningowego."""
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    return lines[:500]
@@ -0,0 +1,33 @@
+"""
+Testy trwałego cache (--cache-dir): trafienia dają ten sam wynik co maskowanie,
+a cache jest zamykany na końcu przebiegu także bez puli procesów.
+"""
+
+import argparse
+import os
+import sqlite3
+
+import pytest
+
+from masker import MaskCache, TextAnonymizer, report_pipeline_stats
+
+
+def test_cache_hits_match_masking(tmp_path, anonymizer, corpus_lines):
+    """Drugi przebieg trafia w cache i daje identyczny wynik."""
+    expected = [anonymizer.mask(line) for line in corpus_lines[:100]]
+    with TextAnonymizer(no_ner=True, cache_dir=str(tmp_path)) as cached:
+        assert list(cached.mask_many(corpus_lines[:100], batch_size=16)) == expected
+        assert list(cached.mask_many(corpus_lines[:100], batch_size=16)) == expected
+        assert cached.cache.hits == 100
+
+
+def test_report_pipeline_stats_closes_cache(tmp_path, capsys):
+    """report_pipeline_stats zamyka cache pojedynczego TextAnonymizer."""
+    anonymizer = TextAnonymizer(no_ner=True, cache_dir=str(tmp_path))
+    list(anonymizer.mask_many(["PESEL 90010112318"]))
+    report_pipeline_stats(anonymizer, argparse.Namespace(metrics_out=None))
+    assert "Cache:" in capsys.readouterr().err
+    with pytest.raises(sqlite3.ProgrammingError):
+        anonymizer.cache.db.execute("SELECT 1")
+    # Zamknięte połączenie WAL scala dziennik z bazą
+    assert not os.path.exists(os.path.join(tmp_path, MaskCache.FILENAME + "-wal"))
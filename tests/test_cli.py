@@ -0,0 +1,44 @@
+"""
+Testy wiersza poleceń masker.py: pusty plik wejściowy kończy się błędem, zanim
+plik wyjściowy zostanie otwarty, więc wcześniejsze wyniki pod tą ścieżką zostają.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_masker(*arguments) -> subprocess.CompletedProcess:
+    command = [sys.executable, str(REPO_ROOT / "masker.py"), "--no-ner", *map(str, arguments)]
+    return subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+
+
+@pytest.mark.parametrize(
+    "content, options",
+    [("", []), ("\n  \n\n", []), ("\n  \n\n", ["--sample-size", "5"]), ("", ["--json-field", "text"])],
+    ids=["pusty", "same-puste-linie", "probka", "jsonl"],
+)
+def test_empty_input_keeps_output(tmp_path, content, options):
+    """Brak (niepustych) linii: kod wyjścia 1, istniejący plik wyjściowy bez zmian."""
+    source = tmp_path / "in.txt"
+    source.write_text(content, encoding="utf-8")
+    output = tmp_path / "out.txt"
+    output.write_text("wcześniejszy wynik\n", encoding="utf-8")
+    result = run_masker("-i", source, "-o", output, *options)
+    assert result.returncode == 1
+    assert "nie zawiera" in result.stderr
+    assert output.read_text(encoding="utf-8") == "wcześniejszy wynik\n"
+
+
+def test_masks_lines(tmp_path):
+    """Niepuste linie są maskowane, puste pomijane."""
+    source = tmp_path / "in.txt"
+    source.write_text("\nMój PESEL to 90010112318.\n\nbez danych\n", encoding="utf-8")
+    output = tmp_path / "out.txt"
+    result = run_masker("-i", source, "-o", output)
+    assert result.returncode == 0, result.stderr
+    assert output.read_text(encoding="utf-8") == "Mój PESEL to {pesel}.\nbez danych\n"
@@ -0,0 +1,96 @@
+"""
+Testy mapy zależności komponentów (--prune-components).
+
+COMPONENT_DEPENDENCIES jest pisana ręcznie, więc porównujemy ją ze źródłami
+zainstalowanego priv_masker: atrybuty tokenów czytane przez każdy komponent (i moduły
+pomocnicze, z których korzysta) wyznaczają potrzebne możliwości modelu i rozszerzenia
+innych komponentów. Z zainstalowanym pl_nask sprawdzamy też, że przycięty potok daje
+ten sam wynik co pełny.
+"""
+
+import inspect
+import re
+import sys
+from pathlib import Path
+
+import pytest
+import spacy
+from priv_masker.tools.components import ANNOTATIONS, MASKS
+
+from masker import COMPONENT_DEPENDENCIES, TextAnonymizer, masked_components_default, required_components
+
+# Odczyty atrybutów spaCy -> możliwość modelu, która je ustawia
+CAPABILITY_PATTERNS = {
+    "tagger": r"\.tag_\b|\.pos_\b|\.morph\b|[\"'](?:TAG|POS|MORPH)[\"']",
+    "parser": r"\.dep_\b|\.head\b|\.subtree\b|\.children\b|\.lefts\b|\.rights\b|\.noun_chunks\b|[\"']DEP[\"']",
+    "lemmatizer": r"\.lemma_\b|[\"']LEMMA[\"']",
+    "ner": r"\.ent_type_\b|\.ent_iob_\b|\.ents\b|[\"']ENT_TYPE[\"']",
+}
+COMPONENT_NAMES = [name for _, name in ANNOTATIONS + MASKS]
+
+
+def component_source(factory) -> str:
+    # Moduł komponentu i moduły priv_masker, z których importuje (np. make_matcher_from_dataset)
+    module = sys.modules[factory.__module__]
+    modules = [module]
+    for value in vars(module).values():
+        name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+        used = sys.modules.get(name) if name else None
+        if used is not None and name.startswith("priv_masker.") and ".tools." not in name and used not in modules:
+            modules.append(used)
+    return "\n".join(inspect.getsource(used) for used in modules)
+
+
+def read_dependencies(factory, name: str) -> set:
+    source = component_source(factory)
+    found = {capability for capability, pattern in CAPABILITY_PATTERNS.items() if re.search(pattern, source)}
+    found |= {
+        other for other in COMPONENT_NAMES if other != name and re.search(r"[\"'.]%s\b" % other, source)
+    }
+    return found
+
+
+def closure(name: str) -> set:
+    needed = set()
+    pending = [name]
+    while pending:
+        for dependency in COMPONENT_DEPENDENCIES.get(pending.pop(), ()):
+            if dependency not in needed:
+                needed.add(dependency)
+                pending.append(dependency)
+    return needed
+
+
+@pytest.mark.parametrize("factory, name", ANNOTATIONS + MASKS, ids=COMPONENT_NAMES)
+def test_dependencies_cover_priv_masker_sources(factory, name):
+    """Wszystko, co komponent czyta według źródeł priv_masker, jest w domknięciu mapy."""
+    assert name in COMPONENT_DEPENDENCIES
+    missing = read_dependencies(factory, name) - closure(name)
+    assert not missing, f"{name} ({Path(inspect.getsourcefile(factory)).name}) czyta też: {sorted(missing)}"
+
+
+def test_dependencies_follow_pipeline_order():
+    """Komponent priv_masker zależy tylko od komponentów uruchamianych przed nim."""
+    order = {name: position for position, name in enumerate(COMPONENT_NAMES)}
+    for name, dependencies in COMPONENT_DEPENDENCIES.items():
+        for dependency in dependencies:
+            if name in order and dependency in order:
+                assert order[dependency] < order[name], (name, dependency)
+
+
+def test_required_components_keeps_later_masks():
+    """Maski po włączonej zostają (nadpisują token._.mask), wcześniejsze są pomijane."""
+    needed = required_components({"orgname_mask": True})
+    assert {"orgname_mask", "invalid_unmask", "mask", "ner", "priv_number"} <= needed
+    assert "persname_mask" not in needed and "priv_name" not in needed
+
+
+@pytest.mark.skipif(not spacy.util.is_package("pl_nask"), reason="wymaga modelu pl_nask")
+@pytest.mark.parametrize("masks", [["persname_mask"], ["orgname_mask"], ["date_mask"], ["id_numbers_mask"]])
+def test_pruned_pipeline_matches_full(masks, corpus_lines):
+    """Przycięty potok maskuje korpus identycznie jak pełny."""
+    masked_components = {name: name in masks for name in masked_components_default}
+    full = TextAnonymizer(masked_components=masked_components)
+    pruned = TextAnonymizer(masked_components=masked_components, prune_components=True)
+    assert len(pruned.nlp.pipe_names) < len(full.nlp.pipe_names)
+    assert list(pruned.mask_many(corpus_lines)) == list(full.mask_many(corpus_lines))
@@ -0,0 +1,57 @@
+"""
+Testy wstępnej selekcji szybkiej ścieżki (--fast-path): które zdania trafiają do
+modelu i jak z nich powstają okna.
+"""
+
+import pytest
+
+from masker import TextAnonymizer, split_segments
+
+SKIPPED = "To jest bardzo zwyczajne zdanie bez żadnych danych osobowych w środku."
+FLAGGED = "Wczoraj rozmawiałem o tym z Janem Kowalskim przez dłuższą chwilę."
+
+
+@pytest.fixture(scope="module")
+def fast_anonymizer():
+    return TextAnonymizer(no_ner=True, fast_path=True)
+
+
+def test_needs_nlp_signals(fast_anonymizer):
+    """Słowo funkcyjne na początku zdania nie jest sygnałem; imię, liczby i e-mail są."""
+    assert not fast_anonymizer.needs_nlp(SKIPPED)
+    assert fast_anonymizer.needs_nlp(FLAGGED)
+    assert fast_anonymizer.needs_nlp("Kraków był tego dnia zupełnie pusty.")
+    assert fast_anonymizer.needs_nlp("proszę o kontakt na adres e-mail podany wyżej")
+    assert fast_anonymizer.needs_nlp("spotkanie było 12.05 o godzinie dziewiątej")
+
+
+def test_fast_path_windows_cover_flagged_sentences(fast_anonymizer):
+    """Rdzenie okien obejmują dokładnie zdania z sygnałem, sąsiednie są scalone."""
+    text = " ".join([SKIPPED, FLAGGED, FLAGGED, SKIPPED, FLAGGED])
+    parts = split_segments(text)
+    assert len(parts) == 9
+    windows = fast_anonymizer.fast_path_windows(text)
+    first = len(SKIPPED) + 1
+    last = len(text) - len(FLAGGED)
+    assert [(core_start, core_end) for _, _, core_start, core_end in windows] == [
+        (first, first + 2 * len(FLAGGED) + 1),
+        (last, len(text)),
+    ]
+    for start, end, core_start, core_end in windows:
+        assert start <= core_start < core_end <= end
+
+
+def test_fast_path_windows_extremes(fast_anonymizer):
+    """Linia bez sygnału omija model; linia z samym sygnałem to jedno pełne okno."""
+    assert fast_anonymizer.fast_path_windows(" ".join([SKIPPED, SKIPPED])) == []
+    text = " ".join([FLAGGED, FLAGGED])
+    assert fast_anonymizer.fast_path_windows(text) == [(0, len(text), 0, len(text))]
+
+
+def test_chunk_windows_range(fast_anonymizer):
+    """Bez chunk_chars chunk_windows daje jedno okno na cały tekst lub fragment."""
+    text = " ".join([SKIPPED] * 10)
+    assert fast_anonymizer.chunk_windows(text) == [(0, len(text), 0, len(text))]
+    (start, end, core_start, core_end), = fast_anonymizer.chunk_windows(text, 300, 400)
+    assert (core_start, core_end) == (300, 400)
+    assert 300 - fast_anonymizer.chunk_overlap <= start < 300 and 400 < end <= 400 + fast_anonymizer.chunk_overlap
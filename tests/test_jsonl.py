@@ -0,0 +1,74 @@
+"""
+Testy --json-field: selektory, wyszukiwanie literałów napisów bez dekodowania
+rekordu i podmiana, która zostawia resztę linii bajt w bajt.
+"""
+
+import json
+
+import pytest
+
+from masker import JsonFieldSelector, mask_jsonl, parse_json_selector, splice_json_strings
+
+RECORD = '{"id": 7,  "messages": [{"role": "user", "content": "PESEL 90010112318"}, {"role":"bot","content":"ok"}], "meta": {"note": "\\u0141\\u00f3d\\u017a"}}'
+
+
+def test_parse_json_selector():
+    """Kroki selektora: klucze, indeksy, * i klucze w cudzysłowach."""
+    assert parse_json_selector("$.messages[*].content") == ("messages", None, "content")
+    assert parse_json_selector("text") == ("text",)
+    assert parse_json_selector("$['a.b'][2]") == ("a.b", 2)
+    assert parse_json_selector('$.meta.*') == ("meta", None)
+    with pytest.raises(ValueError):
+        parse_json_selector("$")
+    with pytest.raises(ValueError):
+        parse_json_selector("$.a[x]")
+
+
+def test_selector_finds_string_literals():
+    """Pozycje obejmują cudzysłowy, wartości są zdekodowane, reszta pominięta."""
+    found = JsonFieldSelector(["$.messages[*].content", "$.meta.note", "$.id"]).find(RECORD)
+    assert [value for _, _, value in found] == ["PESEL 90010112318", "ok", "Łódź"]
+    for start, end, value in found:
+        assert json.loads(RECORD[start:end]) == value
+    assert JsonFieldSelector(["$.messages[1].role"]).find(RECORD)[0][2] == "bot"
+    assert JsonFieldSelector(["$.missing"]).find(RECORD) == []
+
+
+def test_selector_rejects_invalid_json():
+    """Niepoprawny rekord i dane po końcu wartości to ValueError."""
+    selector = JsonFieldSelector(["$.text"])
+    for line in ('{"text": "a"', '{"text" "a"}', '{"text": "a"} x', '{"text": "a",}'):
+        with pytest.raises(ValueError):
+            selector.find(line)
+
+
+def test_splice_json_strings():
+    """Podmieniane są tylko zmienione napisy; reszta rekordu bez zmian."""
+    found = JsonFieldSelector(["$.messages[*].content", "$.meta.note"]).find(RECORD)
+    assert splice_json_strings(RECORD, found, [value for _, _, value in found]) == RECORD
+    spliced = splice_json_strings(RECORD, found, ["PESEL {pesel}", "ok", "Łódź \"x\""])
+    assert spliced == RECORD.replace("PESEL 90010112318", "PESEL {pesel}").replace(
+        '"\\u0141\\u00f3d\\u017a"', '"Łódź \\"x\\""'
+    )
+    expected = json.loads(RECORD)
+    expected["messages"][0]["content"] = "PESEL {pesel}"
+    expected["meta"]["note"] = 'Łódź "x"'
+    assert json.loads(spliced) == expected
+
+
+def test_mask_jsonl_matches_mask(anonymizer):
+    """Zamaskowane pola == mask() na wartościach; puste linie i końce linii bez zmian."""
+    lines = [RECORD + "\n", "\n", '{"messages": [], "x": 1}\r\n', RECORD]
+    selector = JsonFieldSelector(["$.messages[*].content"])
+    output = list(mask_jsonl(anonymizer, lines, selector, batch_size=2))
+    assert output[1:3] == lines[1:3]
+    assert output[0].endswith("\n") and not output[3].endswith("\n")
+    record = json.loads(output[0])
+    assert record["messages"][0]["content"] == anonymizer.mask("PESEL 90010112318") == "PESEL {pesel}"
+    assert record["meta"]["note"] == "Łódź"
+
+
+def test_mask_jsonl_reports_line_number(anonymizer):
+    """Błąd w rekordzie podaje numer linii."""
+    with pytest.raises(ValueError, match="Linia 2"):
+        list(mask_jsonl(anonymizer, ['{"text": "a"}\n', "{\n"], JsonFieldSelector(["$.text"]), batch_size=4))
@@ -0,0 +1,57 @@
+"""
+Testy słowników z lexicons.py (gazeter miejscowości i leksykon imion): kompilacja
+i wyszukiwanie oraz to, że moduł (używany przez skrypty budujące słowniki) nie
+ładuje spaCy ani priv_masker.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from lexicons import NAME_FEMALE, NAME_FIRST, NAME_LAST, NAME_MALE, CityGazetteer, NameLexicon
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_lexicons_import_is_light():
+    """import lexicons nie ciągnie masker.py, spaCy ani priv_masker."""
+    code = "import sys, lexicons; print(sorted({'masker', 'spacy', 'priv_masker'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_city_gazetteer_find(tmp_path):
+    """Najdłuższe, rozłączne trafienia; nazwy z cyframi i nawiasami są pomijane."""
+    path = str(tmp_path / "cities.npy")
+    count = CityGazetteer.compile(["Kraków", "Nowy Sącz", "Nowy", "Bielsko-Biała", "Góra (gm. X)", "Łódź 2"], path)
+    assert count == 4
+    gazetteer = CityGazetteer(path)
+    assert gazetteer.max_words == 2
+    text = "Jadę z Nowy Sącz do Bielsko-Biała, potem Kraków i Nowy dom; krakówek nie."
+    found = [text[start:end] for start, end in gazetteer.find(text)]
+    assert found == ["Nowy Sącz", "Bielsko-Biała", "Kraków", "Nowy"]
+    start = text.index("Kraków")
+    assert gazetteer.find(text, start, start + 6) == [(start, start + 6)]
+
+
+def test_name_lexicon_lookup_and_persons(tmp_path):
+    """Formy wskazują lemat i sumę flag; osoby to imię + nazwisko albo słowo po tytule."""
+    directory = str(tmp_path / "names")
+    entries = [
+        ("Jan", "Jan", NAME_MALE | NAME_FIRST),
+        ("Janem", "Jan", NAME_MALE | NAME_FIRST),
+        ("Kowalski", "Kowalski", NAME_MALE | NAME_LAST),
+        ("Kowalskim", "Kowalski", NAME_MALE | NAME_LAST),
+        ("Anna", "Anna", NAME_FEMALE | NAME_FIRST),
+        ("Jan", "Jan", NAME_MALE | NAME_LAST),
+    ]
+    assert NameLexicon.compile(entries, directory) == 5
+    lexicon = NameLexicon(directory)
+    assert lexicon.lookup("Janem") == ("Jan", NAME_MALE | NAME_FIRST)
+    assert lexicon.lookup("Jan") == ("Jan", NAME_MALE | NAME_FIRST | NAME_LAST)
+    assert lexicon.lookup("Nowak") is None
+    text = "Rozmawiałem z Janem Kowalskim, potem pan Kowalski i Anna."
+    assert [(text[start:end], label) for start, end, label in lexicon.find_persons(text)] == [
+        ("Janem Kowalskim", "{name}"),
+        ("Kowalski", "{surname}"),
+    ]
@@ -0,0 +1,137 @@
+"""
+Testy LineIndex: linie po numerze zgodne z czytaniem pliku w trybie tekstowym,
+zapis i ponowne użycie <plik>.lines oraz podział na części.
+"""
+
+import hashlib
+import os
+import random
+from array import array
+
+import pytest
+
+import line_index
+from line_index import INDEX_SUFFIX, LineIndex, build_offsets
+
+
+def write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def text_lines(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def test_lines_match_text_mode(tmp_path):
+    """Linie, także ostatnia bez końca linii i puste, jak w trybie tekstowym."""
+    path = write(tmp_path / "a.txt", "zażółć\n\ngęślą jaźń\r\nostatnia".encode("utf-8"))
+    with LineIndex(path) as index:
+        assert len(index) == 4
+        assert list(index) == text_lines(path) == ["zażółć", "", "gęślą jaźń", "ostatnia"]
+        assert index[2] == index.line(2) == "gęślą jaźń"
+        assert list(index.lines(1, 3)) == ["", "gęślą jaźń"]
+        with pytest.raises(IndexError):
+            index.line(4)
+
+
+@pytest.mark.parametrize("data", [b"a\rb\r\nc\n\rd\r", b"\r\r\n\n", b"x\r", b"\r", b"a\r\n" * 3 + b"b"])
+def test_carriage_returns_match_universal_newlines(tmp_path, data):
+    """Samotne "\\r" i "\\r\\n" dzielą linie jak uniwersalne końce linii trybu tekstowego."""
+    path = write(tmp_path / "cr.txt", data)
+    with open(path, "r", encoding="utf-8") as f:
+        expected = list(f)
+    with LineIndex(path, cache=False) as index:
+        assert len(index) == len(expected)
+        assert list(index.lines(keepends=True)) == expected
+        assert list(index) == text_lines(path)
+        assert [index.line(number, keepends=True) for number in range(len(index))] == expected
+
+
+def test_fast_path_matches_regex_split():
+    """Plik bez "\\r" (szybkie find) daje te same granice co podział wyrażeniem."""
+    data = b"a\nbb\n\nccc"
+    assert list(build_offsets(data)) == list(build_offsets(data + b"\r")) == [0, 2, 5, 6]
+
+
+def test_empty_file(tmp_path):
+    """Pusty plik: zero linii i pusty podział."""
+    path = write(tmp_path / "empty.txt", b"")
+    with LineIndex(path) as index:
+        assert len(index) == 0
+        assert list(index) == []
+        assert index.split(3) == [(0, 0), (0, 0), (0, 0)]
+
+
+def test_index_saved_and_reused(tmp_path):
+    """<plik>.lines jest zapisywany, czytany ponownie i odrzucany po zmianie pliku."""
+    path = write(tmp_path / "b.txt", b"a\nbb\nccc\n")
+    with LineIndex(path) as index:
+        assert index.index_path == path + INDEX_SUFFIX
+    assert os.path.exists(path + INDEX_SUFFIX)
+    with LineIndex(path) as index:
+        assert isinstance(index.starts, memoryview)
+        assert list(index) == ["a", "bb", "ccc"]
+        index_map = index.index_map
+    assert index_map.closed
+    write(path, b"a\nbb\nccc\ndddd\n")
+    with LineIndex(path) as index:
+        assert list(index) == ["a", "bb", "ccc", "dddd"]
+    with LineIndex(path, cache=False) as index:
+        assert len(index) == 4
+
+
+def test_invalid_index_is_rebuilt(tmp_path):
+    """Uszkodzony <plik>.lines albo zapisany w innej wersji formatu jest budowany od nowa."""
+    path = write(tmp_path / "e.txt", b"a\rb\n")
+    stat = os.stat(path)
+    for stored in (b"x" * 13, array("Q", (1, stat.st_size, stat.st_mtime_ns, 0)).tobytes()):
+        write(path + INDEX_SUFFIX, stored)
+        with LineIndex(path) as index:
+            assert index.index_map is None
+            assert list(index) == ["a", "b"]
+
+
+def test_split_is_contiguous_and_balanced(tmp_path):
+    """Części są ciągłe, pokrywają cały plik i mają zbliżoną liczbę bajtów."""
+    rng = random.Random(0)
+    lines = ["x" * rng.randint(0, 80) for _ in range(2000)]
+    path = write(tmp_path / "c.txt", "".join(line + "\n" for line in lines).encode())
+    with LineIndex(path) as index:
+        parts = index.split(4)
+        assert parts[0][0] == 0 and parts[-1][1] == len(index)
+        assert all(stop == first for (_, stop), (first, _) in zip(parts, parts[1:]))
+        sizes = [end - start for start, end in (index.byte_range(*part) for part in parts)]
+        assert sum(sizes) == index.size
+        assert max(sizes) - min(sizes) <= 2 * 82
+        assert [line for part in parts for line in index.lines(*part)] == lines
+
+
+def test_sha256_in_chunks(tmp_path, monkeypatch):
+    """SHA-256 zakresu liczony kawałkami == SHA-256 tych samych bajtów naraz."""
+    monkeypatch.setattr(line_index, "HASH_CHUNK", 7)
+    data = bytes(range(256)) * 3
+    path = write(tmp_path / "h.bin", data)
+    with LineIndex(path) as index:
+        assert index.sha256() == hashlib.sha256(data).hexdigest()
+        assert index.sha256(5, 300) == hashlib.sha256(data[5:300]).hexdigest()
+        assert index.sha256(10, 10) == hashlib.sha256(b"").hexdigest()
+    with LineIndex(write(tmp_path / "empty.bin", b"")) as index:
+        assert index.sha256() == hashlib.sha256(b"").hexdigest()
+
+
+def test_sample_draws_distinct_lines(tmp_path):
+    """Próbka to różne numery linii z zakresu pliku, nie większa niż plik, w kolejności
+    i z wynikiem random.sample (domyślnie globalny generator, więc random.seed działa)."""
+    path = write(tmp_path / "d.txt", b"".join(b"%d\n" % i for i in range(100)))
+    with LineIndex(path) as index:
+        numbers = index.sample(10, random.Random(0))
+        assert len(set(numbers)) == 10 and all(0 <= n < 100 for n in numbers)
+        assert numbers == random.Random(0).sample(range(100), 10)
+        assert sorted(index.sample(1000, random.Random(0))) == list(range(100))
+        random.seed(7)
+        numbers = index.sample(10)
+        random.seed(7)
+        assert numbers == random.sample(range(100), 10)
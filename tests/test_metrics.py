@@ -0,0 +1,45 @@
+"""
+Testy metryk (--metrics-out): czasy komponentów spaCy zbierane przez publiczne API
+(nlp.pipeline), bez podmiany komponentów potoku i bez zmiany wyniku.
+"""
+
+import spacy
+from spacy.language import Language
+from spacy.tokens import Token
+
+from masker import MaskMetrics, TextAnonymizer
+
+
+@Language.component("test_passthrough")
+def passthrough(doc):
+    return doc
+
+
+def blank_anonymizer(metrics=None) -> TextAnonymizer:
+    Token.set_extension("mask", default=None, force=True)
+    Token.set_extension("priv_last_name", default=False, force=True)
+    nlp = spacy.blank("pl")
+    nlp.add_pipe("test_passthrough")
+    return TextAnonymizer(nlp=nlp, metrics=metrics)
+
+
+def test_metrics_time_each_component(corpus_lines):
+    """Każdy komponent nlp.pipeline ma swój etap "nlp:<nazwa>" z liczbą dokumentów."""
+    metrics = MaskMetrics()
+    anonymizer = blank_anonymizer(metrics)
+    components = list(anonymizer.nlp.pipeline)
+    masked = list(anonymizer.mask_many(corpus_lines, batch_size=32))
+    assert anonymizer.nlp.pipeline == components
+    assert masked == list(blank_anonymizer().mask_many(corpus_lines, batch_size=32))
+    for name in anonymizer.nlp.pipe_names:
+        assert metrics.stages[f"nlp:{name}"][0] == len(corpus_lines)
+    assert metrics.lines == len(corpus_lines)
+
+
+def test_metrics_single_text():
+    """analyze() pojedynczego tekstu też trafia do metryk komponentów."""
+    metrics = MaskMetrics()
+    anonymizer = blank_anonymizer(metrics)
+    text = "Mój PESEL to 90010112318."
+    assert anonymizer.mask(text) == "Mój PESEL to {pesel}."
+    assert metrics.stages["nlp:test_passthrough"][0] == 1
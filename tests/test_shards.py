@@ -0,0 +1,103 @@
+"""
+Testy --shard i/N oraz merge: sklejone shardy mają być identyczne z przebiegiem
+bez --shard, a merge ma odrzucać niekompletne lub niezgodne zestawy shardów.
+"""
+
+import hashlib
+import json
+
+import pytest
+
+from masker import SHARD_MANIFEST_SUFFIX, mask_shard, merge_shards
+
+
+@pytest.fixture
+def corpus_file(tmp_path, corpus_lines):
+    path = tmp_path / "in.txt"
+    # Puste linie w środku: pomijane tak jak w zwykłym przebiegu
+    path.write_text("\n".join(corpus_lines[:100]) + "\n\n" + "\n".join(corpus_lines[100:]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def run_shards(anonymizer, corpus_file, directory, shards, fingerprint="f") -> list[str]:
+    outputs = []
+    for shard in range(shards):
+        output = str(directory / f"out_{shards}_{shard}.txt")
+        mask_shard(anonymizer, corpus_file, output, shard, shards, batch_size=16, fingerprint=fingerprint)
+        outputs.append(output)
+    return outputs
+
+
+@pytest.mark.parametrize("shards", [1, 3, 7])
+def test_merge_matches_full_run(anonymizer, corpus_file, corpus_lines, tmp_path, shards):
+    """Sklejone shardy == zamaskowanie całego pliku naraz, niezależnie od kolejności argumentów."""
+    expected = "".join(text + "\n" for text in anonymizer.mask_many(corpus_lines, batch_size=16))
+    outputs = run_shards(anonymizer, corpus_file, tmp_path, shards)
+    merged = str(tmp_path / "merged.txt")
+    assert merge_shards(list(reversed(outputs)), merged) == len(corpus_lines)
+    with open(merged, "r", encoding="utf-8") as f:
+        assert f.read() == expected
+
+
+def test_manifest_ranges(anonymizer, corpus_file, tmp_path):
+    """Manifesty opisują plik wejściowy, ciągłe zakresy wejścia i liczbę linii wyniku."""
+    outputs = run_shards(anonymizer, corpus_file, tmp_path, 4)
+    manifests = []
+    for output in outputs:
+        with open(output + SHARD_MANIFEST_SUFFIX, "r", encoding="utf-8") as f:
+            manifests.append(json.load(f))
+    assert [m["shard"] for m in manifests] == [0, 1, 2, 3]
+    with open(corpus_file, "rb") as f:
+        data = f.read()
+    assert {m["input"]["sha256"] for m in manifests} == {hashlib.sha256(data).hexdigest()}
+    for m in manifests:
+        start, end = m["input"]["bytes"]
+        assert m["input"]["range_sha256"] == hashlib.sha256(data[start:end]).hexdigest()
+    assert manifests[0]["input"]["bytes"][0] == 0
+    assert manifests[-1]["input"]["bytes"][1] == manifests[0]["input"]["size"]
+    for previous, current in zip(manifests, manifests[1:]):
+        assert previous["input"]["bytes"][1] == current["input"]["bytes"][0]
+        assert previous["input"]["lines"][1] == current["input"]["lines"][0]
+
+
+def test_merge_rejects_missing_shard(anonymizer, corpus_file, tmp_path):
+    """Brak shardu: ValueError i brak pliku wynikowego."""
+    outputs = run_shards(anonymizer, corpus_file, tmp_path, 3)
+    merged = tmp_path / "merged.txt"
+    with pytest.raises(ValueError, match="brak: 1"):
+        merge_shards([outputs[0], outputs[2]], str(merged))
+    assert not merged.exists()
+
+
+def test_merge_rejects_other_configuration(anonymizer, corpus_file, tmp_path):
+    """Shardy z różnym odciskiem konfiguracji nie są sklejane."""
+    outputs = run_shards(anonymizer, corpus_file, tmp_path, 2)
+    other = str(tmp_path / "other.txt")
+    mask_shard(anonymizer, corpus_file, other, 1, 2, batch_size=16, fingerprint="inny")
+    with pytest.raises(ValueError, match="konfiguracja"):
+        merge_shards([outputs[0], other], str(tmp_path / "merged.txt"))
+
+
+def test_merge_rejects_other_input_of_same_size(anonymizer, corpus_file, tmp_path):
+    """Shard innego pliku wejściowego o tej samej nazwie i rozmiarze nie jest sklejany."""
+    outputs = run_shards(anonymizer, corpus_file, tmp_path, 2)
+    with open(corpus_file, "rb") as f:
+        data = bytearray(f.read())
+    data[0:1] = b"X" if data[0:1] != b"X" else b"Y"
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    other_file = other_dir / "in.txt"
+    other_file.write_bytes(bytes(data))
+    other = str(tmp_path / "other.txt")
+    mask_shard(anonymizer, str(other_file), other, 1, 2, batch_size=16, fingerprint="f")
+    with pytest.raises(ValueError, match="innego pliku wejściowego"):
+        merge_shards([outputs[0], other], str(tmp_path / "merged.txt"))
+
+
+def test_merge_rejects_modified_output(anonymizer, corpus_file, tmp_path):
+    """Wynik shardu zmieniony po zapisaniu manifestu – suma kontrolna się nie zgadza."""
+    outputs = run_shards(anonymizer, corpus_file, tmp_path, 2)
+    with open(outputs[1], "a", encoding="utf-8") as f:
+        f.write("dopisane\n")
+    with pytest.raises(ValueError, match="suma kontrolna"):
+        merge_shards(outputs, str(tmp_path / "merged.txt"))
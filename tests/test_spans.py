@@ -0,0 +1,174 @@
+"""
+Testy SpanIndex i MaskSpans: indeks spanów ma działać jak liniowe sprawdzanie
+nakładania się, a spany z analyze() mają składać ten sam tekst co mask().
+token_masks ma zwracać to samo co publiczne token._.mask.
+"""
+
+import random
+
+import numpy as np
+import pytest
+import spacy
+from spacy.tokens import Token
+from spacy.tokens.underscore import Underscore
+
+import masker
+from masker import MaskSpans, SpanIndex
+
+
+class LinearSpanList(SpanIndex):
+    """Zachowanie sprzed indeksu: każde zapytanie przegląda wszystkie spany."""
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return any(not (end <= s or start >= e) for s, e in zip(self.starts, self.ends))
+
+    def add(self, start: int, end: int, placeholder: str) -> bool:
+        if self.overlaps(start, end):
+            return False
+        self.starts.append(start)
+        self.ends.append(end)
+        self.placeholders.append(placeholder)
+        return True
+
+    def spans(self) -> list:
+        return sorted(zip(self.starts, self.ends, self.placeholders))
+
+
+def digit_heavy_line(numbers: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(numbers):
+        if i % 3 == 0:
+            parts.append(f"tel. {rng.randint(500, 899)} {rng.randint(100, 999)} {rng.randint(100, 999)}")
+        elif i % 3 == 1:
+            parts.append(f"KW nr GD1G/{rng.randint(0, 99999999):08d}/{rng.randint(0, 9)}")
+        else:
+            parts.append(f"{rng.randint(10, 99)}.{rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(10, 99)}")
+    return ", ".join(parts)
+
+
+def test_span_index_matches_linear_random():
+    """Losowe wstawienia: te same decyzje i ten sam wynik co lista liniowa."""
+    rng = random.Random(0)
+    indexed, linear = SpanIndex(), LinearSpanList()
+    for _ in range(2000):
+        start = rng.randrange(1000)
+        end = start + rng.randint(1, 15)
+        assert indexed.overlaps(start, end) == linear.overlaps(start, end)
+        assert indexed.add(start, end, "{x}") == linear.add(start, end, "{x}")
+    assert indexed.spans() == linear.spans()
+    assert indexed.starts == sorted(indexed.starts)
+
+
+def test_span_index_touching_spans():
+    """Spany stykające się końcami nie nakładają się."""
+    index = SpanIndex()
+    assert index.add(5, 10, "{a}")
+    assert index.add(10, 12, "{b}")
+    assert index.add(0, 5, "{c}")
+    assert not index.add(9, 11, "{d}")
+    assert index.spans() == [(0, 5, "{c}"), (5, 10, "{a}"), (10, 12, "{b}")]
+
+
+def test_build_regex_spans_linear_equivalence(anonymizer, monkeypatch):
+    """build_regex_spans daje te same spany z SpanIndex i z listą liniową."""
+    line = digit_heavy_line(300)
+    indexed = anonymizer.build_regex_spans(line)
+    monkeypatch.setattr(masker, "SpanIndex", LinearSpanList)
+    assert anonymizer.build_regex_spans(line) == indexed
+
+
+def test_mask_spans_round_trip(anonymizer, corpus_lines):
+    """apply_spans(analyze(linia)) == mask(linia), a spany są rozłączne i posortowane."""
+    for line in corpus_lines:
+        spans = anonymizer.analyze(line)
+        assert anonymizer.apply_spans(line, spans) == anonymizer.mask(line)
+        bounds = [(start, end) for start, end, _ in spans]
+        assert bounds == sorted(bounds)
+        assert all(end <= start for (_, end), (start, _) in zip(bounds, bounds[1:]))
+
+
+def test_analyze_many_matches_analyze(anonymizer, corpus_lines):
+    """Wsadowe analyze_many (walidacja zbiorcza) zgadza się z analyze linia po linii."""
+    assert list(anonymizer.analyze_many(corpus_lines, batch_size=32)) == [
+        anonymizer.analyze(line) for line in corpus_lines
+    ]
+
+
+def test_mask_spans_columns():
+    """Kolumny numpy to widoki na te same dane, a iteracja zwraca nazwy kategorii."""
+    spans = MaskSpans()
+    spans.append(0, 4, "{name}")
+    spans.append(10, 21, "{pesel}")
+    starts, ends, categories = spans.columns()
+    assert starts.dtype == np.int32
+    assert starts.tolist() == [0, 10] and ends.tolist() == [4, 21]
+    assert [masker.SPAN_CATEGORIES[c] for c in categories] == spans.placeholders() == ["{name}", "{pesel}"]
+    assert list(spans) == [(0, 4, "{name}"), (10, 21, "{pesel}")]
+    other = MaskSpans()
+    other.append(0, 4, "{name}")
+    assert spans != other
+    other.append(10, 21, "{pesel}")
+    assert spans == other
+
+
+@pytest.fixture
+def mask_extension():
+    """Przywraca rejestrację token._.mask zmienianą przez test."""
+    saved = Token.get_extension("mask")
+    yield
+    if saved is None:
+        Token.remove_extension("mask")
+    else:
+        default, method, getter, setter = saved
+        Token.set_extension("mask", default=default, method=method, getter=getter, setter=setter, force=True)
+
+
+def masked_doc():
+    doc = spacy.blank("pl")("Jan Kowalski , ur. 1 maja 1990 w Gdańsku pracuje w Orlenie .")
+    for token in doc:
+        if token.text in ("Jan", "Kowalski"):
+            token._.mask = "persname_mask"
+        elif token.text in ("1", "maja", "1990"):
+            token._.mask = "date_mask"
+        elif token.text == "Orlenie":
+            token._.mask = "orgname_mask"
+    return doc
+
+
+def public_masks(doc, blocked):
+    return [None if skip else token._.mask for token, skip in zip(doc, blocked)]
+
+
+def check_token_masks(anonymizer, doc):
+    starts = [token.idx for token in doc]
+    blocked = [token.is_punct for token in doc]
+    masks = anonymizer.token_masks(doc, starts, blocked)
+    assert masks == public_masks(doc, blocked)
+    return masks
+
+
+def test_token_masks_plain_extension(anonymizer, mask_extension):
+    """Maski ustawione przez token._.mask: odczyt z user_data == token._.mask."""
+    Token.set_extension("mask", default=None, force=True)
+    masks = check_token_masks(anonymizer, masked_doc())
+    assert masks[:2] == ["persname_mask"] * 2 and masks[2] is None
+    assert "orgname_mask" in masks
+
+
+def test_token_masks_getter_extension(anonymizer, mask_extension):
+    """Rozszerzenie z getterem: wartości spoza user_data."""
+    Token.set_extension("mask", default=None, force=True)
+    doc = masked_doc()
+    values = [token._.mask for token in doc]
+    Token.set_extension("mask", getter=lambda token: values[token.i], force=True)
+    assert "persname_mask" in check_token_masks(anonymizer, doc)
+
+
+def test_token_masks_other_user_data_layout(anonymizer, mask_extension, monkeypatch):
+    """Inny układ kluczy doc.user_data w spaCy: maski nadal czytane przez token._.mask."""
+    Token.set_extension("mask", default=None, force=True)
+    layout = Underscore._get_key
+    monkeypatch.setattr(Underscore, "_get_key", lambda self, name: (*layout(self, name), "v2"))
+    masks = check_token_masks(anonymizer, masked_doc())
+    assert masks[:2] == ["persname_mask"] * 2
@@ -0,0 +1,149 @@
+"""
+Testy walidacji numerów: zbiorcza CandidateValidation ma dawać te same wyniki co
+pojedyncze is_valid_*, a algebraiczna naprawa PESEL – to samo co przegląd
+wszystkich podstawień cyfr za litery.
+"""
+
+import random
+from itertools import combinations, product
+
+from masker import PESEL_WEIGHTS, CandidateValidation
+
+
+def random_pesel(rng: random.Random) -> str:
+    year = rng.randint(1800, 2299)
+    month_offset = {18: 80, 19: 0, 20: 20, 21: 40, 22: 60}[year // 100]
+    digits = [int(ch) for ch in f"{year % 100:02d}{rng.randint(1, 12) + month_offset:02d}{rng.randint(1, 28):02d}"]
+    digits += [rng.randint(0, 9) for _ in range(4)]
+    digits.append((10 - sum(w * d for w, d in zip(PESEL_WEIGHTS, digits)) % 10) % 10)
+    return "".join(map(str, digits))
+
+
+def luhn_complete(rng: random.Random) -> str:
+    digits = [rng.randint(0, 9) for _ in range(15)]
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        if index % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    digits.append((10 - total % 10) % 10)
+    number = "".join(map(str, digits))
+    return " ".join(number[i:i + 4] for i in range(0, 16, 4))
+
+
+def iban_complete(rng: random.Random) -> str:
+    bban = "".join(str(rng.randint(0, 9)) for _ in range(24))
+    return f"PL{98 - int(bban + '252100') % 97:02d}{bban}"
+
+
+def corrupt(number: str, rng: random.Random) -> str:
+    pos = rng.choice([i for i, ch in enumerate(number) if ch.isdigit()])
+    return number[:pos] + str((int(number[pos]) + 1) % 10) + number[pos + 1:]
+
+
+def registry_lines(count: int, per_line: int = 20, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    makers = [("PESEL", random_pesel), ("karta", luhn_complete), ("rachunek", iban_complete)]
+    lines = []
+    for _ in range(count):
+        parts = []
+        for _ in range(per_line):
+            label, make = rng.choice(makers)
+            number = make(rng)
+            if rng.random() < 0.3:
+                number = corrupt(number, rng)
+            parts.append(f"{label}: {number}")
+        lines.append("; ".join(parts))
+    return lines
+
+
+def product_normalize_pesel_candidate(anonymizer, token: str) -> str | None:
+    """Zachowanie sprzed naprawy algebraicznej: wszystkie podstawienia cyfr."""
+    if len(token) != 11 or not token.isalnum():
+        return None
+    letter_positions = [i for i, ch in enumerate(token) if ch.isalpha()]
+    if len(letter_positions) > 2:
+        return None
+    if not letter_positions:
+        return token if anonymizer.is_valid_pesel(token) else None
+    for combo in product("0123456789", repeat=len(letter_positions)):
+        digits = list(token)
+        for pos, digit in zip(letter_positions, combo):
+            digits[pos] = digit
+        candidate = "".join(digits)
+        if anonymizer.is_valid_pesel(candidate):
+            return candidate
+    return None
+
+
+def test_candidate_validation_matches_scalar(anonymizer):
+    """Wyniki zbiorcze == is_valid_* dla każdego kandydata z paczki."""
+    lines = registry_lines(50)
+    validation = CandidateValidation(lines, anonymizer)
+    checked = 0
+    for number, valid in validation.pesel.items():
+        assert valid == anonymizer.is_valid_pesel(number), number
+        checked += 1
+    for number, valid in validation.credit_card.items():
+        assert valid == anonymizer.is_valid_credit_card(number), number
+        checked += 1
+    assert checked > 300
+    assert any(validation.pesel.values()) and not all(validation.pesel.values())
+
+
+def test_candidate_validation_fallback(anonymizer):
+    """Kandydaci spoza paczki trafiają do walidacji pojedynczej."""
+    validation = CandidateValidation([], anonymizer)
+    rng = random.Random(1)
+    pesel = random_pesel(rng)
+    assert validation.is_valid_pesel(pesel) == anonymizer.is_valid_pesel(pesel) is True
+    assert validation.is_valid_pesel(corrupt(pesel, rng)) is False
+
+
+def test_build_regex_spans_with_validation(anonymizer, corpus_lines):
+    """Spany z walidacją zbiorczą == spany z walidacją pojedynczą."""
+    lines = registry_lines(30) + corpus_lines
+    for i in range(0, len(lines), 64):
+        chunk = lines[i:i + 64]
+        validation = CandidateValidation(chunk, anonymizer)
+        for line in chunk:
+            assert anonymizer.build_regex_spans(line, validation=validation) == anonymizer.build_regex_spans(line)
+
+
+def test_bank_account_masked_without_checksum(anonymizer):
+    """Rachunek ze złą sumą kontrolną (z PL i bez) to nadal {bank-account}, w mask() i mask_many()."""
+    lines = ["PL61109010140000071219812875 przelew", "konto 61109010140000071219812875"]
+    expected = ["{bank-account} przelew", "konto {bank-account}"]
+    assert [anonymizer.mask(line) for line in lines] == expected
+    assert list(anonymizer.mask_many(lines)) == expected
+    rng = random.Random(2)
+    registry = [f"rachunek: {corrupt(iban_complete(rng), rng)}" for _ in range(20)]
+    assert set(anonymizer.mask_many(registry)) == {"rachunek: {bank-account}"}
+
+
+def test_pesel_repair_matches_product(anonymizer):
+    """Naprawa PESEL z 1-2 literami daje to samo co pełny przegląd podstawień."""
+    rng = random.Random(0)
+    bases = [random_pesel(rng) for _ in range(20)]
+    bases += ["".join(rng.choice("0123456789") for _ in range(11)) for _ in range(20)]
+    repaired = 0
+    for base in bases:
+        for count in (1, 2):
+            for positions in combinations(range(11), count):
+                token = list(base)
+                for pos in positions:
+                    token[pos] = "OlBIS"[pos % 5]
+                token = "".join(token)
+                expected = product_normalize_pesel_candidate(anonymizer, token)
+                assert anonymizer.normalize_pesel_candidate(token) == expected, token
+                repaired += expected is not None
+    assert repaired > 0
+
+
+def test_pesel_repair_rejects(anonymizer):
+    """Za dużo liter, zła długość albo znaki spoza [0-9A-Za-z] – brak naprawy."""
+    assert anonymizer.normalize_pesel_candidate("9001O1l2B18") is None
+    assert anonymizer.normalize_pesel_candidate("900101123") is None
+    assert anonymizer.normalize_pesel_candidate("90010-12318") is None